@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Maintenance for the download analytics database (analytics.db).
+
+analytics.db holds downloads, monthly_downloads and download_totals in WAL
+mode, separate from the catalog in requests.db. Writers only checkpoint
+once the WAL reaches ANALYTICS_WAL_AUTOCHECKPOINT pages, so a periodic
+TRUNCATE checkpoint keeps the WAL file small, and analytics is backed up
+on its own schedule instead of with every catalog backup.
+
+monthly_downloads is one table per month behind a view; archive-months
+moves months older than the retention window (after their rankings are in
+monthly_popular_history) into gzip CSV files, and new months reuse the
+freed pages.
+
+The popular sections read per-type top-K leaderboards that track_download
+keeps up to date; rebuild-leaderboards recounts them exactly from the
+downloads and drops boards of past months. The app runs it when it
+archives the previous month, and it is safe to run at any time.
+
+Trending scores (daily-bucketed downloads with exponential time decay) are
+incremented by each download; decay-trending ages them by the time since
+its last run and should run hourly. rebuild-trending recomputes them from
+the daily buckets.
+
+The daily buckets also feed the download sparklines on game and port pages
+(/api/stats/<id>); archive-months prunes buckets older than
+DAILY_DOWNLOADS_RETENTION_DAYS.
+
+Usage:
+    python analytics_maintenance.py status
+    python analytics_maintenance.py checkpoint                  # TRUNCATE checkpoint
+    python analytics_maintenance.py checkpoint --mode passive
+    python analytics_maintenance.py backup /var/backups/romhacks --keep 14
+    python analytics_maintenance.py archive-months --retention 3
+    python analytics_maintenance.py rebuild-leaderboards
+    python analytics_maintenance.py decay-trending
+    python analytics_maintenance.py rebuild-trending
+
+Suggested crontab (run from the app directory):
+    */15 * * * *  python analytics_maintenance.py checkpoint
+    30 3 * * *    python analytics_maintenance.py backup /var/backups/romhacks --keep 14
+    0 4 2 * *     python analytics_maintenance.py archive-months
+    5 0 1 * *     python analytics_maintenance.py rebuild-leaderboards
+    7 * * * *     python analytics_maintenance.py decay-trending
+"""
+
+import argparse
+import glob
+import os
+import sys
+from datetime import datetime
+
+import database
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def status():
+    path = database.get_analytics_db_path()
+    if not os.path.exists(path):
+        print(f"✗ Analytics database not found: {path}")
+        return 1
+    conn = database.get_analytics_connection()
+    try:
+        mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in database.ANALYTICS_TABLES}
+        months = database.get_monthly_partitions(conn)
+    finally:
+        conn.close()
+    print(f"Analytics database: {path} (journal_mode={mode})")
+    print(f"  - file: {_size(path) / 1024 / 1024:.1f} MB, WAL: {_size(path + '-wal') / 1024 / 1024:.1f} MB")
+    for table, count in counts.items():
+        print(f"  - {table}: {count:,} rows")
+    print(f"  - hot months: {', '.join(months) or 'none'}")
+    return 0
+
+
+def checkpoint(mode):
+    busy, wal_pages, checkpointed = database.checkpoint_analytics(mode)
+    if busy:
+        print(f"✗ Checkpoint ({mode}) could not complete: database busy ({checkpointed}/{wal_pages} pages)")
+        return 1
+    print(f"✓ Checkpoint ({mode}): {checkpointed}/{wal_pages} WAL pages written back")
+    return 0
+
+
+def backup(directory, keep):
+    path = database.get_analytics_db_path()
+    if not os.path.exists(path):
+        print(f"✗ Analytics database not found: {path}")
+        return 1
+    os.makedirs(directory, exist_ok=True)
+    dest = os.path.join(directory, f"analytics.db.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    database.backup_sqlite(path, dest)
+    print(f"✓ Analytics database backed up to: {dest} ({_size(dest) / 1024 / 1024:.1f} MB)")
+
+    if keep:
+        backups = sorted(glob.glob(os.path.join(directory, 'analytics.db.backup_*')))
+        for old in backups[:-keep]:
+            os.remove(old)
+            print(f"  - Removed old backup {os.path.basename(old)}")
+    return 0
+
+
+def archive_months(retention, directory):
+    archived = database.archive_cold_monthly_downloads(retention, directory)
+    if not archived:
+        print("✓ No months older than the retention window")
+    for year_month, rows, path in archived:
+        print(f"✓ Archived {year_month}: {rows:,} rows -> {path}")
+    pruned = database.prune_daily_downloads()
+    print(f"✓ Pruned {pruned:,} daily buckets older than {database.DAILY_DOWNLOADS_RETENTION_DAYS} days")
+    return 0
+
+
+def rebuild_leaderboards(year_month):
+    boards = database.rebuild_leaderboards(year_month)
+    for board, entries in boards.items():
+        print(f"✓ {board}: {entries} entries")
+    return 0
+
+
+def decay_trending():
+    factor, dropped = database.decay_trending()
+    print(f"✓ Trending scores decayed by {factor:.4f} "
+          f"(half-life {database.TRENDING_HALF_LIFE_DAYS:g} days), {dropped} dropped")
+    return 0
+
+
+def rebuild_trending():
+    scored = database.rebuild_trending()
+    print(f"✓ Trending scores rebuilt for {scored} items")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkpoint, back up or inspect analytics.db')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='Show file/WAL size and row counts')
+    checkpoint_parser = sub.add_parser('checkpoint', help='Checkpoint the WAL')
+    checkpoint_parser.add_argument('--mode', default='truncate', choices=('passive', 'full', 'restart', 'truncate'))
+    backup_parser = sub.add_parser('backup', help='Online backup to a timestamped file')
+    backup_parser.add_argument('directory', help='Directory for backups')
+    backup_parser.add_argument('--keep', type=int, default=0, help='Keep only the newest N backups (default: all)')
+    archive_parser = sub.add_parser('archive-months', help='Move cold monthly_downloads partitions to gzip files')
+    archive_parser.add_argument('--retention', type=int, default=database.MONTHLY_DOWNLOADS_RETENTION_MONTHS,
+                                help=f'Months to keep hot, including the current one '
+                                     f'(default: {database.MONTHLY_DOWNLOADS_RETENTION_MONTHS})')
+    archive_parser.add_argument('--dir', help='Archive directory (default: ANALYTICS_ARCHIVE_DIR or ./archive)')
+    leaderboard_parser = sub.add_parser('rebuild-leaderboards', help='Recount the popularity leaderboards exactly')
+    leaderboard_parser.add_argument('--month', help='Month to rank (YYYY-MM, default: current)')
+    sub.add_parser('decay-trending', help='Apply the time decay to trending scores (run hourly)')
+    sub.add_parser('rebuild-trending', help='Recompute trending scores from the daily buckets')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        return status()
+    if args.command == 'checkpoint':
+        return checkpoint(args.mode.upper())
+    if args.command == 'archive-months':
+        return archive_months(args.retention, args.dir)
+    if args.command == 'rebuild-leaderboards':
+        return rebuild_leaderboards(args.month)
+    if args.command == 'decay-trending':
+        return decay_trending()
+    if args.command == 'rebuild-trending':
+        return rebuild_trending()
+    return backup(args.directory, args.keep)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
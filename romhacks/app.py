@@ -1,4 +1,5 @@
 from flask import Flask, render_template, abort, send_from_directory, request, jsonify, session, redirect, url_for
+from markupsafe import Markup, escape
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
@@ -10,16 +11,23 @@ from database import (
     get_ports,
     get_game_by_id,
     get_port_by_id,
+    resolve_item,
+    load_catalog_ids,
     track_download,
     get_download_count,
     get_download_counts_for_ids,
+    get_catalog_page,
+    CATALOG_SORT_COLUMNS,
     submit_feedback,
-    get_feedback,
+    get_feedback_by_id,
+    get_feedback_counts,
+    get_feedback_page,
     update_feedback_status,
     delete_feedback,
     submit_game,
     hash_string,
-    get_submissions,
+    get_submission_counts,
+    get_submissions_page,
     get_submission_by_id,
     update_submission_status,
     reject_submission,
@@ -30,7 +38,18 @@ from database import (
     delete_port,
     insert_game,
     insert_port,
-    get_monthly_download_counts_for_ids,
+    get_popular_items,
+    get_trending_items,
+    get_console_counts,
+    get_faceted_items,
+    get_facet_counts,
+    FACETS,
+    FACET_COLUMNS,
+    get_item_consoles,
+    get_items_by_ids,
+    get_daily_download_series,
+    STATS_RANGES,
+    STATS_CACHE_SECONDS,
     check_and_archive_previous_month,
     get_all_archived_months,
     get_monthly_popular_history,
@@ -47,11 +66,16 @@ from database import (
 import json
 import os
 import requests
-import boto3
 import uuid
 from datetime import datetime
-from botocore.config import Config
 from functools import wraps
+from storage import get_r2_client, get_public_url
+from image_pipeline import schedule_item_images, reset_executor
+import rate_limit_storage  # noqa: F401 - registers the sqlite:// limiter storage
+import request_metrics
+import cache_tags
+import freeze
+import slow_query_log
 # Load environment variables from .env file
 load_dotenv()
 
@@ -63,25 +87,38 @@ RA_CLIENT_ID = os.environ.get('RA_CLIENT_ID', '')
 RA_CLIENT_SECRET = os.environ.get('RA_CLIENT_SECRET', '')
 RA_REDIRECT_URI = os.environ.get('RA_REDIRECT_URI', 'http://localhost:5000/auth/ra/callback')
 
-# Initialize rate limiter
+# Initialize rate limiter. Counters live in a shared SQLite file so every
+# gunicorn worker enforces the same limits (see rate_limit_storage.py).
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["1000000 per day", "100000 per hour"],
-    storage_uri="memory://"
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', 'sqlite:///ratelimit.db'),
+    strategy="sliding-window-counter",
+    # RATELIMIT_ENABLED=0 turns limits off for local load tests (replay_access_log.py)
+    enabled=os.environ.get('RATELIMIT_ENABLED', '1') != '0'
 )
 
-# Initialize database on startup
-init_db()
+# Request/SQL/template timing; admins see it as a Server-Timing header
+request_metrics.init_app(app, show_timing=lambda: session.get('admin_logged_in'))
+
+# Surrogate-Key tags on public pages, so admin writes can purge the proxy cache selectively
+cache_tags.init_app(app)
+
+# freeze.py renders pages with this WSGI environ key set; frozen pages hydrate
+# their download counters from /api/download-counts instead of baking them in
+FREEZE_ENVIRON_KEY = 'romhacks.freeze'
+# freeze.py's --out directory (nginx's frozen root). nginx serves these files
+# before the proxy cache, so admin writes delete the ones they purge.
+FROZEN_DIR = os.environ.get('FROZEN_DIR', '')
 
-# Check and archive previous month's data if needed
-check_and_archive_previous_month()
 
 @app.context_processor
 def inject_globals():
     return {
         'current_year': datetime.now().year,
-        'site_name': 'ROMHACKS.NET'
+        'site_name': 'ROMHACKS.NET',
+        'frozen': request.environ.get(FREEZE_ENVIRON_KEY, False)
     }
 
 # --- Performance & SEO Middleware ---
@@ -106,6 +143,14 @@ def add_cache_headers(response):
         response.cache_control.no_cache = True
         response.cache_control.must_revalidate = True
         response.cache_control.public = True
+    # Download graphs change slowly and are the same for everyone
+    elif request.path.startswith('/api/stats/'):
+        response.cache_control.max_age = int(STATS_CACHE_SECONDS)
+        response.cache_control.public = True
+    # Counters on frozen pages and facet counts: shared, and a minute stale is fine
+    elif request.path in ('/api/download-counts', '/api/facets'):
+        response.cache_control.max_age = 60
+        response.cache_control.public = True
     # No cache for dynamic pages (admin, API, etc)
     elif '/admin/' in request.path or '/api/' in request.path:
         response.cache_control.no_cache = True
@@ -120,6 +165,9 @@ def add_cache_headers(response):
     
     return response
 
+# Rows per page in the admin submission/feedback queues
+ADMIN_PAGE_SIZE = 50
+
 # Admin authentication
 def login_required(f):
     """Decorator to require admin login"""
@@ -160,31 +208,32 @@ def admin_dashboard():
     """Admin dashboard with submissions and feedback"""
     view = request.args.get('view', 'submissions')
     status = request.args.get('status', 'new')
+    before = request.args.get('before')
     
-    # Always get counts for all statuses (needed for badges/tabs)
-    pending_count = len(get_submissions('new'))
-    approved_count = len(get_submissions('approved'))
-    rejected_count = len(get_submissions('rejected'))
-    
-    feedback_new_count = len(get_feedback(status='new'))
-    feedback_resolved_count = len(get_feedback(status='resolved'))
-    feedback_ignored_count = len(get_feedback(status='ignored'))
+    # Badge counts come from grouped COUNT queries (one per table)
+    submission_counts = get_submission_counts()
+    feedback_counts = get_feedback_counts()
     
-    # Get data for the active view only
-    submissions = get_submissions(status) if view == 'submissions' else []
-    feedback_list = get_feedback(status=status) if view == 'feedback' else []
+    # Get one page of data for the active view only
+    submissions, feedback_list, next_cursor = [], [], None
+    if view == 'submissions':
+        submissions, next_cursor = get_submissions_page(status, before, ADMIN_PAGE_SIZE)
+    elif view == 'feedback':
+        feedback_list, next_cursor = get_feedback_page(status, before, ADMIN_PAGE_SIZE)
     
     return render_template('admin_dashboard.html', 
                           active_view=view,
                           submissions=submissions, 
                           active_status=status,
-                          pending_count=pending_count,
-                          approved_count=approved_count,
-                          rejected_count=rejected_count,
+                          pending_count=submission_counts['new'],
+                          approved_count=submission_counts['approved'],
+                          rejected_count=submission_counts['rejected'],
                           feedback_list=feedback_list,
-                          feedback_new_count=feedback_new_count,
-                          feedback_resolved_count=feedback_resolved_count,
-                          feedback_ignored_count=feedback_ignored_count)
+                          feedback_new_count=feedback_counts['new'],
+                          feedback_resolved_count=feedback_counts['resolved'],
+                          feedback_ignored_count=feedback_counts['ignored'],
+                          is_first_page=not before,
+                          next_cursor=next_cursor)
 
 @app.route('/admin/submission/<int:submission_id>')
 @login_required
@@ -230,8 +279,7 @@ def api_submission_status(submission_id):
 @login_required
 def admin_feedback_detail(feedback_id):
     """View feedback details"""
-    feedback_list = get_feedback()
-    feedback = next((f for f in feedback_list if f['id'] == feedback_id), None)
+    feedback = get_feedback_by_id(feedback_id)
     if not feedback:
         abort(404)
     
@@ -277,43 +325,60 @@ def api_delete_feedback(feedback_id):
 
 # --- Admin Game/Port Management Routes ---
 
+def _admin_catalog_query(item_type):
+    """Read search/sort/paging arguments for the admin catalog tables and fetch one page."""
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'title')
+    if sort not in CATALOG_SORT_COLUMNS:
+        sort = 'title'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', ADMIN_PAGE_SIZE)), 1), 500)
+    except ValueError:
+        offset, limit = 0, ADMIN_PAGE_SIZE
+    console = request.args.get('console', '').strip().lower()
+    # Keyset cursor of the previous page (next_cursor); offset is for jumps
+    after = request.args.get('after') or None
+    
+    items, total, next_cursor = get_catalog_page(item_type, search, sort, order, limit, offset,
+                                                 console=console or None, after=after)
+    return {
+        'items': items,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'q': search,
+        'sort': sort,
+        'order': order,
+        'console': console,
+    }
+
+
 @app.route('/admin/games')
 @login_required
 def admin_games():
     """Admin page to manage games (romhacks)"""
-    games = get_games()
-    attach_download_counts(games)
-    games.sort(key=lambda g: g.get('title', '').lower())
-    return render_template('admin_games.html', items=games, item_type='game')
+    return render_template('admin_games.html', initial_page=_admin_catalog_query('game'), item_type='game',
+                           console_counts=get_console_counts('game'))
 
 
 @app.route('/admin/ports')
 @login_required
 def admin_ports():
     """Admin page to manage ports"""
-    ports_data = get_ports()
-    attach_download_counts(ports_data)
-    ports_data.sort(key=lambda p: p.get('title', '').lower())
-    return render_template('admin_games.html', items=ports_data, item_type='port')
+    return render_template('admin_games.html', initial_page=_admin_catalog_query('port'), item_type='port',
+                           console_counts=get_console_counts('port'))
 
 
-# R2 Upload Helper
-def get_r2_client():
-    account_id = os.environ.get('R2_ACCOUNT_ID')
-    access_key = os.environ.get('R2_ACCESS_KEY_ID')
-    secret_key = os.environ.get('R2_SECRET_ACCESS_KEY')
-    
-    if not all([account_id, access_key, secret_key]):
-        return None
+@app.route('/api/admin/items')
+@login_required
+def api_admin_items():
+    """API: one page of games or ports for the admin tables (search, console, sort, after or offset, limit)"""
+    item_type = 'port' if request.args.get('type') == 'port' else 'game'
+    return jsonify(_admin_catalog_query(item_type))
 
-    return boto3.client(
-        's3',
-        endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        config=Config(signature_version='s3v4'),
-        region_name='auto'
-    )
 
 @app.route('/admin/upload-proxy', methods=['POST'])
 @login_required
@@ -344,13 +409,7 @@ def upload_proxy():
                 ExtraArgs={'ContentType': file.content_type}
             )
             
-            public_base = os.environ.get('R2_PUBLIC_BASE', 'https://assets.magiskmg.com')
-            if public_base:
-                 public_url = f"{public_base.rstrip('/')}/{object_key}"
-            else:
-                 public_url = f"https://{bucket}.r2.cloudflarestorage.com/{object_key}"
-            
-            return jsonify({'publicUrl': public_url})
+            return jsonify({'publicUrl': get_public_url(object_key)})
             
         except Exception as e:
             print(f"Error uploading file: {e}")
@@ -389,15 +448,9 @@ def generate_presigned_url():
             ExpiresIn=3600
         )
         
-        public_base = os.environ.get('R2_PUBLIC_BASE', 'https://assets.magiskmg.com')
-        if public_base:
-             public_url = f"{public_base.rstrip('/')}/{object_key}"
-        else:
-             public_url = f"https://{bucket}.r2.cloudflarestorage.com/{object_key}"
-
         return jsonify({
             'signedUrl': presigned_url,
-            'publicUrl': public_url
+            'publicUrl': get_public_url(object_key)
         })
         
     except Exception as e:
@@ -448,6 +501,8 @@ def admin_edit_game(game_id):
         data['instruction'] = 'instruction' in request.form
         
         update_game(game_id, data)
+        schedule_item_images(game_id)
+        purge_item_pages(game, {**game, **data})
         return redirect(url_for('admin_games'))
     
     return render_template('admin_edit_game.html', item=game, item_type='game')
@@ -495,6 +550,8 @@ def admin_edit_port(port_id):
         data['instruction'] = 'instruction' in request.form
         
         update_port(port_id, data)
+        schedule_item_images(port_id, is_port=True)
+        purge_item_pages(port, is_port=True)
         return redirect(url_for('admin_ports'))
     
     return render_template('admin_edit_game.html', item=port, item_type='port')
@@ -536,7 +593,9 @@ def admin_add_game():
         data['online_play'] = 'online_play' in request.form
         data['instruction'] = 'instruction' in request.form
         
-        insert_game(data)
+        game_id = insert_game(data)
+        schedule_item_images(game_id)
+        purge_item_pages({**data, 'id': game_id})
         return redirect(url_for('admin_games'))
     
     # Empty item for the form
@@ -590,7 +649,9 @@ def admin_add_port():
         data['online_play'] = 'online_play' in request.form
         data['instruction'] = 'instruction' in request.form
         
-        insert_port(data)
+        port_id = insert_port(data)
+        schedule_item_images(port_id, is_port=True)
+        purge_item_pages({**data, 'id': port_id}, is_port=True)
         return redirect(url_for('admin_ports'))
     
     # Empty item for the form
@@ -640,16 +701,21 @@ def admin_import_json():
             
             success_count = 0
             errors = []
+            imported = []
             
             for item in items:
                 try:
                     if item_type == 'port':
-                        insert_port(item)
+                        item_id = insert_port(item)
+                        schedule_item_images(item_id, is_port=True)
                     else:
-                        insert_game(item)
+                        item_id = insert_game(item)
+                        schedule_item_images(item_id)
+                    imported.append({**item, 'id': item_id})
                     success_count += 1
                 except Exception as e:
                     errors.append(f"Error importing {item.get('title', 'unknown')}: {str(e)}")
+            purge_item_pages(*imported, is_port=item_type == 'port')
             
             if request.is_json:
                 return jsonify({
@@ -678,7 +744,10 @@ def admin_import_json():
 @login_required
 def api_delete_game(game_id):
     """API to delete a game"""
+    game = get_game_by_id(game_id)
     success = delete_game(game_id)
+    if game:
+        purge_item_pages(game)
     return jsonify({'success': success})
 
 
@@ -687,9 +756,29 @@ def api_delete_game(game_id):
 def api_delete_port(port_id):
     """API to delete a port"""
     success = delete_port(port_id)
+    purge_item_pages({'id': port_id}, is_port=True)
     return jsonify({'success': success})
 
 
+def purge_item_pages(*items, is_port=False):
+    """Purge cached and frozen pages showing these games or ports (pass an edited game before and after)."""
+    if not items:
+        return
+    tags = ['listing:index', 'listing:sitemap', 'listing:ports' if is_port else 'listing:romhacks']
+    paths = ['/', '/ports' if is_port else '/romhacks']
+    for item in items:
+        tags.append(f"item:{item['id']}")
+        paths.append(f"/{'port' if is_port else 'game'}/{item['id']}")
+        if not is_port:
+            slugs = [slug for slug in get_hub_slugs([item]) if get_hub_games(slug, [item])[1]]
+            tags.extend(f'hub:{slug}' for slug in slugs)
+            paths.extend(f'/{slug}-rom-hacks' for slug in slugs)
+    cache_tags.purge(tags)
+    if FROZEN_DIR:
+        # The next freeze.py --incremental run re-renders them (or not, for deleted items)
+        freeze.unfreeze(FROZEN_DIR, paths)
+
+
 def attach_download_counts(items):
     """Annotate each item with its download count."""
     if not items:
@@ -744,14 +833,20 @@ def get_social_links(game):
     return links
 
 
+_emulator_guides = None
+
+
 def get_emulator_guides():
-    """Load emulator guides for all consoles from JSON file."""
-    try:
-        guides_path = os.path.join(os.path.dirname(__file__), 'emulator_guides.json')
-        with open(guides_path, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+    """Load emulator guides for all consoles from JSON file (read once per process)."""
+    global _emulator_guides
+    if _emulator_guides is None:
+        try:
+            guides_path = os.path.join(os.path.dirname(__file__), 'emulator_guides.json')
+            with open(guides_path, 'r') as f:
+                _emulator_guides = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _emulator_guides = {}
+    return _emulator_guides
 
 
 def get_console_emulator_guide(console):
@@ -782,6 +877,40 @@ def download_count_label(count):
     return format_download_count(count)
 
 
+CARD_IMAGE_SIZES = '(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw'
+
+
+def _image_entry(item, url=None):
+    """Look up the generated variants for an item's cover (or a given screenshot URL)."""
+    url = url or item.get('image_url')
+    variants = item.get('image_variants') or {}
+    return variants.get(url) if url else None
+
+
+@app.template_filter('image_sources')
+def image_sources_filter(item, url=None, sizes=CARD_IMAGE_SIZES):
+    """Render <source> elements (AVIF first, then WebP) for use inside <picture>."""
+    entry = _image_entry(item, url)
+    if not entry:
+        return ''
+    parts = []
+    for fmt in ('avif', 'webp'):
+        candidates = entry.get('variants', {}).get(fmt)
+        if candidates:
+            srcset = ', '.join(f'{escape(u)} {w}w' for u, w, _h in candidates)
+            parts.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{escape(sizes)}">')
+    return Markup(''.join(parts))
+
+
+@app.template_filter('image_dims')
+def image_dims_filter(item, url=None):
+    """Render intrinsic width/height attributes so the browser can reserve layout space."""
+    entry = _image_entry(item, url)
+    if not entry or not entry.get('width') or not entry.get('height'):
+        return ''
+    return Markup(f'width="{int(entry["width"])}" height="{int(entry["height"])}"')
+
+
 def normalize_console_name(console):
     """Normalize console names to match CONSOLE_STYLES keys"""
     if not console:
@@ -837,34 +966,12 @@ PLATFORM_STYLE = {
     'mac': 'bg-gray-700/70 text-gray-200 border-gray-500/50'
 }
 
-def attach_monthly_download_counts(items):
-    """Attach monthly download counts to a list of game/port dicts"""
-    if not items:
-        return
-    ids = [item['id'] for item in items]
-    counts = get_monthly_download_counts_for_ids(ids)
-    for item in items:
-        item['monthly_download_count'] = counts.get(item['id'], 0)
-
 @app.route('/')
 def index():
-    games = get_games()
-    ports_data = get_ports()
-    
-    # Attach total download counts for display
-    attach_download_counts(games)
-    attach_download_counts(ports_data)
-    
-    # Attach monthly download counts for sorting
-    attach_monthly_download_counts(games)
-    attach_monthly_download_counts(ports_data)
-    
-    # Sort by monthly downloads (most popular this month) and take top 12
-    games.sort(key=lambda g: (g.get('monthly_download_count', 0), g.get('download_count', 0)), reverse=True)
-    ports_data.sort(key=lambda p: (p.get('monthly_download_count', 0), p.get('download_count', 0)), reverse=True)
-    
-    popular_games = games[:12]
-    popular_ports = ports_data[:12]
+    # Most popular this month (with download counts attached), from the leaderboards
+    cache_tags.tag('listing:index')
+    popular_games = get_popular_items('game', 12)
+    popular_ports = get_popular_items('port', 12)
     
     # Get current month name for display
     current_month = datetime.now().strftime('%B %Y')
@@ -873,31 +980,49 @@ def index():
                           styles=CONSOLE_STYLES, platform_styles=PLATFORM_STYLE,
                           current_month=current_month)
 
+def _listing_items(item_type):
+    """(items, sort, console, console_counts) for /romhacks and /ports.
+
+    ?sort=trending ranks by the decayed download score instead of this month's
+    downloads; ?console=<token> ranks that console's items (via item_consoles)
+    and ?base_game=, ?game_series= (any FACET_COLUMNS name) narrow by facet.
+    """
+    sort = 'trending' if request.args.get('sort') == 'trending' else 'popular'
+    console = request.args.get('console', '').strip().lower()
+    console_counts = get_console_counts(item_type)
+    if console not in console_counts:
+        console = ''
+    filters = {facet: request.args.get(facet, '')[:200] for facet in FACET_COLUMNS}
+    filters['console'] = console
+    if any(filters.values()):
+        items = get_faceted_items(item_type, filters, 12, sort)
+    elif sort == 'trending':
+        items = get_trending_items(item_type, 12)
+    else:
+        items = get_popular_items(item_type, 12)
+    return items, sort, console, console_counts
+
 @app.route('/ports')
 def ports():
-    ports_data = get_ports()
-    attach_download_counts(ports_data)
-    attach_monthly_download_counts(ports_data)
-    ports_data.sort(key=lambda p: (p.get('monthly_download_count', 0), p.get('download_count', 0)), reverse=True)
-    ports_data = ports_data[:12]
+    ports_data, sort, console, console_counts = _listing_items('port')
+    cache_tags.tag('listing:ports')
     
     # Get current month name for display
     current_month = datetime.now().strftime('%B %Y')
     
-    return render_template('ports.html', games=ports_data, styles=PLATFORM_STYLE, current_month=current_month)
+    return render_template('ports.html', games=ports_data, styles=PLATFORM_STYLE, current_month=current_month,
+                           sort=sort, console=console, console_counts=console_counts)
 
 @app.route('/romhacks')
 def romhacks():
-    games = get_games()
-    attach_download_counts(games)
-    attach_monthly_download_counts(games)
-    games.sort(key=lambda g: (g.get('monthly_download_count', 0), g.get('download_count', 0)), reverse=True)
-    games = games[:12]
+    games, sort, console, console_counts = _listing_items('game')
+    cache_tags.tag('listing:romhacks')
     
     # Get current month name for display
     current_month = datetime.now().strftime('%B %Y')
     
-    return render_template('romhacks.html', games=games, styles=CONSOLE_STYLES, current_month=current_month)
+    return render_template('romhacks.html', games=games, styles=CONSOLE_STYLES, current_month=current_month,
+                           sort=sort, console=console, console_counts=console_counts)
 
 @app.route('/patcher')
 def patcher():
@@ -929,16 +1054,29 @@ def logo_file(filename):
 
 
 # --- Base Game Hub Pages (Programmatic SEO) ---
-@app.route('/<base_game>-rom-hacks')
-@app.route('/<base_game>-hacks')
-def base_game_hub(base_game):
-    """Generate dynamic hub pages for specific base games (e.g., /pokemon-emerald-rom-hacks)"""
+# Major franchise hubs aggregate every base game in the series: (slug, changefreq, sitemap priority)
+FRANCHISE_HUBS = [
+    ('pokemon', 'daily', '0.95'),
+    ('mario', 'daily', '0.92'),
+    ('zelda', 'daily', '0.92'),
+    ('fire-emblem', 'weekly', '0.88'),
+    ('super-mario-world', 'weekly', '0.88')
+]
+
+
+def get_hub_slugs(games):
+    """Slugs of every base game hub: the franchise hubs, then one per base game."""
+    slugs = [franchise for franchise, _, _ in FRANCHISE_HUBS]
+    unique_base_games = {game.get('base_game', '') for game in games} - {''}
+    slugs.extend(base_game.lower().replace(' ', '-') for base_game in sorted(unique_base_games))
+    return slugs
+
+
+def get_hub_games(base_game, all_games):
+    """(display name, matching games) for a hub slug, in catalog order."""
     # Normalize base_game parameter for search
     base_game_normalized = base_game.lower().replace('-', ' ')
     
-    # Get all games
-    all_games = get_games()
-    
     # Special handling for major franchises to aggregate all related games
     if base_game_normalized == 'pokemon' or base_game_normalized == 'pokémon':
         matching_games = [
@@ -978,9 +1116,29 @@ def base_game_hub(base_game):
         ]
         # Get formatted base game name for display
         base_game_display = ' '.join(word.capitalize() for word in base_game_normalized.split())
-    
+    return base_game_display, matching_games
+
+
+@app.route('/<base_game>-rom-hacks')
+@app.route('/<base_game>-hacks')
+def base_game_hub(base_game):
+    """Generate dynamic hub pages for specific base games (e.g., /pokemon-emerald-rom-hacks)"""
+    # Membership from the narrow id/base_game scan; hub-card columns are read for the shown members only
+    base_game_display, matching_games = get_hub_games(base_game, get_games('sitemap'))
     if not matching_games:
         abort(404)
+    cache_tags.tag(f'hub:{base_game}')
+    game_count = len(matching_games)
+    
+    # Console chips and ?console=<token> narrowing come from item_consoles
+    members = get_item_consoles([game['id'] for game in matching_games])
+    console_counts = dict(sorted(((c, len(ids)) for c, ids in members.items()), key=lambda kv: (-kv[1], kv[0])))
+    console = request.args.get('console', '').strip().lower()
+    if console in members:
+        matching_games = [game for game in matching_games if game['id'] in members[console]]
+    else:
+        console = ''
+    matching_games = get_items_by_ids([game['id'] for game in matching_games], projection='hub')
     
     # Sort by download count
     attach_download_counts(matching_games)
@@ -992,7 +1150,9 @@ def base_game_hub(base_game):
         base_game_slug=base_game,
         games=matching_games,
         styles=CONSOLE_STYLES,
-        game_count=len(matching_games)
+        game_count=game_count,
+        console=console,
+        console_counts=console_counts
     )
 
 
@@ -1002,6 +1162,7 @@ def sitemap():
     from flask import Response
     from datetime import datetime
     
+    cache_tags.tag('listing:sitemap')
     base_url = request.url_root.rstrip('/')
     
     # Static pages with priorities
@@ -1016,9 +1177,9 @@ def sitemap():
         ('/disclaimer', '0.3', 'yearly'),
     ]
     
-    # Get all games and ports
-    games = get_games()
-    ports = get_ports()
+    # Get all games and ports (ids and base games only)
+    games = get_games('sitemap')
+    ports = get_ports('sitemap')
     
     xml_parts = ['<?xml version="1.0" encoding="UTF-8"?>']
     xml_parts.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
@@ -1032,14 +1193,7 @@ def sitemap():
   </url>''')
     
     # Add major franchise hubs (manual override for high SEO value)
-    franchise_hubs = [
-        ('pokemon', 'daily', '0.95'),
-        ('mario', 'daily', '0.92'),
-        ('zelda', 'daily', '0.92'),
-        ('fire-emblem', 'weekly', '0.88'),
-        ('super-mario-world', 'weekly', '0.88')
-    ]
-    for franchise, changefreq, priority in franchise_hubs:
+    for franchise, changefreq, priority in FRANCHISE_HUBS:
          xml_parts.append(f'''  <url>
     <loc>{base_url}/{franchise}-rom-hacks</loc>
     <changefreq>{changefreq}</changefreq>
@@ -1057,7 +1211,7 @@ def sitemap():
     # Add port pages
     for port in ports:
         xml_parts.append(f'''  <url>
-    <loc>{base_url}/game/{port['id']}</loc>
+    <loc>{base_url}/port/{port['id']}</loc>
     <changefreq>weekly</changefreq>
     <priority>0.7</priority>
   </url>''')
@@ -1106,14 +1260,14 @@ Sitemap: {base_url}/sitemap.xml
 
 @app.route('/game/<game_id>')
 def game_page(game_id):
-    game = get_game_by_id(game_id)
+    item_type, game = resolve_item(game_id)
     is_port = False
+    if item_type == 'port':
+        # Old /game/<port id> links: the port page has the modding section game.html lacks
+        return redirect(url_for('port_page', port_id=game_id), code=301)
     if game is None:
-        # If it's actually a port ID, send them to the port page (game.html has no modding section)
-        port = get_port_by_id(game_id)
-        if port:
-            return redirect(url_for('port_page', port_id=game_id))
         abort(404)
+    cache_tags.tag(f'item:{game_id}')
     # Use appropriate color styles based on whether it's a port or game
     styles = PLATFORM_STYLE if is_port else CONSOLE_STYLES
     download_count = get_download_count(game_id)
@@ -1128,9 +1282,12 @@ def game_page(game_id):
 
 @app.route('/port/<port_id>')
 def port_page(port_id):
-    game = get_port_by_id(port_id)
+    item_type, game = resolve_item(port_id)
+    if item_type == 'game':
+        return redirect(url_for('game_page', game_id=port_id), code=301)
     if game is None:
         abort(404)
+    cache_tags.tag(f'item:{port_id}')
     # Use platform styles for ports
     styles = PLATFORM_STYLE
     download_count = get_download_count(port_id)
@@ -1153,6 +1310,34 @@ def track_download_endpoint(game_id):
     new_count = get_download_count(game_id)
     return jsonify({'success': result, 'new_count': format_download_count(new_count)})
 
+@app.route('/api/download-counts')
+def download_counts_endpoint():
+    """Download count labels for frozen pages (?ids=a,b,c, at most 100 ids)"""
+    ids = [item_id for item_id in request.args.get('ids', '').split(',') if item_id][:100]
+    counts = get_download_counts_for_ids(ids) if ids else {}
+    return jsonify({'counts': {item_id: format_download_count(counts.get(item_id, 0)) for item_id in ids}})
+
+@app.route('/api/facets')
+def facets_endpoint():
+    """Counts per facet value for the listing filters (?type=game|port&console=&base_game=&game_series=...)"""
+    item_type = 'port' if request.args.get('type') == 'port' else 'game'
+    filters = {facet: request.args.get(facet, '')[:200] for facet in FACETS}
+    counts = get_facet_counts(item_type, filters)
+    # [value, count] pairs: JSON objects would lose the most-common-first order
+    return jsonify({'type': item_type, 'generation': counts['generation'], 'total': counts['total'],
+                    'facets': {facet: [[value, n] for value, n in values.items()]
+                               for facet, values in counts['facets'].items()}})
+
+@app.route('/api/stats/<game_id>')
+def download_stats_endpoint(game_id):
+    """Downloads per day for a game or port's sparkline (?range=30d|90d|1y)"""
+    range_name = request.args.get('range', '30d')
+    if range_name not in STATS_RANGES:
+        return jsonify({'success': False, 'error': 'Invalid range'}), 400
+    start, counts = get_daily_download_series(game_id, STATS_RANGES[range_name])
+    return jsonify({'id': game_id, 'range': range_name, 'start': start.isoformat(),
+                    'total': sum(counts), 'counts': counts})
+
 @app.route('/api/feedback', methods=['POST'])
 @limiter.limit("10 per hour")
 def submit_feedback_endpoint():
@@ -1458,6 +1643,31 @@ def vote_review(review_id):
     return jsonify(result)
 
 
+@app.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    """Admin: per-route latency histograms merged across workers (Prometheus text format)"""
+    return request_metrics.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@app.route('/admin/slow-queries')
+@login_required
+def admin_slow_queries():
+    """Admin: slowest SQL statements by total time, with their query plans"""
+    return render_template('admin_slow_queries.html',
+                           queries=slow_query_log.get_top_queries(),
+                           threshold_ms=slow_query_log.SLOW_QUERY_MS,
+                           large_table_rows=slow_query_log.LARGE_TABLE_ROWS)
+
+
+@app.route('/admin/slow-queries/clear', methods=['POST'])
+@login_required
+def admin_slow_queries_clear():
+    """Admin: reset the slow query log"""
+    slow_query_log.clear()
+    return redirect(url_for('admin_slow_queries'))
+
+
 @app.route('/api/admin/reviews/<int:review_id>', methods=['DELETE'])
 @login_required
 def admin_delete_review(review_id):
@@ -1466,6 +1676,52 @@ def admin_delete_review(review_id):
     return jsonify({'success': result})
 
 
+# --- Application startup ---
+
+_app_initialized = False
+
+
+def warm_caches():
+    """Load read-only data and compile every template up front.
+
+    Under gunicorn this runs once in the master before workers fork, so the
+    compiled templates, parsed JSON and the catalog id index are shared
+    copy-on-write.
+    """
+    get_emulator_guides()
+    load_catalog_ids()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def create_app():
+    """Run one-time startup work (schema migration, monthly archive, cache
+    warm-up) and return the application.
+
+    gunicorn.conf.py loads the app through this factory with preload_app, so
+    startup happens once in the master instead of once per worker. Any other
+    WSGI host must load `app:create_app()` too; `app:app` skips this work.
+    """
+    global _app_initialized
+    if not _app_initialized:
+        init_db()
+        # Check and archive previous month's data if needed
+        check_and_archive_previous_month()
+        warm_caches()
+        _app_initialized = True
+    return app
+
+
+def reinit_after_fork():
+    """Drop handles inherited from the preloading master (gunicorn post_fork)."""
+    storage = limiter.storage if limiter.enabled else None
+    if hasattr(storage, 'reset_connections'):
+        storage.reset_connections()
+    reset_executor()
+    request_metrics.reset_after_fork()
+
+
 if __name__ == '__main__':
+    create_app()
     app.config['TEMPLATES_AUTO_RELOAD'] = True
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
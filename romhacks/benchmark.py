@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the key routes and database functions.
+
+Runs against a synthetic catalog (see synthetic_data.py), timing routes
+through the Flask test client and the database functions directly and
+measuring the memory held by the catalog records and the bytes each named
+projection (CATALOG_PROJECTIONS) reads for the full catalog, and writes the results
+to JSON so runs on different commits can be compared.
+
+Usage:
+    python benchmark.py --generate                       # Build bench.db with defaults, then run
+    python benchmark.py --db bench.db --repeat 30 --output results/$(git rev-parse --short HEAD).json
+    python benchmark.py --compare results/old.json results/new.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Benchmarks measure the code, not the slow-query logger
+os.environ.setdefault('SLOW_QUERY_MS', '-1')
+
+import database
+import synthetic_data
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Length of the id lists for the batch-lookup benchmarks
+BATCH_IDS = 10000
+
+# Fields a listing card reads (the memory benchmark touches these after loading)
+CARD_FIELDS = ('id', 'title', 'image_url', 'console', 'consoles', 'base_game', 'author', 'game_series', 'popular')
+
+
+def _summarize(samples):
+    samples = sorted(samples)
+    return {
+        'runs': len(samples),
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+    }
+
+
+def _time(fn, repeat, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return _summarize(samples)
+
+
+def _connect(db_path):
+    """Connection to db_path with its analytics database attached."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('ATTACH DATABASE ? AS analytics', (database.get_analytics_db_path(db_path),))
+    return conn
+
+
+def _sample_ids(db_path):
+    """Pick representative ids: the most and least downloaded game, a port, a hub."""
+    conn = _connect(db_path)
+    try:
+        top_game = conn.execute('''
+            SELECT g.id FROM games g
+            JOIN item_keys k ON k.item_id = g.id
+            JOIN download_totals t ON t.item_key = k.item_key
+            ORDER BY t.download_count DESC LIMIT 1
+        ''').fetchone()[0]
+        tail_game = conn.execute('''
+            SELECT g.id FROM games g
+            LEFT JOIN item_keys k ON k.item_id = g.id
+            LEFT JOIN download_totals t ON t.item_key = k.item_key
+            ORDER BY COALESCE(t.download_count, 0) ASC LIMIT 1
+        ''').fetchone()[0]
+        port = conn.execute('SELECT id FROM ports LIMIT 1').fetchone()[0]
+        reviewed = conn.execute('''
+            SELECT game_id FROM reviews WHERE game_type = 'romhack'
+            GROUP BY game_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()[0]
+        all_ids = [row[0] for row in conn.execute('SELECT id FROM games UNION ALL SELECT id FROM ports')]
+        review_ids = [row[0] for row in conn.execute('SELECT id FROM reviews ORDER BY id LIMIT ?', (BATCH_IDS,))]
+        voter = conn.execute('''
+            SELECT voter_username FROM review_votes
+            GROUP BY voter_username ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()
+    finally:
+        conn.close()
+    # Batch lookups of BATCH_IDS ids: the whole catalog, topped up with ids that do not exist
+    batch_ids = (all_ids + [f'missing-{n}' for n in range(BATCH_IDS)])[:BATCH_IDS]
+    return {'top_game': top_game, 'tail_game': tail_game, 'port': port,
+            'reviewed_game': reviewed, 'all_ids': all_ids, 'batch_ids': batch_ids,
+            'review_ids': review_ids, 'voter': voter[0] if voter else 'nobody'}
+
+
+def bench_routes(client, ids, repeat):
+    routes = {
+        'GET /': '/',
+        'GET /romhacks': '/romhacks',
+        'GET /ports': '/ports',
+        'GET /game/<top>': f"/game/{ids['top_game']}",
+        'GET /game/<tail>': f"/game/{ids['tail_game']}",
+        'GET /port/<id>': f"/port/{ids['port']}",
+        'GET /pokemon-rom-hacks': '/pokemon-rom-hacks',
+        'GET /pokemon-emerald-rom-hacks': '/pokemon-emerald-rom-hacks',
+        'GET /sitemap.xml': '/sitemap.xml',
+        'GET /api/reviews/<id>': f"/api/reviews/{ids['reviewed_game']}",
+    }
+    results = {}
+    for name, path in routes.items():
+        def request_once(path=path):
+            response = client.get(path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+        results[name] = _time(request_once, repeat)
+        print(f"  {name:<34} median {results[name]['median_ms']:9.2f}ms  p95 {results[name]['p95_ms']:9.2f}ms")
+
+    counter = iter(range(10 ** 9))
+
+    def track_once():
+        n = next(counter)
+        response = client.post(f"/api/track-download/{ids['top_game']}",
+                               environ_base={'REMOTE_ADDR': f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"})
+        if response.status_code >= 400:
+            raise RuntimeError(f"track-download returned {response.status_code}")
+    results['POST /api/track-download/<id>'] = _time(track_once, repeat)
+    r = results['POST /api/track-download/<id>']
+    print(f"  {'POST /api/track-download/<id>':<34} median {r['median_ms']:9.2f}ms  p95 {r['p95_ms']:9.2f}ms")
+    return results
+
+
+def bench_database(ids, repeat):
+    all_ids = ids['all_ids']
+    page_ids = all_ids[:60]
+    batch_ids = ids['batch_ids']
+    # Admin table scrolled near the end: by offset (a jump) and by the previous page's cursor
+    _, total, _ = database.get_catalog_page('game', limit=1)
+    deep_offset = max(total - 100, 0)
+    deep_cursor = database.get_catalog_page('game', offset=max(deep_offset - 50, 0))[2]
+    functions = {
+        'get_games': lambda: database.get_games(),
+        'get_ports': lambda: database.get_ports(),
+        'get_games(card)': lambda: database.get_games('card'),
+        'get_games(sitemap)': lambda: database.get_games('sitemap'),
+        'get_game_by_id': lambda: database.get_game_by_id(ids['top_game']),
+        'get_download_count': lambda: database.get_download_count(ids['top_game']),
+        'get_download_counts_for_ids(60)': lambda: database.get_download_counts_for_ids(page_ids),
+        'get_download_counts_for_ids(all)': lambda: database.get_download_counts_for_ids(all_ids),
+        'get_monthly_download_counts': lambda: database.get_monthly_download_counts(),
+        'get_monthly_download_counts_for_ids(60)': lambda: database.get_monthly_download_counts_for_ids(page_ids),
+        'get_reviews': lambda: database.get_reviews(ids['reviewed_game']),
+        'get_review_stats': lambda: database.get_review_stats(ids['reviewed_game']),
+        'get_review_stats_batch(60)': lambda: database.get_review_stats_batch(page_ids),
+        'get_download_counts_for_ids(10k)': lambda: database.get_download_counts_for_ids(batch_ids),
+        'get_monthly_download_counts_for_ids(10k)': lambda: database.get_monthly_download_counts_for_ids(batch_ids),
+        'get_review_stats_batch(10k)': lambda: database.get_review_stats_batch(batch_ids),
+        'get_user_votes(10k)': lambda: database.get_user_votes(ids['review_ids'], ids['voter']),
+        'get_catalog_page(downloads)': lambda: database.get_catalog_page('game', sort='downloads', order='desc'),
+        'get_catalog_page(search)': lambda: database.get_catalog_page('game', search='pokemon'),
+        'get_catalog_page(title, deep offset)': lambda: database.get_catalog_page('game', offset=deep_offset),
+        'get_catalog_page(title, deep cursor)': lambda: database.get_catalog_page('game', after=deep_cursor),
+    }
+    results = {}
+    for name, fn in functions.items():
+        results[name] = _time(fn, repeat)
+        print(f"  {name:<42} median {results[name]['median_ms']:9.2f}ms  p95 {results[name]['p95_ms']:9.2f}ms")
+    return results
+
+
+def bench_memory():
+    """Python heap held by the catalog records, per 10k items (tracemalloc).
+
+    'loaded' is right after get_games()/get_ports(); 'cards' after reading
+    the fields a listing card shows, which is what a hub page or the sitemap
+    leaves behind.
+    """
+    results = {}
+    for name, fn in (('get_games', database.get_games), ('get_ports', database.get_ports)):
+        gc.collect()
+        tracemalloc.start()
+        records = fn()
+        loaded = tracemalloc.get_traced_memory()[0]
+        for record in records:
+            for field in CARD_FIELDS:
+                record.get(field)
+        cards = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        per_10k = 10000 / max(len(records), 1) / 1024 / 1024
+        results[name] = {'items': len(records),
+                         'loaded_mb_per_10k': round(loaded * per_10k, 2),
+                         'cards_mb_per_10k': round(cards * per_10k, 2)}
+        print(f"  {name:<42} {results[name]['loaded_mb_per_10k']:7.2f} MB/10k loaded  "
+              f"{results[name]['cards_mb_per_10k']:7.2f} MB/10k after card fields")
+        del records
+    return results
+
+
+def bench_projections(repeat):
+    """Full-catalog read per named projection: bytes of column values fetched and time."""
+    results = {}
+    for projection in database.CATALOG_PROJECTIONS:
+        for table in ('games', 'ports'):
+            sql = f'SELECT {database._projection_sql(projection, is_port=table == "ports")} FROM {table}'
+
+            def read_all(sql=sql):
+                conn = database.get_db_connection()
+                try:
+                    return conn.execute(sql).fetchall()
+                finally:
+                    conn.close()
+            rows = read_all()
+            fetched = sum(len(value) for row in rows for value in row if isinstance(value, (str, bytes)))
+            name = f'{table} {projection}'
+            results[name] = {'rows': len(rows), 'columns': len(rows[0]) if rows else 0,
+                             'mb_read': round(fetched / 1024 / 1024, 2), **_time(read_all, repeat)}
+            print(f"  {name:<42} {results[name]['mb_read']:8.2f} MB  median {results[name]['median_ms']:9.2f}ms")
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _dataset(db_path):
+    conn = _connect(db_path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('games', 'ports', 'downloads', 'monthly_downloads', 'reviews', 'review_votes')}
+    finally:
+        conn.close()
+
+
+def run(db_path, repeat):
+    db_path = os.path.abspath(db_path)
+    database.DB_PATH = db_path
+    ids = _sample_ids(db_path)
+    dataset = _dataset(db_path)
+
+    # Keep the limiter/metrics/slow-query side files out of the working tree
+    workdir = tempfile.mkdtemp(prefix='romhacks-bench-')
+    os.chdir(workdir)
+    import app as app_module
+    flask_app = app_module.create_app()
+    flask_app.config['TESTING'] = True
+    app_module.limiter.enabled = False
+    client = flask_app.test_client()
+
+    print(f"Dataset: {', '.join(f'{k}={v:,}' for k, v in dataset.items())}")
+    print(f"\nRoutes ({repeat} runs each):")
+    routes = bench_routes(client, ids, repeat)
+    print(f"\nDatabase functions ({repeat} runs each):")
+    functions = bench_database(ids, repeat)
+    print("\nMemory (tracemalloc):")
+    memory = bench_memory()
+    print(f"\nProjections ({repeat} runs each):")
+    projections = bench_projections(repeat)
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'db_path': db_path,
+            'dataset': dataset,
+        },
+        'routes': routes,
+        'database': functions,
+        'memory': memory,
+        'projections': projections,
+    }
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"Comparing {old['meta'].get('revision')} -> {new['meta'].get('revision')} (median ms)\n")
+    for section in ('routes', 'database'):
+        print(f"{section.capitalize()}:")
+        for name, result in new[section].items():
+            before = old.get(section, {}).get(name)
+            if before is None:
+                print(f"  {name:<42} {'':>9}   {result['median_ms']:9.2f}   (new)")
+                continue
+            change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+            marker = '✗' if change > 10 else ('✓' if change < -10 else ' ')
+            print(f"  {name:<42} {before['median_ms']:9.2f} → {result['median_ms']:9.2f}  {change:+6.1f}% {marker}")
+        print()
+    if 'memory' in new:
+        print("Memory (MB per 10k items, loaded / after card fields):")
+        for name, result in new['memory'].items():
+            before = old.get('memory', {}).get(name)
+            was = f"{before['loaded_mb_per_10k']:6.2f} / {before['cards_mb_per_10k']:6.2f} → " if before else '(new) '
+            print(f"  {name:<42} {was}{result['loaded_mb_per_10k']:6.2f} / {result['cards_mb_per_10k']:6.2f}")
+        print()
+    if 'projections' in new:
+        print("Projections (MB read, median ms):")
+        for name, result in new['projections'].items():
+            before = old.get('projections', {}).get(name)
+            was = f"{before['mb_read']:8.2f} MB {before['median_ms']:9.2f} → " if before else '(new) '
+            print(f"  {name:<42} {was}{result['mb_read']:8.2f} MB {result['median_ms']:9.2f}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark key routes and database functions')
+    parser.add_argument('--db', default='bench.db', help='Benchmark database (default: bench.db)')
+    parser.add_argument('--generate', action='store_true', help='(Re)generate the database with synthetic_data.py first')
+    parser.add_argument('--games', type=int, default=2000, help='With --generate: number of games')
+    parser.add_argument('--downloads', type=int, default=1_000_000, help='With --generate: number of downloads')
+    parser.add_argument('--seed', type=int, default=42, help='With --generate: random seed')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per benchmark (default: 20)')
+    parser.add_argument('--output', help='Write results JSON here (default: bench-<revision>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    if args.generate or not os.path.exists(args.db):
+        print(f"Generating {args.db}...")
+        counts = synthetic_data.generate(args.db, games=args.games, downloads=args.downloads, seed=args.seed)
+        print(f"✓ Generated: {', '.join(f'{k}={v:,}' for k, v in counts.items())}\n")
+
+    output = os.path.abspath(args.output or f"bench-{_git_revision() or 'local'}.json")
+    results = run(args.db, args.repeat)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Cache tags (surrogate keys) for a caching proxy in front of the app.
+
+Views tag their response with the entities it shows: item:<id> for game and
+port pages, hub:<slug> for base game hubs and listing:<name> for /,
+/romhacks, /ports and the sitemap. The tags go out in a Surrogate-Key
+header. When PROXY_CACHE_SECONDS is set, tagged responses to anonymous
+GETs also get X-Accel-Expires, so nginx's proxy_cache keeps them that long
+(browsers still revalidate per Cache-Control), and the URL is recorded
+under each of its tags in CACHE_TAGS_DB.
+
+Admin writes call purge() with the tags they touched, which hands every
+recorded URL for those tags to the configured hook:
+
+    CACHE_PURGE_URL   GET <CACHE_PURGE_URL><url> per URL, e.g. the
+                      localhost ngx_cache_purge server in nginx.conf
+    CACHE_PURGE_FILE  append the URLs to this file; `drain` deletes their
+                      entries from the nginx cache directory (stock nginx)
+
+Usage:
+    python cache_tags.py urls item:some-game-id hub:pokemon
+    python cache_tags.py drain --cache-dir /var/cache/nginx/romhacks        # run every minute
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+PROXY_CACHE_SECONDS = int(os.environ.get('PROXY_CACHE_SECONDS', '0'))
+CACHE_TAGS_DB = os.environ.get('CACHE_TAGS_DB', 'cache_tags.db')
+CACHE_PURGE_URL = os.environ.get('CACHE_PURGE_URL', '')
+CACHE_PURGE_FILE = os.environ.get('CACHE_PURGE_FILE', '')
+PURGE_TIMEOUT = 2.0
+HEADER = 'Surrogate-Key'
+
+# (tag, url) -> when this process last recorded it. A URL is re-recorded after
+# half a cache lifetime, so rows older than two lifetimes belong to expired entries.
+_recorded = {}
+_RECORDED_MAX = 50000
+
+
+def normalize(tag):
+    """Tags are header tokens: percent-encode anything outside a safe ASCII set."""
+    return quote(str(tag).strip().lower(), safe=':-_.~')
+
+
+def tag(*tags):
+    """Add tags to the response of the current request."""
+    from flask import g
+    g.setdefault('cache_tags', []).extend(normalize(t) for t in tags)
+
+
+def _connect():
+    conn = sqlite3.connect(CACHE_TAGS_DB, timeout=1)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cache_tag_urls (
+            tag TEXT NOT NULL,
+            url TEXT NOT NULL,
+            recorded_at REAL NOT NULL,
+            PRIMARY KEY (tag, url)
+        ) WITHOUT ROWID
+    ''')
+    return conn
+
+
+def record(tags, url):
+    """Remember that url is cached under tags (at most once per half cache lifetime)."""
+    now = time.time()
+    stale = [t for t in tags if now - _recorded.get((t, url), 0) > PROXY_CACHE_SECONDS / 2]
+    if not stale:
+        return
+    try:
+        conn = _connect()
+        try:
+            conn.executemany('INSERT OR REPLACE INTO cache_tag_urls (tag, url, recorded_at) VALUES (?, ?, ?)',
+                             [(t, url, now) for t in stale])
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        # Tagging must never fail the response
+        print(f"Error recording cache tags: {e}")
+        return
+    if len(_recorded) >= _RECORDED_MAX:
+        _recorded.clear()
+    _recorded.update(((t, url), now) for t in stale)
+
+
+def urls_for_tags(tags):
+    tags = sorted({normalize(t) for t in tags})
+    if not tags:
+        return []
+    conn = _connect()
+    try:
+        placeholders = ', '.join('?' * len(tags))
+        return [row[0] for row in conn.execute(
+            f'SELECT DISTINCT url FROM cache_tag_urls WHERE tag IN ({placeholders}) ORDER BY url', tags)]
+    finally:
+        conn.close()
+
+
+def _purge_http(urls):
+    for url in urls:
+        try:
+            with urllib.request.urlopen(CACHE_PURGE_URL.rstrip('/') + url, timeout=PURGE_TIMEOUT) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            # ngx_cache_purge answers 404 when the URL was not cached
+            if e.code != 404:
+                print(f"Cache purge failed for {url}: HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Cache purge failed for {url}: {e}")
+
+
+def _purge_file(urls):
+    with open(CACHE_PURGE_FILE, 'a', encoding='utf-8') as f:
+        f.write(''.join(url + '\n' for url in urls))
+
+
+def purge(tags):
+    """Send every URL cached under any of tags to the purge hook. Returns the URLs."""
+    if not (CACHE_PURGE_URL or CACHE_PURGE_FILE):
+        return []
+    try:
+        urls = urls_for_tags(tags)
+        conn = _connect()
+        try:
+            conn.execute('DELETE FROM cache_tag_urls WHERE recorded_at < ?',
+                         (time.time() - 2 * max(PROXY_CACHE_SECONDS, 60),))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading cache tags: {e}")
+        return []
+    if urls:
+        if CACHE_PURGE_URL:
+            _purge_http(urls)
+        else:
+            _purge_file(urls)
+    return urls
+
+
+# --- Flask integration ----------------------------------------------------------
+
+def _request_uri():
+    """The URI as nginx saw it ($request_uri), which is the proxy_cache_key."""
+    from flask import request
+    raw = request.environ.get('RAW_URI') or request.environ.get('REQUEST_URI')
+    if raw:
+        return raw
+    query = request.query_string.decode('latin-1')
+    return quote(request.path) + (f'?{query}' if query else '')
+
+
+def init_app(app):
+    """Send the Surrogate-Key header and record cacheable tagged responses."""
+    from flask import g, request
+
+    @app.after_request
+    def _send_cache_tags(response):
+        tags = g.pop('cache_tags', None)
+        if not tags or request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        tags = list(dict.fromkeys(tags))
+        response.headers[HEADER] = ' '.join(tags)
+        # Session holders (admins, RetroAchievements users) bypass the proxy cache
+        if PROXY_CACHE_SECONDS > 0 and not request.cookies.get(app.config['SESSION_COOKIE_NAME']):
+            response.headers['X-Accel-Expires'] = str(PROXY_CACHE_SECONDS)
+            record(tags, _request_uri())
+        return response
+
+
+# --- Purge-file drain -----------------------------------------------------------
+
+def cache_file_path(cache_dir, key, levels='1:2'):
+    """Path of key's entry in an nginx proxy_cache_path directory."""
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    parts = []
+    end = len(digest)
+    for width in (int(level) for level in levels.split(':') if level):
+        parts.append(digest[end - width:end])
+        end -= width
+    return os.path.join(cache_dir, *parts, digest)
+
+
+def drain(cache_dir, levels='1:2', purge_file=None):
+    """Delete the cache entries listed in the purge file. Returns (urls, entries deleted)."""
+    purge_file = purge_file or CACHE_PURGE_FILE
+    draining = purge_file + '.draining'
+    if os.path.exists(purge_file):
+        # Take the file over (purge() starts a new one); leftovers of an
+        # interrupted drain are processed along with the new URLs
+        taken = draining + '.new'
+        os.replace(purge_file, taken)
+        with open(taken, encoding='utf-8') as src, open(draining, 'a', encoding='utf-8') as dst:
+            dst.write(src.read())
+        os.remove(taken)
+    if not os.path.exists(draining):
+        return 0, 0
+    with open(draining, encoding='utf-8') as f:
+        urls = {line.strip() for line in f if line.strip()}
+    deleted = 0
+    for url in urls:
+        try:
+            os.remove(cache_file_path(cache_dir, url, levels))
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    os.remove(draining)
+    return len(urls), deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect cache tags or drain the purge file')
+    sub = parser.add_subparsers(dest='command', required=True)
+    urls_parser = sub.add_parser('urls', help='List the URLs recorded under tags')
+    urls_parser.add_argument('tags', nargs='+')
+    drain_parser = sub.add_parser('drain', help='Delete purged URLs from the nginx cache directory')
+    drain_parser.add_argument('--cache-dir', required=True, help='proxy_cache_path directory')
+    drain_parser.add_argument('--levels', default='1:2', help='proxy_cache_path levels (default: 1:2)')
+    drain_parser.add_argument('--purge-file', help='Default: CACHE_PURGE_FILE')
+    args = parser.parse_args()
+
+    if args.command == 'urls':
+        for url in urls_for_tags(args.tags):
+            print(url)
+        return 0
+    if not (args.purge_file or CACHE_PURGE_FILE):
+        print("✗ No purge file: set CACHE_PURGE_FILE or pass --purge-file")
+        return 1
+    urls, deleted = drain(args.cache_dir, args.levels, args.purge_file)
+    print(f"✓ {urls} purged URLs, {deleted} cache entries deleted")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
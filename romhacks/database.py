@@ -1,10 +1,55 @@
 import sqlite3
 import json
 import os
-from datetime import datetime
+import re
+import csv
+import gzip
+from datetime import date, datetime, timedelta
 import hashlib
+import time
+from collections.abc import MutableMapping
+
+from request_metrics import TimedConnection
 
 DB_PATH = 'requests.db'
+# Seconds a connection waits on a locked database before raising "database is locked"
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', '5'))
+
+# Download analytics (downloads, monthly_downloads, download_totals) live in their
+# own database file so high-frequency download writes never lock the catalog and
+# the file can be backed up on its own schedule. Empty = analytics.db next to DB_PATH.
+ANALYTICS_DB_PATH = os.environ.get('ANALYTICS_DB_PATH', '')
+# WAL pages the analytics database accumulates before a commit checkpoints it;
+# larger than SQLite's default (1000) so download writes rarely pay for a checkpoint
+ANALYTICS_WAL_AUTOCHECKPOINT = int(os.environ.get('ANALYTICS_WAL_AUTOCHECKPOINT', '4000'))
+ANALYTICS_TABLES = ('downloads', 'monthly_downloads', 'download_totals')
+# monthly_downloads is partitioned into one table per month (monthly_downloads_YYYY_MM)
+# behind a view. Months older than this many (counting the current one) are moved
+# into gzip CSV files in ANALYTICS_ARCHIVE_DIR by archive_cold_monthly_downloads().
+MONTHLY_DOWNLOADS_RETENTION_MONTHS = int(os.environ.get('MONTHLY_DOWNLOADS_RETENTION_MONTHS', '3'))
+ANALYTICS_ARCHIVE_DIR = os.environ.get('ANALYTICS_ARCHIVE_DIR', '')
+# batch_lookup(): id lists up to BATCH_JSON_THRESHOLD are bound as IN (?, ...)
+# chunks padded to one of BATCH_IN_SIZES, so only a few statement shapes exist and
+# repeated chunks reuse the prepared statement; longer lists go through json_each(?).
+BATCH_IN_SIZES = (8, 32, 100)
+BATCH_JSON_THRESHOLD = 500
+# Popular sections read a top-LEADERBOARD_SIZE leaderboard per item type for the
+# current month and for all time, kept up to date by track_download(). Each
+# process caches boards it has read for LEADERBOARD_CACHE_SECONDS.
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', '50'))
+LEADERBOARD_CACHE_SECONDS = float(os.environ.get('LEADERBOARD_CACHE_SECONDS', '30'))
+# Trending: every download adds 1 to the item's score and decay_trending() (run
+# from cron) halves all scores per TRENDING_HALF_LIFE_DAYS since its last run.
+# Scores that decay below TRENDING_MIN_SCORE are dropped.
+TRENDING_HALF_LIFE_DAYS = float(os.environ.get('TRENDING_HALF_LIFE_DAYS', '3'))
+TRENDING_MIN_SCORE = 0.01
+# Download graphs: /api/stats/<id> serves daily_downloads for one of STATS_RANGES,
+# cached per process for STATS_CACHE_SECONDS. Buckets older than
+# DAILY_DOWNLOADS_RETENTION_DAYS are pruned by prune_daily_downloads().
+STATS_RANGES = {'30d': 30, '90d': 90, '1y': 365}
+STATS_CACHE_SECONDS = float(os.environ.get('STATS_CACHE_SECONDS', '300'))
+STATS_CACHE_MAX_ENTRIES = 5000
+DAILY_DOWNLOADS_RETENTION_DAYS = int(os.environ.get('DAILY_DOWNLOADS_RETENTION_DAYS', '400'))
 
 
 # ============================================
@@ -36,37 +81,37 @@ FILTER_CONFIGS = {
     # },
 }
 
+# Series detection rules, in priority order (the first series with a match wins)
+SERIES_PATTERNS = {
+    'Pokemon': ['pokemon', 'pokémon'],
+    'Mario': ['mario', 'smb', 'super mario'],
+    'Zelda': ['zelda'],
+    'Metroid': ['metroid'],
+    'Kirby': ['kirby'],
+    'Sonic': ['sonic'],
+    'Mega Man': ['mega man', 'megaman', 'rockman'],
+    'Final Fantasy': ['final fantasy'],
+    'Dragon Quest': ['dragon quest'],
+    'Fire Emblem': ['fire emblem'],
+    'Castlevania': ['castlevania'],
+    'Contra': ['contra'],
+    'Street Fighter': ['street fighter'],
+    'Mortal Kombat': ['mortal kombat'],
+}
+
+# Compiled once: (pattern, series) pairs in priority order, checked in a single pass.
+# (A regex alternation over the same patterns measured slower on these short strings.)
+_SERIES_RULES = tuple((pattern, series) for series, patterns in SERIES_PATTERNS.items() for pattern in patterns)
+
 def _auto_detect_series(base_game, title):
     """Auto-detect game series from base_game or title"""
     if not base_game and not title:
         return None
     
-    # Normalize strings for comparison
     text = (base_game or title).lower()
-    
-    # Series detection rules
-    series_patterns = {
-        'Pokemon': ['pokemon', 'pokémon'],
-        'Mario': ['mario', 'smb', 'super mario'],
-        'Zelda': ['zelda'],
-        'Metroid': ['metroid'],
-        'Kirby': ['kirby'],
-        'Sonic': ['sonic'],
-        'Mega Man': ['mega man', 'megaman', 'rockman'],
-        'Final Fantasy': ['final fantasy'],
-        'Dragon Quest': ['dragon quest'],
-        'Fire Emblem': ['fire emblem'],
-        'Castlevania': ['castlevania'],
-        'Contra': ['contra'],
-        'Street Fighter': ['street fighter'],
-        'Mortal Kombat': ['mortal kombat'],
-    }
-    
-    for series, patterns in series_patterns.items():
-        for pattern in patterns:
-            if pattern in text:
-                return series
-    
+    for pattern, series in _SERIES_RULES:
+        if pattern in text:
+            return series
     return None
 
 def get_filter_value(record, filter_name):
@@ -142,12 +187,962 @@ def _normalize_consoles(value):
         out.append(token)
     return out
 
+def _parse_image_variants(value):
+    """Decode the image_variants JSON column into a dict keyed by source image URL.
+
+    Each entry looks like (source: hash of the source bytes, which keys the objects):
+        {"width": 1920, "height": 1080, "source": "3f2a...",
+         "variants": {"webp": [[url, w, h], ...], "avif": [[url, w, h], ...]}}
+    """
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+def _json_list(value):
+    """Decode a JSON list column (features, screenshots); empty -> []"""
+    return json.loads(value) if value else []
+
+def _mod_links(value):
+    if not value:
+        return value
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+class CatalogRecord(MutableMapping):
+    """One games/ports row that behaves like the dict the routes and templates expect.
+
+    The column values stay in the sqlite3.Row (no per-item dict); JSON and
+    derived keys (features, screenshots, consoles, ...) are decoded on first
+    access and kept in a small overlay dict, which also holds any keys the
+    routes add (download_count, trending_score, ...).
+    """
+    __slots__ = ('_columns', '_row', '_overlay')
+
+    # key -> function(record) that decodes it from the raw columns
+    _derived = {}
+    _DELETED = object()
+
+    def __init__(self, columns, row):
+        self._columns = columns  # {column name: index}, shared by every row of a query
+        self._row = row
+        self._overlay = None
+
+    def raw(self, key, default=None):
+        """Undecoded column value"""
+        index = self._columns.get(key)
+        return default if index is None else self._row[index]
+
+    def __getitem__(self, key):
+        overlay = self._overlay
+        if overlay is not None and key in overlay:
+            value = overlay[key]
+            if value is self._DELETED:
+                raise KeyError(key)
+            return value
+        derive = self._derived.get(key)
+        if derive is not None:
+            value = derive(self)
+            if overlay is None:
+                overlay = self._overlay = {}
+            overlay[key] = value
+            return value
+        return self._row[self._columns[key]]
+
+    def __setitem__(self, key, value):
+        if self._overlay is None:
+            self._overlay = {}
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self[key] = self._DELETED
+
+    def __contains__(self, key):
+        overlay = self._overlay
+        if overlay is not None and key in overlay:
+            return overlay[key] is not self._DELETED
+        return key in self._derived or key in self._columns
+
+    def __iter__(self):
+        overlay = self._overlay or {}
+        for key in self._columns:
+            if overlay.get(key) is not self._DELETED:
+                yield key
+        for key in self._derived:
+            if key not in self._columns and overlay.get(key) is not self._DELETED:
+                yield key
+        for key, value in overlay.items():
+            if key not in self._columns and key not in self._derived and value is not self._DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Records for a list of sqlite3.Row from one query"""
+        if not rows:
+            return []
+        names = tuple(rows[0].keys())
+        columns = _column_maps.get(names)
+        if columns is None:
+            columns = _column_maps[names] = {name: index for index, name in enumerate(names)}
+        return [cls(columns, row) for row in rows]
+
+# Column-name -> index maps, one per distinct SELECT column list
+_column_maps = {}
+
+def _filter_value(filter_name):
+    """Decoder for a FILTER_CONFIGS key: the stored value, else its auto-detected one"""
+    auto_detect = FILTER_CONFIGS[filter_name].get('auto_detect')
+    def derive(record):
+        value = record.raw(filter_name)
+        if not value and auto_detect:
+            value = auto_detect(record)
+        return value
+    return derive
+
+class Game(CatalogRecord):
+    __slots__ = ()
+    _derived = {
+        'consoles': lambda record: _normalize_consoles(record.raw('console')),
+        'features': lambda record: _json_list(record.raw('features')),
+        'screenshots': lambda record: _json_list(record.raw('screenshots')),
+        'image_variants': lambda record: _parse_image_variants(record.raw('image_variants')),
+        'popular': lambda record: bool(record.raw('popular')),
+        'online_play': lambda record: bool(record.raw('online_play')),
+        **{filter_name: _filter_value(filter_name) for filter_name in FILTER_CONFIGS},
+    }
+
+class Port(CatalogRecord):
+    __slots__ = ()
+    _derived = {
+        **Game._derived,
+        'mod_links': lambda record: _mod_links(record.raw('mod_links')),
+    }
+
+# Named column lists for catalog reads. Listings only need the card columns, not
+# the description-sized instructions_*, instruction_text and social_links text
+# every SELECT * drags along; 'detail' (None) is the full row.
+_CARD_COLUMNS = ('id', 'title', 'console', 'author', 'base_game', 'description', 'image_url',
+                 'image_variants', 'release_date', 'online_play', *FILTER_CONFIGS)
+CATALOG_PROJECTIONS = {
+    'card': _CARD_COLUMNS,
+    'hub': _CARD_COLUMNS + ('version', 'features'),
+    # Served from idx_{table}_base_game alone (covering index)
+    'sitemap': ('id', 'base_game'),
+    'admin-row': ('id', 'title', 'console', 'base_game', 'author', 'image_url', 'popular', 'created_at'),
+    'detail': None,
+}
+# Extra columns port cards show (platform badge, mod links)
+PORT_PROJECTION_COLUMNS = {
+    'card': ('original_platform', 'mod_links', 'mod_instructions'),
+}
+
+def _projection_sql(projection, is_port=False, alias=None):
+    """SELECT column list for a named projection ('*' for detail)"""
+    if projection not in CATALOG_PROJECTIONS:
+        raise ValueError(f"Unknown catalog projection: {projection}")
+    columns = CATALOG_PROJECTIONS[projection]
+    if columns is None:
+        return f'{alias}.*' if alias else '*'
+    if is_port:
+        columns += PORT_PROJECTION_COLUMNS.get(projection, ())
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(prefix + column for column in columns)
+
 def get_db_connection():
     """Get a database connection"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT, factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def get_analytics_db_path(db_path=None):
+    """Path of the analytics database belonging to db_path (default: the live DB_PATH)"""
+    if db_path is None and ANALYTICS_DB_PATH:
+        return ANALYTICS_DB_PATH
+    return os.path.join(os.path.dirname(db_path or DB_PATH), 'analytics.db')
+
+def get_analytics_connection(for_write=False):
+    """Get a connection to the download analytics database"""
+    conn = sqlite3.connect(get_analytics_db_path(), timeout=DB_BUSY_TIMEOUT, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
+    if for_write:
+        # Losing the last few downloads on power loss is acceptable; an fsync per download is not
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA wal_autocheckpoint = {ANALYTICS_WAL_AUTOCHECKPOINT}')
     return conn
 
+def attach_analytics(conn):
+    """ATTACH the analytics database to a catalog connection as schema `analytics`.
+
+    Only for queries that join analytics with catalog tables; everything else
+    should use get_analytics_connection() or get_db_connection() alone.
+    """
+    conn.execute('ATTACH DATABASE ? AS analytics', (get_analytics_db_path(),))
+    return conn
+
+def batch_lookup(conn, sql, ids, params=()):
+    """Run `sql` for a list of ids and return all result rows.
+
+    `sql` marks where the id set goes with {ids}, e.g. "WHERE game_id IN {ids}";
+    the ids are bound before `params`. Duplicate ids are dropped. Results from
+    separate chunks are concatenated, so a GROUP BY must include the id.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    if len(ids) > BATCH_JSON_THRESHOLD:
+        # One statement and one bound parameter regardless of the list length
+        return conn.execute(sql.format(ids='(SELECT value FROM json_each(?))'),
+                            (json.dumps(ids), *params)).fetchall()
+
+    rows = []
+    chunk_size = BATCH_IN_SIZES[-1]
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        size = next(s for s in BATCH_IN_SIZES if s >= len(chunk))
+        # Pad with a repeated id so the statement text depends only on `size`
+        chunk += [chunk[-1]] * (size - len(chunk))
+        placeholders = ','.join('?' * size)
+        rows.extend(conn.execute(sql.format(ids=f'({placeholders})'), (*chunk, *params)).fetchall())
+    return rows
+
+def init_analytics_db():
+    """Initialize the analytics database schema (WAL mode)"""
+    conn = get_analytics_connection(for_write=True)
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode = WAL')
+
+    # Databases from before item keys store TEXT game_id/ip_hash columns
+    cursor.execute('PRAGMA table_info(downloads)')
+    if 'game_id' in {row[1] for row in cursor.fetchall()}:
+        _convert_text_analytics(conn)
+
+    _create_analytics_tables(conn)
+    cursor.execute('PRAGMA table_info(item_keys)')
+    if 'item_type' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE item_keys ADD COLUMN item_type TEXT')
+    conn.commit()
+    _ensure_month_table(conn, datetime.now().strftime('%Y-%m'))
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'monthly_downloads'")
+    if not cursor.fetchone():
+        _rebuild_monthly_view(conn)
+        conn.commit()
+    # Databases from before daily buckets: fill them from the hot months
+    if cursor.execute('SELECT 1 FROM daily_downloads LIMIT 1').fetchone() is None:
+        rebuild_daily_downloads(conn)
+        conn.commit()
+    conn.close()
+
+def _create_analytics_tables(conn, schema='main'):
+    # Integer surrogate key for each game/port id seen by the analytics tables;
+    # the TEXT ids stay in the catalog and the API
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.item_keys (
+            item_key INTEGER PRIMARY KEY,
+            item_id TEXT NOT NULL UNIQUE,
+            item_type TEXT
+        )
+    ''')
+
+    # One row per unique (item, IP) download. ip_hash is the 64-bit IP hash as an
+    # integer (see ip_hash_key); the primary key is the only index.
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.downloads (
+            item_key INTEGER NOT NULL,
+            ip_hash INTEGER NOT NULL,
+            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (item_key, ip_hash)
+        ) WITHOUT ROWID
+    ''')
+
+    # Per-item unique download totals, maintained by track_download() so catalog
+    # listings can sort by downloads without aggregating the downloads table
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.download_totals (
+            item_key INTEGER PRIMARY KEY,
+            download_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Top LEADERBOARD_SIZE items per board: '<type>:all' ranks by all-time downloads,
+    # '<type>:YYYY-MM' by that month's downloads with all-time downloads as tiebreak
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.leaderboard (
+            board TEXT NOT NULL,
+            item_key INTEGER NOT NULL,
+            score INTEGER NOT NULL,
+            tiebreak INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (board, item_key)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_leaderboard_rank ON leaderboard (board, score, tiebreak)')
+
+    # Downloads per item per UTC day (unique per IP and month, like monthly_downloads)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.daily_downloads (
+            item_key INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            download_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (item_key, day)
+        ) WITHOUT ROWID
+    ''')
+
+    # Exponentially decayed download score per item (see decay_trending)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.trending (
+            item_key INTEGER PRIMARY KEY,
+            score REAL NOT NULL
+        )
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_trending_score ON trending (score)')
+
+    # Small bookkeeping values for the maintenance jobs (e.g. when trending was last decayed)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.analytics_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+def ip_hash_key(ip_hash):
+    """64-bit hex IP hash (hash_string) -> signed 8-byte integer for the analytics tables"""
+    return int.from_bytes(bytes.fromhex(ip_hash[:16]), 'big', signed=True)
+
+def _register_ip_hash_key(conn):
+    conn.create_function('ip_hash_key', 1, ip_hash_key, deterministic=True)
+
+_item_keys = {}
+
+def _get_item_key(conn, item_id):
+    """(item_key, item_type) for a game/port id, assigned on first use; cached per process.
+
+    item_type is None for ids that are not in the catalog.
+    """
+    cache_key = (get_analytics_db_path(), item_id)
+    item = _item_keys.get(cache_key)
+    if item is None:
+        row = conn.execute('SELECT item_key, item_type FROM item_keys WHERE item_id = ?', (item_id,)).fetchone()
+        if row is None:
+            conn.execute('INSERT OR IGNORE INTO item_keys (item_id) VALUES (?)', (item_id,))
+            row = conn.execute('SELECT item_key, item_type FROM item_keys WHERE item_id = ?', (item_id,)).fetchone()
+        item_key, item_type = row[0], row[1]
+        if item_type is None:
+            item_type = get_catalog_item_type(item_id)
+            if item_type:
+                conn.execute('UPDATE item_keys SET item_type = ? WHERE item_key = ?', (item_type, item_key))
+        item = _item_keys[cache_key] = (item_key, item_type)
+    return item
+
+def import_downloads(conn, source, schema='main'):
+    """Copy rows of a (game_id, ip_hash hex, downloaded_at) table into `schema`.downloads.
+
+    Assigns item keys as needed. Returns the number of rows copied.
+    """
+    _register_ip_hash_key(conn)
+    conn.execute(f'INSERT OR IGNORE INTO {schema}.item_keys (item_id) SELECT DISTINCT game_id FROM {source}')
+    cursor = conn.execute(f'''
+        INSERT OR IGNORE INTO {schema}.downloads (item_key, ip_hash, downloaded_at)
+        SELECT k.item_key, ip_hash_key(s.ip_hash), COALESCE(s.downloaded_at, CURRENT_TIMESTAMP)
+        FROM {source} s JOIN {schema}.item_keys k ON k.item_id = s.game_id
+    ''')
+    return cursor.rowcount
+
+def rebuild_download_totals(conn, schema='main'):
+    conn.execute(f'DELETE FROM {schema}.download_totals')
+    conn.execute(f'''
+        INSERT INTO {schema}.download_totals (item_key, download_count)
+        SELECT item_key, COUNT(*) FROM {schema}.downloads GROUP BY item_key
+    ''')
+
+def _convert_text_analytics(conn):
+    """Rewrite analytics tables keyed by TEXT game_id/ip_hash to item keys."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DROP VIEW IF EXISTS monthly_downloads')
+        old_months = get_monthly_partitions(conn)
+        for month in old_months:
+            conn.execute(f'ALTER TABLE {_monthly_table(month)} RENAME TO text_{_monthly_table(month)}')
+        has_flat_monthly = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_downloads'"
+        ).fetchone()
+        if has_flat_monthly:
+            conn.execute('ALTER TABLE monthly_downloads RENAME TO text_monthly_downloads')
+        conn.execute('ALTER TABLE downloads RENAME TO text_downloads')
+        conn.execute('DROP TABLE IF EXISTS download_totals')
+
+        _create_analytics_tables(conn)
+        import_downloads(conn, 'text_downloads')
+        for month in old_months:
+            partition_monthly_downloads(
+                conn, f"(SELECT game_id, ip_hash, '{month}' AS year_month, downloaded_at FROM text_{_monthly_table(month)})"
+            )
+            conn.execute(f'DROP TABLE text_{_monthly_table(month)}')
+        if has_flat_monthly:
+            partition_monthly_downloads(conn, 'text_monthly_downloads')
+            conn.execute('DROP TABLE text_monthly_downloads')
+        rebuild_download_totals(conn)
+        conn.execute('DROP TABLE text_downloads')
+        _rebuild_monthly_view(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+# --------------------------------------------
+# Monthly download partitions
+# --------------------------------------------
+
+_YEAR_MONTH = re.compile(r'^\d{4}-\d{2}$')
+_month_tables = set()
+
+def _monthly_table(year_month):
+    """Partition table name for a YYYY-MM month"""
+    if not _YEAR_MONTH.match(year_month or ''):
+        raise ValueError(f'Invalid year_month: {year_month!r}')
+    return 'monthly_downloads_' + year_month.replace('-', '_')
+
+def _create_month_table(conn, year_month, schema='main'):
+    table = _monthly_table(year_month)
+    # One row per (item, IP) per month; the primary key is the only index
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.{table} (
+            item_key INTEGER NOT NULL,
+            ip_hash INTEGER NOT NULL,
+            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (item_key, ip_hash)
+        ) WITHOUT ROWID
+    ''')
+    return table
+
+def get_monthly_partitions(conn=None, schema='main'):
+    """Months (YYYY-MM, ascending) that still have a hot partition table"""
+    own = conn is None
+    if own:
+        conn = get_analytics_connection()
+    rows = conn.execute(f'''
+        SELECT name FROM {schema}.sqlite_master
+        WHERE type = 'table' AND name GLOB 'monthly_downloads_[0-9][0-9][0-9][0-9]_[0-9][0-9]'
+        ORDER BY name
+    ''').fetchall()
+    if own:
+        conn.close()
+    return [row[0][-7:].replace('_', '-') for row in rows]
+
+def _rebuild_monthly_view(conn, schema='main'):
+    """(Re)create the monthly_downloads view over every hot partition"""
+    months = get_monthly_partitions(conn, schema)
+    if months:
+        body = '\nUNION ALL '.join(
+            f"SELECT item_key, ip_hash, '{month}' AS year_month, downloaded_at FROM {_monthly_table(month)}"
+            for month in months
+        )
+    else:
+        body = 'SELECT NULL AS item_key, NULL AS ip_hash, NULL AS year_month, NULL AS downloaded_at WHERE 0'
+    conn.execute(f'DROP VIEW IF EXISTS {schema}.monthly_downloads')
+    conn.execute(f'CREATE VIEW {schema}.monthly_downloads AS {body}')
+
+def _ensure_month_table(conn, year_month):
+    """Create the partition for year_month (and refresh the view) if needed; returns its name.
+
+    Known partitions are cached per process so the download path only pays
+    for this once per month.
+    """
+    table = _monthly_table(year_month)
+    key = (get_analytics_db_path(), table)
+    if key in _month_tables:
+        return table
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if not exists:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _create_month_table(conn, year_month)
+            _rebuild_monthly_view(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _month_tables.add(key)
+    return table
+
+def partition_monthly_downloads(conn, source, schema='main'):
+    """Copy rows of a flat (game_id, ip_hash hex, year_month, downloaded_at) table or
+    subquery into the month partitions of `schema`. Returns the number of rows copied."""
+    _register_ip_hash_key(conn)
+    conn.execute(f'INSERT OR IGNORE INTO {schema}.item_keys (item_id) SELECT DISTINCT game_id FROM {source}')
+    copied = 0
+    months = [row[0] for row in conn.execute(f'SELECT DISTINCT year_month FROM {source}')]
+    for year_month in months:
+        table = _create_month_table(conn, year_month, schema)
+        cursor = conn.execute(f'''
+            INSERT OR IGNORE INTO {schema}.{table} (item_key, ip_hash, downloaded_at)
+            SELECT k.item_key, ip_hash_key(s.ip_hash), COALESCE(s.downloaded_at, CURRENT_TIMESTAMP)
+            FROM {source} s JOIN {schema}.item_keys k ON k.item_id = s.game_id
+            WHERE s.year_month = ?
+        ''', (year_month,))
+        copied += cursor.rowcount
+    _rebuild_monthly_view(conn, schema)
+    return copied
+
+def _months_before(year_month, count):
+    year, month = int(year_month[:4]), int(year_month[5:])
+    month -= count
+    while month < 1:
+        year, month = year - 1, month + 12
+    return f"{year:04d}-{month:02d}"
+
+def get_analytics_archive_dir():
+    return ANALYTICS_ARCHIVE_DIR or os.path.join(os.path.dirname(get_analytics_db_path()), 'archive')
+
+def archive_cold_monthly_downloads(retention_months=None, archive_dir=None):
+    """Move month partitions older than the retention window into cold storage.
+
+    Each cold month is written to <archive_dir>/monthly_downloads_YYYY-MM.csv.gz
+    (game_id, integer ip_hash, downloaded_at) and its table dropped. A month is only
+    moved once archive_monthly_popular() has captured its rankings (it is run
+    here if it has not). Returns [(year_month, rows, path), ...].
+    """
+    retention_months = retention_months or MONTHLY_DOWNLOADS_RETENTION_MONTHS
+    archive_dir = archive_dir or get_analytics_archive_dir()
+    oldest_hot = _months_before(datetime.now().strftime('%Y-%m'), max(1, retention_months) - 1)
+    cold = [month for month in get_monthly_partitions() if month < oldest_hot]
+    if not cold:
+        return []
+    os.makedirs(archive_dir, exist_ok=True)
+
+    archived = []
+    for year_month in cold:
+        conn = get_db_connection()
+        has_rankings = conn.execute(
+            'SELECT 1 FROM monthly_popular_history WHERE year_month = ? LIMIT 1', (year_month,)
+        ).fetchone()
+        conn.close()
+        if not has_rankings:
+            archive_monthly_popular(year_month)
+
+        table = _monthly_table(year_month)
+        path = os.path.join(archive_dir, f'monthly_downloads_{year_month}.csv.gz')
+        conn = get_analytics_connection(for_write=True)
+        try:
+            rows = 0
+            with gzip.open(path + '.tmp', 'wt', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['game_id', 'ip_hash', 'downloaded_at'])
+                for row in conn.execute(f'''
+                    SELECT k.item_id, m.ip_hash, m.downloaded_at
+                    FROM {table} m JOIN item_keys k ON k.item_key = m.item_key
+                '''):
+                    writer.writerow(tuple(row))
+                    rows += 1
+            os.replace(path + '.tmp', path)
+
+            conn.execute('BEGIN IMMEDIATE')
+            expected = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            if expected != rows:
+                conn.rollback()
+                raise RuntimeError(f'{table} changed while archiving ({rows} written, {expected} now)')
+            conn.execute(f'DROP TABLE {table}')
+            _rebuild_monthly_view(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        _month_tables.discard((get_analytics_db_path(), table))
+        archived.append((year_month, rows, path))
+    return archived
+
+def migrate_analytics_tables():
+    """Move download analytics still stored in the catalog database into analytics.db.
+
+    Copies every row (INSERT OR IGNORE, so re-running after an interruption is
+    safe) into the item-keyed tables, rebuilds the download totals, then drops
+    the old tables. Returns {table: rows copied}, empty when there was nothing
+    to move.
+    """
+    conn = get_db_connection()
+    legacy = [
+        name for name in ANALYTICS_TABLES
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    ]
+    if not legacy:
+        conn.close()
+        return {}
+
+    init_analytics_db()
+    attach_analytics(conn)
+    copied = {}
+    try:
+        if 'downloads' in legacy:
+            copied['downloads'] = import_downloads(conn, 'main.downloads', 'analytics')
+        if 'monthly_downloads' in legacy:
+            copied['monthly_downloads'] = partition_monthly_downloads(conn, 'main.monthly_downloads', 'analytics')
+        rebuild_download_totals(conn, 'analytics')
+        for name in legacy:
+            conn.execute(f'DROP TABLE main.{name}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return copied
+
+# --- Popularity leaderboards --------------------------------------------------
+# Download counts only ever grow within a board's period, so a board holding the
+# top K items stays exact when each download either bumps an item already on it
+# or lets the item replace the board's lowest entry once it ranks higher.
+
+_leaderboards = {}
+_leaderboard_floors = {}
+
+def _leaderboard_name(item_type, period):
+    return f"{item_type}:{'all' if period == 'all' else period}"
+
+def _offer_leaderboard(conn, board, item_key, score, tiebreak):
+    """Put an item that is not on `board` onto it if it now ranks in the top K."""
+    cache_key = (get_analytics_db_path(), board)
+    # The lowest entry of a full board only ever rises, so a recently seen floor
+    # rules out most long-tail items without querying
+    floor = _leaderboard_floors.get(cache_key)
+    if floor and floor[0] > time.time() and (score, tiebreak) <= floor[1]:
+        return False
+
+    row = conn.execute('''
+        SELECT (SELECT COUNT(*) FROM leaderboard WHERE board = ?), item_key, score, tiebreak
+        FROM leaderboard WHERE board = ?
+        ORDER BY score, tiebreak LIMIT 1
+    ''', (board, board)).fetchone()
+    size = row[0] if row else 0
+    if size >= LEADERBOARD_SIZE:
+        lowest = (row[2], row[3])
+        _leaderboard_floors[cache_key] = (time.time() + LEADERBOARD_CACHE_SECONDS, lowest)
+        if (score, tiebreak) <= lowest:
+            return False
+        conn.execute('DELETE FROM leaderboard WHERE board = ? AND item_key = ?', (board, row[1]))
+    conn.execute('INSERT OR REPLACE INTO leaderboard (board, item_key, score, tiebreak) VALUES (?, ?, ?, ?)',
+                 (board, item_key, score, tiebreak))
+    return True
+
+def _update_leaderboards(conn, item_key, item_type, year_month, month_table, counted_month, total):
+    """Apply one download to the item's month and all-time boards.
+
+    `total` is the item's new all-time count when the download was new for
+    all time, otherwise None.
+    """
+    all_board = _leaderboard_name(item_type, 'all') if total is not None else None
+    month_board = _leaderboard_name(item_type, year_month) if counted_month else None
+    # Bump the item on whichever of its boards it is already on, in one statement
+    updated = {row[0] for row in conn.execute('''
+        UPDATE leaderboard
+        SET score = CASE WHEN board = ? THEN ? ELSE score + 1 END,
+            tiebreak = CASE WHEN board = ? THEN 0 ELSE COALESCE(?, tiebreak) END
+        WHERE item_key = ? AND board IN (?, ?)
+        RETURNING board
+    ''', (all_board, total, all_board, total, item_key, all_board, month_board)).fetchall()}
+
+    if all_board and all_board not in updated:
+        _offer_leaderboard(conn, all_board, item_key, total, 0)
+
+    if month_board and month_board not in updated:
+        monthly, all_time = conn.execute(f'''
+            SELECT (SELECT COUNT(*) FROM {month_table} WHERE item_key = ?),
+                   (SELECT download_count FROM download_totals WHERE item_key = ?)
+        ''', (item_key, item_key)).fetchone()
+        _offer_leaderboard(conn, month_board, item_key, monthly, all_time or 0)
+
+def get_leaderboard(item_type, period='month'):
+    """Ranked [(item_id, score, tiebreak)] for 'game'/'port' this month or 'all' time.
+
+    Reads at most LEADERBOARD_SIZE rows and is cached per process for
+    LEADERBOARD_CACHE_SECONDS.
+    """
+    if period == 'month':
+        period = datetime.now().strftime('%Y-%m')
+    board = _leaderboard_name(item_type, period)
+    cache_key = (get_analytics_db_path(), board)
+    cached = _leaderboards.get(cache_key)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
+    conn = get_analytics_connection()
+    try:
+        rows = conn.execute('''
+            SELECT k.item_id, l.score, l.tiebreak
+            FROM leaderboard l
+            JOIN item_keys k ON k.item_key = l.item_key
+            WHERE l.board = ?
+            ORDER BY l.score DESC, l.tiebreak DESC
+        ''', (board,)).fetchall()
+    except sqlite3.OperationalError as e:
+        # Analytics database from before leaderboards; init_db creates the table
+        if 'no such table' not in str(e):
+            raise
+        rows = []
+    finally:
+        conn.close()
+    entries = [tuple(row) for row in rows]
+    _leaderboards[cache_key] = (time.time() + LEADERBOARD_CACHE_SECONDS, entries)
+    return entries
+
+def rebuild_leaderboards(year_month=None):
+    """Recompute the month (default: current) and all-time boards exactly.
+
+    Also fills in item_keys.item_type from the catalog and drops boards of
+    other months. Run it after the month rolls over, after bulk imports, or
+    whenever the boards look wrong. Returns {board: entries}.
+    """
+    if year_month is None:
+        year_month = datetime.now().strftime('%Y-%m')
+    month_table = _monthly_table(year_month)
+
+    conn = get_db_connection()
+    attach_analytics(conn)
+    boards = {}
+    try:
+        conn.execute('''
+            UPDATE analytics.item_keys SET item_type = CASE
+                WHEN EXISTS (SELECT 1 FROM main.games g WHERE g.id = item_keys.item_id) THEN 'game'
+                WHEN EXISTS (SELECT 1 FROM main.ports p WHERE p.id = item_keys.item_id) THEN 'port'
+            END
+        ''')
+        conn.execute('DELETE FROM analytics.leaderboard')
+        has_month = year_month in get_monthly_partitions(conn, 'analytics')
+        for item_type in ('game', 'port'):
+            board = _leaderboard_name(item_type, 'all')
+            boards[board] = conn.execute('''
+                INSERT INTO analytics.leaderboard (board, item_key, score, tiebreak)
+                SELECT ?, t.item_key, t.download_count, 0
+                FROM analytics.download_totals t
+                JOIN analytics.item_keys k ON k.item_key = t.item_key
+                WHERE k.item_type = ?
+                ORDER BY t.download_count DESC
+                LIMIT ?
+            ''', (board, item_type, LEADERBOARD_SIZE)).rowcount
+            board = _leaderboard_name(item_type, year_month)
+            if not has_month:
+                boards[board] = 0
+                continue
+            boards[board] = conn.execute(f'''
+                INSERT INTO analytics.leaderboard (board, item_key, score, tiebreak)
+                SELECT ?, m.item_key, COUNT(*), COALESCE(MAX(t.download_count), 0)
+                FROM analytics.{month_table} m
+                JOIN analytics.item_keys k ON k.item_key = m.item_key
+                LEFT JOIN analytics.download_totals t ON t.item_key = m.item_key
+                WHERE k.item_type = ?
+                GROUP BY m.item_key
+                ORDER BY 3 DESC, 4 DESC
+                LIMIT ?
+            ''', (board, item_type, LEADERBOARD_SIZE)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    path = get_analytics_db_path()
+    for cache in (_leaderboards, _leaderboard_floors, _item_keys):
+        for key in [key for key in cache if key[0] == path]:
+            del cache[key]
+    return boards
+
+# --- Trending -------------------------------------------------------------------
+
+def rebuild_daily_downloads(conn, schema='main'):
+    """Recount daily_downloads for every hot month from the monthly partitions"""
+    tables = [_monthly_table(year_month) for year_month in get_monthly_partitions(conn, schema)]
+    # Days are UTC and months local, so a day can span two partitions: clear first, then add up
+    for table in tables:
+        conn.execute(f'''
+            DELETE FROM {schema}.daily_downloads
+            WHERE day IN (SELECT DISTINCT date(downloaded_at) FROM {schema}.{table})
+        ''')
+    for table in tables:
+        conn.execute(f'''
+            INSERT INTO {schema}.daily_downloads (item_key, day, download_count)
+            SELECT item_key, date(downloaded_at), COUNT(*)
+            FROM {schema}.{table}
+            WHERE true
+            GROUP BY item_key, date(downloaded_at)
+            ON CONFLICT(item_key, day) DO UPDATE SET download_count = download_count + excluded.download_count
+        ''')
+
+def _set_analytics_state(conn, name, value):
+    conn.execute('INSERT OR REPLACE INTO analytics_state (name, value) VALUES (?, ?)', (name, str(value)))
+
+def decay_trending():
+    """Age all trending scores by the time since the last decay.
+
+    Meant to run from cron (hourly); downloads between two runs count at full
+    weight, so the run interval bounds the error. Returns (factor, rows dropped).
+    """
+    conn = get_analytics_connection(for_write=True)
+    try:
+        now = time.time()
+        row = conn.execute("SELECT value FROM analytics_state WHERE name = 'trending_decayed_at'").fetchone()
+        elapsed_days = max(0.0, now - float(row[0])) / 86400 if row else 0.0
+        factor = 0.5 ** (elapsed_days / TRENDING_HALF_LIFE_DAYS)
+        conn.execute('UPDATE trending SET score = score * ?', (factor,))
+        dropped = conn.execute('DELETE FROM trending WHERE score < ?', (TRENDING_MIN_SCORE,)).rowcount
+        _set_analytics_state(conn, 'trending_decayed_at', now)
+        conn.commit()
+    finally:
+        conn.close()
+    return factor, dropped
+
+def rebuild_trending():
+    """Recompute every trending score from daily_downloads. Returns the number of scored items.
+
+    Each day's downloads are weighted as of midday (UTC); use after
+    upgrading or to correct drift from irregular decay runs.
+    """
+    now = time.time()
+    today = datetime.utcfromtimestamp(now)
+    # Days old enough that even a very popular day has decayed away are skipped
+    horizon = f"-{int(TRENDING_HALF_LIFE_DAYS * 30)} days"
+
+    conn = get_analytics_connection(for_write=True)
+    try:
+        scores = {}
+        rows = conn.execute('SELECT item_key, day, download_count FROM daily_downloads WHERE day >= date(?, ?)',
+                            (today.strftime('%Y-%m-%d'), horizon)).fetchall()
+        for item_key, day, count in rows:
+            age_days = (today - datetime.strptime(day, '%Y-%m-%d')).total_seconds() / 86400 - 0.5
+            scores[item_key] = scores.get(item_key, 0.0) + count * 0.5 ** (max(age_days, 0.0) / TRENDING_HALF_LIFE_DAYS)
+        conn.execute('DELETE FROM trending')
+        conn.executemany('INSERT INTO trending (item_key, score) VALUES (?, ?)',
+                         [(item_key, score) for item_key, score in scores.items() if score >= TRENDING_MIN_SCORE])
+        _set_analytics_state(conn, 'trending_decayed_at', now)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(scores)
+
+def get_trending_scores_for_ids(item_ids):
+    """Get trending scores for a batch of game or port IDs (missing = not trending)"""
+    if not item_ids:
+        return {}
+    conn = get_analytics_connection()
+    rows = batch_lookup(conn, '''
+        SELECT k.item_id, t.score
+        FROM item_keys k
+        JOIN trending t ON t.item_key = k.item_key
+        WHERE k.item_id IN {ids}
+    ''', item_ids)
+    conn.close()
+    return {row[0]: row[1] for row in rows}
+
+def get_trending_items(item_type='game', limit=12):
+    """Games or ports with the highest trending score, highest first.
+
+    Items get trending_score, download_count and monthly_download_count set.
+    """
+    conn = get_analytics_connection()
+    # Over-fetch a little: ids no longer in the catalog are dropped below
+    rows = conn.execute('''
+        SELECT k.item_id, t.score
+        FROM trending t
+        JOIN item_keys k ON k.item_key = t.item_key
+        WHERE k.item_type = ?
+        ORDER BY t.score DESC
+        LIMIT ?
+    ''', (item_type, limit * 2)).fetchall()
+    conn.close()
+
+    scores = {row[0]: row[1] for row in rows}
+    items = get_items_by_ids(list(scores), is_port=item_type == 'port', projection='card')[:limit]
+    ids = [item['id'] for item in items]
+    totals = get_download_counts_for_ids(ids)
+    monthly = get_monthly_download_counts_for_ids(ids)
+    for item in items:
+        item['trending_score'] = scores[item['id']]
+        item['download_count'] = totals.get(item['id'], 0)
+        item['monthly_download_count'] = monthly.get(item['id'], 0)
+    return items
+
+_download_series = {}
+
+def get_daily_download_series(item_id, days):
+    """Downloads per UTC day for the last `days` days, oldest first.
+
+    Returns (start_day, counts) with one count per day up to and including
+    today, zeros filled in. One primary-key range read on daily_downloads,
+    cached per process for STATS_CACHE_SECONDS.
+    """
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    cache_key = (get_analytics_db_path(), item_id, days)
+    cached = _download_series.get(cache_key)
+    if cached and cached[0] > time.time() and cached[1][0] == start:
+        return cached[1]
+
+    conn = get_analytics_connection()
+    try:
+        rows = conn.execute('''
+            SELECT day, download_count FROM daily_downloads
+            WHERE item_key = (SELECT item_key FROM item_keys WHERE item_id = ?) AND day >= ?
+        ''', (item_id, start.isoformat())).fetchall()
+    finally:
+        conn.close()
+
+    counts = [0] * days
+    for day, count in rows:
+        index = (date.fromisoformat(day) - start).days
+        if 0 <= index < days:
+            counts[index] = count
+    series = (start, counts)
+    # Unknown ids are cached too, so bound the cache instead of tracking catalog ids
+    if len(_download_series) >= STATS_CACHE_MAX_ENTRIES:
+        _download_series.clear()
+    _download_series[cache_key] = (time.time() + STATS_CACHE_SECONDS, series)
+    return series
+
+def prune_daily_downloads(retention_days=None):
+    """Delete daily download buckets older than the retention window. Returns rows deleted."""
+    retention_days = retention_days or DAILY_DOWNLOADS_RETENTION_DAYS
+    cutoff = (datetime.utcnow().date() - timedelta(days=retention_days)).isoformat()
+    conn = get_analytics_connection(for_write=True)
+    try:
+        deleted = conn.execute('DELETE FROM daily_downloads WHERE day < ?', (cutoff,)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return deleted
+
+def checkpoint_analytics(mode='PASSIVE'):
+    """Checkpoint the analytics WAL. Returns (busy, wal_pages, checkpointed_pages).
+
+    PASSIVE never waits on readers or writers; TRUNCATE also resets the WAL
+    file to zero bytes and is what the periodic maintenance job runs.
+    """
+    mode = mode.upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f'Invalid checkpoint mode: {mode}')
+    conn = get_analytics_connection()
+    row = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    conn.close()
+    return tuple(row)
+
+def backup_sqlite(source_path, dest_path):
+    """Copy a live SQLite database (including its WAL) with the online backup API"""
+    source = sqlite3.connect(source_path, timeout=DB_BUSY_TIMEOUT)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+
 def init_db():
     """Initialize the database with schema"""
     conn = get_db_connection()
@@ -236,6 +1231,8 @@ def init_db():
         cursor.execute("ALTER TABLE games ADD COLUMN official_website TEXT")
     if 'game_series' not in game_cols:
         cursor.execute("ALTER TABLE games ADD COLUMN game_series TEXT")
+    if 'image_variants' not in game_cols:
+        cursor.execute("ALTER TABLE games ADD COLUMN image_variants TEXT")
     if 'base_hash' in game_cols:
         # Can't drop columns in SQLite, so we'll leave them but not use them
         pass
@@ -329,6 +1326,19 @@ def init_db():
         cursor.execute("ALTER TABLE ports ADD COLUMN mod_links TEXT")
     if 'mod_instructions' not in port_cols:
         cursor.execute("ALTER TABLE ports ADD COLUMN mod_instructions TEXT")
+    if 'image_variants' not in port_cols:
+        cursor.execute("ALTER TABLE ports ADD COLUMN image_variants TEXT")
+    # Sort indexes for the paginated admin catalog tables: (sort value, id) so
+    # keyset pages and offset jumps walk the index without a sort
+    for table in ('games', 'ports'):
+        for sort in ('title', 'created_at', 'console'):
+            cursor.execute(f'DROP INDEX IF EXISTS idx_{table}_{sort}')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_title_id ON {table}(title COLLATE NOCASE, id)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_created_at_id ON {table}(created_at, id)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_console_id ON {table}(console COLLATE NOCASE, id)')
+        # Covers the full-catalog id/base_game scans (sitemap, hub membership)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_base_game ON {table}(base_game, id)')
+
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS requests (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -396,15 +1406,10 @@ def init_db():
         if col_name not in request_cols:
             cursor.execute(f"ALTER TABLE requests ADD COLUMN {col_name} {col_type}")
     
-    # Downloads table for tracking patch downloads
+    # Admin queue indexes: status badges and keyset-paginated lists (newest first)
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS downloads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_id TEXT NOT NULL,
-            ip_hash TEXT NOT NULL,
-            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(game_id, ip_hash)
-        )
+        CREATE INDEX IF NOT EXISTS idx_requests_status_submitted
+        ON requests(status, submitted_at, id)
     ''')
 
     # Feedback table for broken link reports and correction requests
@@ -423,22 +1428,9 @@ def init_db():
         )
     ''')
     
-    # Monthly downloads table for tracking downloads per month
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS monthly_downloads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_id TEXT NOT NULL,
-            ip_hash TEXT NOT NULL,
-            year_month TEXT NOT NULL,
-            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(game_id, ip_hash, year_month)
-        )
-    ''')
-    
-    # Index for faster monthly queries
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_monthly_downloads_year_month 
-        ON monthly_downloads(year_month)
+        CREATE INDEX IF NOT EXISTS idx_feedback_status_submitted
+        ON feedback(status, submitted_at, id)
     ''')
     
     # Monthly popular history table for storing past months' top games
@@ -499,10 +1491,96 @@ def init_db():
             FOREIGN KEY (review_id) REFERENCES reviews(id) ON DELETE CASCADE
         )
     ''')
+
+    # Console index: one row per (item, console token) of the console column, so
+    # console filters are an index range instead of re-parsing every row.
+    # item_key is the analytics item_keys key; maintained by the write functions.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_consoles (
+            item_type TEXT NOT NULL,
+            console TEXT NOT NULL,
+            item_key INTEGER NOT NULL,
+            PRIMARY KEY (item_type, console, item_key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_item_consoles_item ON item_consoles(item_key)')
+
+    # Items per console for the filter buttons, kept in step with item_consoles
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS console_counts (
+            item_type TEXT NOT NULL,
+            console TEXT NOT NULL,
+            item_count INTEGER NOT NULL,
+            PRIMARY KEY (item_type, console)
+        ) WITHOUT ROWID
+    ''')
+
+    # Facet index: one row per (item, facet) for base_game and every FILTER_CONFIGS
+    # filter (auto-detected values included), maintained by the write functions
+    # like item_consoles. /api/facets counts are computed from it.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_facets (
+            item_type TEXT NOT NULL,
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL COLLATE NOCASE,
+            item_key INTEGER NOT NULL,
+            PRIMARY KEY (item_type, facet, value, item_key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_item_facets_item ON item_facets(item_key)')
+
+    # Catalog bookkeeping; 'generation' goes up whenever the console or facet index changes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
     
     conn.commit()
     conn.close()
 
+    # Download analytics live in analytics.db; move them out of databases created
+    # before the split
+    init_analytics_db()
+    migrate_analytics_tables()
+
+    # Fill the popularity leaderboards the first time (or after they were cleared)
+    conn = get_analytics_connection()
+    empty = (conn.execute('SELECT 1 FROM leaderboard LIMIT 1').fetchone() is None
+             and conn.execute('SELECT 1 FROM download_totals LIMIT 1').fetchone() is not None)
+    conn.close()
+    if empty:
+        rebuild_leaderboards()
+
+    conn = get_analytics_connection()
+    empty = (conn.execute('SELECT 1 FROM trending LIMIT 1').fetchone() is None
+             and conn.execute('SELECT 1 FROM daily_downloads LIMIT 1').fetchone() is not None)
+    conn.close()
+    if empty:
+        rebuild_trending()
+
+    # Backfill the console index for catalogs created before it existed
+    conn = get_db_connection()
+    empty = (conn.execute('SELECT 1 FROM item_consoles LIMIT 1').fetchone() is None
+             and conn.execute('''
+                 SELECT 1 FROM games WHERE console <> ''
+                 UNION ALL
+                 SELECT 1 FROM ports WHERE console <> ''
+                 LIMIT 1
+             ''').fetchone() is not None)
+    conn.close()
+    if empty:
+        rebuild_item_consoles()
+
+    # ... and the facet index
+    conn = get_db_connection()
+    empty = (conn.execute('SELECT 1 FROM item_facets LIMIT 1').fetchone() is None
+             and conn.execute('SELECT 1 FROM games UNION ALL SELECT 1 FROM ports LIMIT 1').fetchone() is not None)
+    conn.close()
+    if empty:
+        rebuild_item_facets()
+
 def load_games_from_json():
     """Load games from JSON file into database"""
     if not os.path.exists('games.json'):
@@ -589,6 +1667,8 @@ def load_games_from_json():
     
     conn.commit()
     conn.close()
+    rebuild_item_consoles()
+    rebuild_item_facets()
 
 def load_ports_from_json():
     """Load ports from JSON file into database"""
@@ -656,6 +1736,8 @@ def load_ports_from_json():
     
     conn.commit()
     conn.close()
+    rebuild_item_consoles()
+    rebuild_item_facets()
 
 def insert_game(game_data):
     """Insert a game (romhack) directly into the games table"""
@@ -663,6 +1745,7 @@ def insert_game(game_data):
     cursor = conn.cursor()
     
     game_id = game_data.get('id', game_data.get('title', 'game').lower().replace(' ', '_').replace("'", ''))
+    item_key = _catalog_item_key(game_id, 'game')
     
     cursor.execute('''
         INSERT OR REPLACE INTO games (
@@ -722,9 +1805,12 @@ def insert_game(game_data):
         game_data.get('instructions_xbox'),
         game_data.get('game_series') or get_filter_value(game_data, 'game_series'),
     ))
+    _sync_item_consoles(conn, 'game', game_id, item_key)
+    _sync_item_facets(conn, 'game', game_id, item_key)
     
     conn.commit()
     conn.close()
+    _index_catalog_id(game_id, 'game')
     return game_id
 
 def insert_port(port_data):
@@ -733,6 +1819,7 @@ def insert_port(port_data):
     cursor = conn.cursor()
     
     port_id = port_data.get('id', port_data.get('title', 'port').lower().replace(' ', '_').replace("'", ''))
+    item_key = _catalog_item_key(port_id, 'port')
     
     cursor.execute('''
         INSERT OR REPLACE INTO ports (
@@ -766,64 +1853,601 @@ def insert_port(port_data):
         port_data.get('rom_checker_url'),
         port_data.get('wiki_url'),
     ))
+    _sync_item_consoles(conn, 'port', port_id, item_key)
+    _sync_item_facets(conn, 'port', port_id, item_key)
     
     conn.commit()
     conn.close()
+    _index_catalog_id(port_id, 'port')
     return port_id
 
-def get_games():
-    """Get all games from database"""
+def get_games(projection='detail'):
+    """Get all games from database (only the columns of projection, see CATALOG_PROJECTIONS)"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM games')
+    cursor.execute(f'SELECT {_projection_sql(projection)} FROM games')
     rows = cursor.fetchall()
     conn.close()
     
-    games = []
-    for row in rows:
-        game = dict(row)
-        game['consoles'] = _normalize_consoles(game.get('console'))
-        game['features'] = json.loads(game['features'])
-        game['screenshots'] = json.loads(game['screenshots'])
-        game['popular'] = bool(game['popular'])
-        
-        # Apply filter configurations with auto-detection
-        for filter_name in FILTER_CONFIGS:
-            game[filter_name] = get_filter_value(game, filter_name)
-        
-        games.append(game)
-    
-    return games
+    # JSON fields and filter values are decoded on first access (see CatalogRecord)
+    return Game.from_rows(rows)
 
-def get_ports():
-    """Get all ports from database"""
+def get_ports(projection='detail'):
+    """Get all ports from database (only the columns of projection, see CATALOG_PROJECTIONS)"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM ports')
+    cursor.execute(f'SELECT {_projection_sql(projection, is_port=True)} FROM ports')
     rows = cursor.fetchall()
     conn.close()
     
-    ports = []
+    return Port.from_rows(rows)
+
+def get_items_by_ids(item_ids, is_port=False, projection='detail'):
+    """Get the games (or ports) with the given IDs, in the order of item_ids; unknown IDs are skipped"""
+    table = 'ports' if is_port else 'games'
+    conn = get_db_connection()
+    rows = batch_lookup(conn, f'SELECT {_projection_sql(projection, is_port)} FROM {table} WHERE id IN {{ids}}',
+                        item_ids)
+    conn.close()
+
+    by_id = {item['id']: item for item in (Port if is_port else Game).from_rows(rows)}
+    return [by_id[item_id] for item_id in item_ids if item_id in by_id]
+
+def get_popular_items(item_type='game', limit=12):
+    """Most downloaded games or ports this month, all-time downloads breaking ties.
+
+    Reads the month and all-time leaderboards instead of the whole catalog.
+    Items get download_count and monthly_download_count set. While fewer than
+    `limit` items were downloaded this month, the all-time leaders fill the rest.
+    """
+    ranked = [(item_id, monthly, total) for item_id, monthly, total in get_leaderboard(item_type, 'month')]
+    seen = {item_id for item_id, _, _ in ranked}
+    ranked += [(item_id, 0, total) for item_id, total, _ in get_leaderboard(item_type, 'all')
+               if item_id not in seen]
+
+    items = get_items_by_ids([item_id for item_id, _, _ in ranked], is_port=item_type == 'port', projection='card')
+    counts = {item_id: (monthly, total) for item_id, monthly, total in ranked}
+    for item in items:
+        item['monthly_download_count'], item['download_count'] = counts[item['id']]
+    return items[:limit]
+
+# --- Console index (item_consoles / console_counts) ---
+
+def _catalog_item_key(item_id, item_type, assign=True):
+    """analytics item_key for a catalog id, assigned (with item_type) on first use.
+
+    Runs on its own analytics connection before the catalog write starts, so a
+    write never holds both databases. With assign=False, unknown ids give None.
+    """
+    conn = get_analytics_connection(for_write=assign)
+    try:
+        if assign:
+            conn.execute('INSERT OR IGNORE INTO item_keys (item_id, item_type) VALUES (?, ?)', (item_id, item_type))
+            conn.execute('UPDATE item_keys SET item_type = ? WHERE item_id = ? AND item_type IS NULL',
+                         (item_type, item_id))
+            conn.commit()
+        row = conn.execute('SELECT item_key FROM item_keys WHERE item_id = ?', (item_id,)).fetchone()
+    finally:
+        conn.close()
+    # A download may have cached the id before it was in the catalog (item_type None)
+    _item_keys.pop((get_analytics_db_path(), item_id), None)
+    return row[0] if row else None
+
+def _assign_item_keys(items):
+    """{item_id: item_key} for (item_type, item_id) pairs, assigning keys (and item_type) as needed"""
+    analytics = get_analytics_connection(for_write=True)
+    analytics.executemany('INSERT OR IGNORE INTO item_keys (item_id, item_type) VALUES (?, ?)',
+                          [(item_id, item_type) for item_type, item_id in items])
+    analytics.executemany('UPDATE item_keys SET item_type = ? WHERE item_id = ? AND item_type IS NULL',
+                          [(item_type, item_id) for item_type, item_id in items])
+    analytics.commit()
+    keys = {row[0]: row[1] for row in analytics.execute('SELECT item_id, item_key FROM item_keys')}
+    analytics.close()
+    _item_keys.clear()
+    return keys
+
+def _bump_catalog_generation(conn):
+    """Invalidate everything cached per catalog generation (facet counts); caller commits"""
+    conn.execute('''
+        INSERT INTO catalog_state (name, value) VALUES ('generation', 1)
+        ON CONFLICT (name) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    ''')
+
+def get_catalog_generation(conn=None):
+    own = conn is None
+    conn = conn or get_db_connection()
+    try:
+        row = conn.execute("SELECT value FROM catalog_state WHERE name = 'generation'").fetchone()
+    finally:
+        if own:
+            conn.close()
+    return int(row[0]) if row else 0
+
+def _sync_item_consoles(conn, item_type, item_id, item_key):
+    """Bring an item's item_consoles rows and console_counts in line with its console column.
+
+    Runs on the caller's catalog connection after its write, inside the same
+    transaction; a deleted item loses its rows.
+    """
+    table = 'ports' if item_type == 'port' else 'games'
+    row = conn.execute(f'SELECT console FROM {table} WHERE id = ?', (item_id,)).fetchone()
+    new = set(_normalize_consoles(row[0])) if row else set()
+    old = {r[0] for r in conn.execute('SELECT console FROM item_consoles WHERE item_key = ? AND item_type = ?',
+                                      (item_key, item_type))}
+    removed = [(item_type, console, item_key) for console in sorted(old - new)]
+    added = [(item_type, console, item_key) for console in sorted(new - old)]
+    if removed:
+        conn.executemany('DELETE FROM item_consoles WHERE item_type = ? AND console = ? AND item_key = ?', removed)
+        conn.executemany('UPDATE console_counts SET item_count = item_count - 1 WHERE item_type = ? AND console = ?',
+                         [r[:2] for r in removed])
+        conn.execute('DELETE FROM console_counts WHERE item_type = ? AND item_count <= 0', (item_type,))
+    if added:
+        conn.executemany('INSERT OR IGNORE INTO item_consoles (item_type, console, item_key) VALUES (?, ?, ?)', added)
+        conn.executemany('''
+            INSERT INTO console_counts (item_type, console, item_count) VALUES (?, ?, 1)
+            ON CONFLICT (item_type, console) DO UPDATE SET item_count = item_count + 1
+        ''', [r[:2] for r in added])
+    if removed or added:
+        _bump_catalog_generation(conn)
+
+def rebuild_item_consoles():
+    """Rebuild item_consoles and console_counts from the console columns; returns the rows written"""
+    conn = get_db_connection()
+    items = [(item_type, row[0], row[1])
+             for item_type, table in (('game', 'games'), ('port', 'ports'))
+             for row in conn.execute(f'SELECT id, console FROM {table}')]
+    conn.close()
+
+    keys = _assign_item_keys([(item_type, item_id) for item_type, item_id, _ in items])
+    rows = sorted({(item_type, console, keys[item_id])
+                   for item_type, item_id, value in items
+                   for console in _normalize_consoles(value)})
+    conn = get_db_connection()
+    conn.execute('DELETE FROM item_consoles')
+    conn.executemany('INSERT INTO item_consoles (item_type, console, item_key) VALUES (?, ?, ?)', rows)
+    conn.execute('DELETE FROM console_counts')
+    conn.execute('''
+        INSERT INTO console_counts (item_type, console, item_count)
+        SELECT item_type, console, COUNT(*) FROM item_consoles GROUP BY item_type, console
+    ''')
+    _bump_catalog_generation(conn)
+    conn.commit()
+    conn.close()
+    # Bulk loads end here: reload the id index on its next use
+    _catalog_ids.pop(DB_PATH, None)
+    return len(rows)
+
+def get_console_counts(item_type='game'):
+    """{console: number of games (or ports)} for the filter buttons, most common first"""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT console, item_count FROM console_counts
+        WHERE item_type = ?
+        ORDER BY item_count DESC, console
+    ''', (item_type,)).fetchall()
+    conn.close()
+    return {row[0]: row[1] for row in rows}
+
+def get_faceted_items(item_type, filters, limit=12, sort='popular'):
+    """Top games or ports matching facet filters ({facet: value}, see FACETS):
+    most downloaded (all time) or trending.
+
+    Items get download_count, monthly_download_count and trending_score set.
+    """
+    filters = _clean_facet_filters(filters)
+    if not filters:
+        return []
+    if sort == 'trending':
+        order_sql = 'COALESCE(tr.score, 0) DESC, COALESCE(dt.download_count, 0) DESC'
+    else:
+        order_sql = 'COALESCE(dt.download_count, 0) DESC, COALESCE(tr.score, 0) DESC'
+    # Scan the first filter's index range (FACETS puts the selective facets first),
+    # probe the others per item
+    facet = next(f for f in FACETS if f in filters)
+    table, value_sql, where_sql, where_params = _facet_source(facet, 'x')
+    others = {f: v for f, v in filters.items() if f != facet}
+    filter_sql, filter_params = _facet_filter_sql(item_type, others, 'x.item_key')
+    conn = attach_analytics(get_db_connection())
+    rows = conn.execute(f'''
+        SELECT k.item_id, COALESCE(dt.download_count, 0), COALESCE(tr.score, 0)
+        FROM {table}
+        JOIN analytics.item_keys k ON k.item_key = x.item_key
+        LEFT JOIN analytics.download_totals dt ON dt.item_key = x.item_key
+        LEFT JOIN analytics.trending tr ON tr.item_key = x.item_key
+        WHERE {where_sql} AND {value_sql} = ?{filter_sql}
+        ORDER BY {order_sql}, x.item_key
+        LIMIT ?
+    ''', [item_type, *where_params, filters[facet], *filter_params, limit]).fetchall()
+    conn.close()
+
+    ranked = {row[0]: (row[1], row[2]) for row in rows}
+    items = get_items_by_ids(list(ranked), is_port=item_type == 'port', projection='card')
+    monthly = get_monthly_download_counts_for_ids([item['id'] for item in items])
+    for item in items:
+        item['download_count'], item['trending_score'] = ranked[item['id']]
+        item['monthly_download_count'] = monthly.get(item['id'], 0)
+    return items
+
+def get_item_consoles(item_ids):
+    """{console: set of ids} for a batch of game or port ids, from item_consoles"""
+    conn = attach_analytics(get_db_connection())
+    rows = batch_lookup(conn, '''
+        SELECT ic.console, k.item_id
+        FROM analytics.item_keys k
+        JOIN item_consoles ic ON ic.item_key = k.item_key
+        WHERE k.item_id IN {ids}
+    ''', item_ids)
+    conn.close()
+    consoles = {}
+    for console, item_id in rows:
+        consoles.setdefault(console, set()).add(item_id)
+    return consoles
+
+# --- Facets (item_facets) ---
+
+# Facets the listing filters count and narrow by: base_game and every FILTER_CONFIGS
+# filter live in item_facets, console comes from item_consoles. Selective facets first.
+FACET_COLUMNS = ('base_game', *FILTER_CONFIGS)
+FACETS = FACET_COLUMNS + ('console',)
+# Columns whose change can move an item between facet values (title feeds auto-detection)
+FACET_SOURCE_FIELDS = frozenset(('console', 'title') + FACET_COLUMNS)
+FACET_CACHE_MAX_ENTRIES = 1000
+
+def _facet_values(record):
+    """{facet: value} for an item's catalog row; empty values are left out"""
+    values = {}
+    for facet in FACET_COLUMNS:
+        value = get_filter_value(record, facet) if facet in FILTER_CONFIGS else record.get(facet)
+        value = str(value).strip() if value is not None else ''
+        if value:
+            values[facet] = value
+    return values
+
+def _persist_detected_values(conn, table, rows):
+    """Store auto-detected filter values in their columns, so reads skip auto-detection.
+
+    rows: (item_id, record, facet values); only empty columns are filled.
+    """
+    for filter_name in FILTER_CONFIGS:
+        updates = [(values[filter_name], item_id) for item_id, record, values in rows
+                   if filter_name in values and not record.get(filter_name)]
+        if updates:
+            conn.executemany(f'UPDATE {table} SET {filter_name} = ? WHERE id = ?', updates)
+
+def _sync_item_facets(conn, item_type, item_id, item_key):
+    """Bring an item's item_facets rows in line with its catalog row (see _sync_item_consoles)."""
+    table = 'ports' if item_type == 'port' else 'games'
+    row = conn.execute(f'SELECT * FROM {table} WHERE id = ?', (item_id,)).fetchone()
+    new = {}
+    if row:
+        record = dict(row)
+        new = _facet_values(record)
+        _persist_detected_values(conn, table, [(item_id, record, new)])
+    old = {r[0]: r[1] for r in conn.execute('SELECT facet, value FROM item_facets WHERE item_key = ? AND item_type = ?',
+                                            (item_key, item_type))}
+    if old == new:
+        return
+    conn.execute('DELETE FROM item_facets WHERE item_key = ? AND item_type = ?', (item_key, item_type))
+    conn.executemany('INSERT OR IGNORE INTO item_facets (item_type, facet, value, item_key) VALUES (?, ?, ?, ?)',
+                     [(item_type, facet, value, item_key) for facet, value in new.items()])
+    _bump_catalog_generation(conn)
+
+def rebuild_item_facets():
+    """Rebuild item_facets from the catalog (filling in auto-detected filter values); returns the rows written"""
+    conn = get_db_connection()
+    items = []
+    for item_type, table in (('game', 'games'), ('port', 'ports')):
+        detected = []
+        for row in conn.execute(f'SELECT * FROM {table}'):
+            record = dict(row)
+            values = _facet_values(record)
+            items.append((item_type, record['id'], values))
+            if any(name in values and not record.get(name) for name in FILTER_CONFIGS):
+                detected.append((record['id'], {name: record.get(name) for name in FILTER_CONFIGS}, values))
+        _persist_detected_values(conn, table, detected)
+    conn.commit()
+    conn.close()
+
+    keys = _assign_item_keys([(item_type, item_id) for item_type, item_id, _ in items])
+    rows = sorted({(item_type, facet, value, keys[item_id])
+                   for item_type, item_id, values in items
+                   for facet, value in values.items()})
+    conn = get_db_connection()
+    conn.execute('DELETE FROM item_facets')
+    conn.executemany('INSERT OR IGNORE INTO item_facets (item_type, facet, value, item_key) VALUES (?, ?, ?, ?)', rows)
+    _bump_catalog_generation(conn)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+def _clean_facet_filters(filters):
+    """Known facets with non-empty values; console tokens are lowercase"""
+    cleaned = {}
+    for facet, value in (filters or {}).items():
+        value = (value or '').strip()
+        if facet in FACETS and value:
+            cleaned[facet] = value.lower() if facet == 'console' else value
+    return cleaned
+
+def _facet_source(facet, alias):
+    """(FROM, value column, WHERE, WHERE params after item_type) for one facet's rows"""
+    if facet == 'console':
+        return f'item_consoles {alias}', f'{alias}.console', f'{alias}.item_type = ?', []
+    return f'item_facets {alias}', f'{alias}.value', f'{alias}.item_type = ? AND {alias}.facet = ?', [facet]
+
+def _facet_filter_sql(item_type, filters, key_sql):
+    """' AND EXISTS (...)' per filter, each a primary-key probe for the item key_sql"""
+    parts = []
+    params = []
+    for n, (facet, value) in enumerate(sorted(filters.items())):
+        table, value_sql, where_sql, where_params = _facet_source(facet, f'f{n}')
+        parts.append(f' AND EXISTS (SELECT 1 FROM {table} WHERE {where_sql} AND {value_sql} = ? AND f{n}.item_key = {key_sql})')
+        params += [item_type, *where_params, value]
+    return ''.join(parts), params
+
+# (db path, item_type, filters) -> (generation, counts)
+_facet_counts = {}
+
+def get_facet_counts(item_type='game', filters=None):
+    """Item counts per value of every facet under the given filters.
+
+    Each facet is counted under the other facets' filters (so its own
+    alternatives stay visible). Returns {'generation', 'total', 'facets':
+    {facet: {value: count}}}, values most common first. Cached per process
+    until the catalog generation changes.
+    """
+    filters = _clean_facet_filters(filters)
+    table = 'ports' if item_type == 'port' else 'games'
+    cache_key = (DB_PATH, item_type, tuple(sorted((f, v.lower()) for f, v in filters.items())))
+    conn = get_db_connection()
+    try:
+        generation = get_catalog_generation(conn)
+        cached = _facet_counts.get(cache_key)
+        if cached and cached[0] == generation:
+            return cached[1]
+
+        selects = []
+        params = []
+        for facet in FACETS:
+            source, value_sql, where_sql, where_params = _facet_source(facet, 'x')
+            others = {f: v for f, v in filters.items() if f != facet}
+            filter_sql, filter_params = _facet_filter_sql(item_type, others, 'x.item_key')
+            selects.append(f'SELECT ?, {value_sql}, COUNT(*) FROM {source} '
+                           f'WHERE {where_sql}{filter_sql} GROUP BY {value_sql}')
+            params += [facet, item_type, *where_params, *filter_params]
+        if filters:
+            facet = next(f for f in FACETS if f in filters)
+            source, value_sql, where_sql, where_params = _facet_source(facet, 'x')
+            others = {f: v for f, v in filters.items() if f != facet}
+            filter_sql, filter_params = _facet_filter_sql(item_type, others, 'x.item_key')
+            selects.append(f'SELECT NULL, NULL, COUNT(*) FROM {source} WHERE {where_sql} AND {value_sql} = ?{filter_sql}')
+            params += [item_type, *where_params, filters[facet], *filter_params]
+        else:
+            selects.append(f'SELECT NULL, NULL, COUNT(*) FROM {table}')
+        rows = conn.execute(' UNION ALL '.join(selects) + ' ORDER BY 1, 3 DESC, 2', params).fetchall()
+    finally:
+        conn.close()
+
+    result = {'generation': generation, 'total': 0, 'facets': {facet: {} for facet in FACETS}}
+    for facet, value, count in rows:
+        if facet is None:
+            result['total'] = count
+        else:
+            result['facets'][facet][value] = count
+    if len(_facet_counts) >= FACET_CACHE_MAX_ENTRIES:
+        _facet_counts.clear()
+    _facet_counts[cache_key] = (generation, result)
+    return result
+
+# sort name -> (column, collation, result field). title, created_at and console
+# have (value, id) indexes (idx_<table>_<sort>_id); downloads and trending sort
+# on analytics values, so those pages scan and sort the (id, value) pairs of
+# every row matching the filters (about 60-100ms on 40k games).
+CATALOG_SORT_COLUMNS = {
+    'title': ('i.title', 'NOCASE', 'title'),
+    'downloads': ('COALESCE(dt.download_count, 0)', None, 'download_count'),
+    'trending': ('COALESCE(tr.score, 0)', None, 'trending_score'),
+    'created_at': ('i.created_at', None, 'created_at'),
+    'console': ('i.console', 'NOCASE', 'console'),
+}
+
+def _encode_catalog_cursor(value, item_id):
+    """Encode a row's (sort value, id) as an opaque keyset cursor string."""
+    return json.dumps([value, item_id])
+
+def _decode_catalog_cursor(cursor_value):
+    """Decode a catalog keyset cursor; returns None for missing or malformed values."""
+    try:
+        value, item_id = json.loads(cursor_value)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool) or not isinstance(item_id, str):
+        return None
+    return value, item_id
+
+def get_catalog_page(item_type='game', search=None, sort='title', order='asc', limit=50, offset=0, console=None,
+                     after=None):
+    """Get one sorted/filtered page of games or ports for the admin tables.
+
+    Pages are keyset-paginated on (sort value, id): pass the previous page's
+    next_cursor as after. Without a cursor (a jump in the virtualized table)
+    offset is used, which for the indexed sorts walks the covering
+    idx_<table>_<sort>_id index instead of sorting. Downloads and trending
+    are scans (see CATALOG_SORT_COLUMNS). console restricts the page to one
+    console token (via item_consoles).
+    Returns (items, total, next_cursor): total is the number of rows matching
+    the filters, next_cursor is None on the last page.
+    """
+    table = 'ports' if item_type == 'port' else 'games'
+    if sort not in CATALOG_SORT_COLUMNS:
+        sort = 'title'
+    column, collation, field = CATALOG_SORT_COLUMNS[sort]
+    collate_sql = f' COLLATE {collation}' if collation else ''
+    descending = order == 'desc'
+    direction = 'DESC' if descending else 'ASC'
+    order_sql = f'{column}{collate_sql} {direction}, i.id {direction}'
+
+    filters = []
+    params = []
+    if search:
+        pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        filters.append("(i.title LIKE ? ESCAPE '\\' OR i.author LIKE ? ESCAPE '\\' OR i.base_game LIKE ? ESCAPE '\\')")
+        params = [pattern, pattern, pattern]
+
+    # With a console the scan starts from its item_consoles range
+    if console:
+        from_sql = f'''
+            item_consoles ic
+            JOIN analytics.item_keys k ON k.item_key = ic.item_key
+            JOIN {table} i ON i.id = k.item_id
+        '''
+        filters.insert(0, 'ic.item_type = ? AND ic.console = ?')
+        params = [item_type, console.strip().lower()] + params
+    else:
+        from_sql = f'{table} i'
+
+    # Rows after the cursor; the collation goes on the parameter side so the
+    # row value comparison can seek the (value COLLATE NOCASE, id) index
+    page_filters = list(filters)
+    page_params = list(params)
+    position = _decode_catalog_cursor(after)
+    if position:
+        page_filters.append(f"({column}, i.id) {'<' if descending else '>'} (?{collate_sql}, ?)")
+        page_params.extend(position)
+        offset = 0
+    # One extra row tells whether there is a next page
+    page_params += [limit + 1, offset]
+
+    # The page's ids are picked with only the joins the sort needs, then
+    # just those rows are joined with the rest
+    page_from = from_sql
+    if sort in ('downloads', 'trending'):
+        if not console:
+            page_from += ' LEFT JOIN analytics.item_keys k ON k.item_id = i.id'
+        page_from += (' LEFT JOIN analytics.download_totals dt ON dt.item_key = k.item_key' if sort == 'downloads'
+                      else ' LEFT JOIN analytics.trending tr ON tr.item_key = k.item_key')
+
+    def where(clauses):
+        return 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+
+    conn = attach_analytics(get_db_connection())
+    cursor = conn.cursor()
+
+    cursor.execute(f'SELECT COUNT(*) FROM {from_sql} {where(filters)}', params)
+    total = cursor.fetchone()[0]
+
+    cursor.execute(f'''
+        SELECT {_projection_sql('admin-row', alias='i')}, COALESCE(dt.download_count, 0) AS download_count,
+               COALESCE(tr.score, 0) AS trending_score
+        FROM (SELECT i.id FROM {page_from} {where(page_filters)} ORDER BY {order_sql} LIMIT ? OFFSET ?) page
+        JOIN {table} i ON i.id = page.id
+        LEFT JOIN analytics.item_keys k ON k.item_id = i.id
+        LEFT JOIN analytics.download_totals dt ON dt.item_key = k.item_key
+        LEFT JOIN analytics.trending tr ON tr.item_key = k.item_key
+        ORDER BY {order_sql}
+    ''', page_params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows[-1][field] is not None:
+            next_cursor = _encode_catalog_cursor(rows[-1][field], rows[-1]['id'])
+
+    items = []
     for row in rows:
-        port = dict(row)
-        port['consoles'] = _normalize_consoles(port.get('console'))
-        port['features'] = json.loads(port['features'])
-        port['screenshots'] = json.loads(port['screenshots'])
-        if port.get('mod_links'):
-            try:
-                port['mod_links'] = json.loads(port['mod_links'])
-            except:
-                port['mod_links'] = []
-        port['popular'] = bool(port['popular'])
-        port['online_play'] = bool(port.get('online_play'))
-        
-        # Apply filter configurations with auto-detection
-        for filter_name in FILTER_CONFIGS:
-            port[filter_name] = get_filter_value(port, filter_name)
-        
-        ports.append(port)
-    
-    return ports
+        item = dict(row)
+        item['consoles'] = _normalize_consoles(item.get('console'))
+        item['popular'] = bool(item['popular'])
+        items.append(item)
+
+    return items, total, next_cursor
+
+# --- Id index (catalog_ids) ---
+
+# {DB_PATH: {id: 'game' | 'port'}} for every catalog id. Loaded once per
+# process (warm_caches, before gunicorn forks) and kept current by this
+# process's writes; ids written by other processes are picked up on a miss.
+_catalog_ids = {}
+
+def load_catalog_ids(conn=None):
+    """(Re)load the id index from the catalog; returns the number of ids"""
+    own = conn is None
+    conn = conn or get_db_connection()
+    try:
+        index = {row[0]: 'port' for row in conn.execute('SELECT id FROM ports')}
+        # A game and a port sharing an id resolve to the game, as /game/<id> always did
+        index.update((row[0], 'game') for row in conn.execute('SELECT id FROM games'))
+    finally:
+        if own:
+            conn.close()
+    _catalog_ids[DB_PATH] = index
+    return len(index)
+
+def _index_catalog_id(item_id, item_type, deleted=False):
+    index = _catalog_ids.get(DB_PATH)
+    if index is None:
+        return
+    if deleted:
+        # The other table may still hold the id; the next lookup finds it
+        if index.get(item_id) == item_type:
+            del index[item_id]
+    elif item_type == 'game' or index.get(item_id) != 'game':
+        index[item_id] = item_type
+
+def _lookup_item_type(conn, item_id):
+    row = conn.execute('''
+        SELECT 'game' FROM games WHERE id = ?
+        UNION ALL
+        SELECT 'port' FROM ports WHERE id = ?
+        LIMIT 1
+    ''', (item_id, item_id)).fetchone()
+    item_type = row[0] if row else None
+    index = _catalog_ids.get(DB_PATH)
+    if index is not None:
+        if item_type:
+            index[item_id] = item_type
+        else:
+            index.pop(item_id, None)
+    return item_type
+
+def get_catalog_item_type(item_id):
+    """'game' or 'port' for an id in the catalog, None if it is in neither table"""
+    item_type = _catalog_ids.get(DB_PATH, {}).get(item_id)
+    if item_type is None:
+        conn = get_db_connection()
+        try:
+            item_type = _lookup_item_type(conn, item_id)
+        finally:
+            conn.close()
+    return item_type
+
+def _item_row(conn, item_type, item_id):
+    table = 'ports' if item_type == 'port' else 'games'
+    return conn.execute(f'SELECT * FROM {table} WHERE id = ?', (item_id,)).fetchone()
+
+def resolve_item(item_id):
+    """(item_type, Game or Port record) for any catalog id, (None, None) if unknown.
+
+    One connection and, for indexed ids, one query: the index says which
+    table holds the id. An id the index misses or has wrong (written by
+    another process) costs one extra lookup, which then updates the index.
+    """
+    conn = get_db_connection()
+    try:
+        if DB_PATH not in _catalog_ids:
+            load_catalog_ids(conn)
+        item_type = _catalog_ids[DB_PATH].get(item_id)
+        row = _item_row(conn, item_type, item_id) if item_type else None
+        if row is None:
+            item_type = _lookup_item_type(conn, item_id)
+            row = _item_row(conn, item_type, item_id) if item_type else None
+    finally:
+        conn.close()
+    if row is None:
+        return None, None
+    return item_type, (Port if item_type == 'port' else Game).from_rows([row])[0]
 
 def get_game_by_id(game_id):
     """Get a specific game by ID"""
@@ -833,20 +2457,7 @@ def get_game_by_id(game_id):
     row = cursor.fetchone()
     conn.close()
     
-    if row:
-        game = dict(row)
-        game['consoles'] = _normalize_consoles(game.get('console'))
-        game['features'] = json.loads(game['features'])
-        game['screenshots'] = json.loads(game['screenshots'])
-        game['popular'] = bool(game['popular'])
-        game['online_play'] = bool(game.get('online_play'))
-        
-        # Apply filter configurations with auto-detection
-        for filter_name in FILTER_CONFIGS:
-            game[filter_name] = get_filter_value(game, filter_name)
-        
-        return game
-    return None
+    return Game.from_rows([row])[0] if row else None
 
 def get_port_by_id(port_id):
     """Get a specific port by ID"""
@@ -856,25 +2467,7 @@ def get_port_by_id(port_id):
     row = cursor.fetchone()
     conn.close()
     
-    if row:
-        port = dict(row)
-        port['consoles'] = _normalize_consoles(port.get('console'))
-        port['features'] = json.loads(port['features'])
-        port['screenshots'] = json.loads(port['screenshots'])
-        if port.get('mod_links'):
-            try:
-                port['mod_links'] = json.loads(port['mod_links'])
-            except:
-                port['mod_links'] = []
-        port['popular'] = bool(port['popular'])
-        port['online_play'] = bool(port.get('online_play'))
-        
-        # Apply filter configurations with auto-detection
-        for filter_name in FILTER_CONFIGS:
-            port[filter_name] = get_filter_value(port, filter_name)
-        
-        return port
-    return None
+    return Port.from_rows([row])[0] if row else None
 
 def create_request(title, base_game, console, app, patch_page_url, release_date, author, notes, ip_hash, user_agent_hash):
     """Create a new hack request"""
@@ -913,38 +2506,62 @@ def hash_string(s):
 
 def track_download(game_id, ip_address):
     """Track a download by game ID and IP address. Returns True if this is a new IP."""
-    conn = get_db_connection()
+    conn = get_analytics_connection(for_write=True)
     cursor = conn.cursor()
     
-    # Hash the IP for privacy
-    ip_hash = hash_string(ip_address)
+    # Hash the IP for privacy (stored as a 64-bit integer)
+    ip_hash = ip_hash_key(hash_string(ip_address))
     
     # Get current year-month for monthly tracking
     current_month = datetime.now().strftime('%Y-%m')
     
-    # Track in monthly_downloads table (allows one download per IP per month)
+    # Track in this month's monthly_downloads partition (allows one download per IP per month)
+    month_table = _ensure_month_table(conn, current_month)
+    item_key, item_type = _get_item_key(conn, game_id)
     try:
-        cursor.execute('''
-            INSERT INTO monthly_downloads (game_id, ip_hash, year_month)
-            VALUES (?, ?, ?)
-        ''', (game_id, ip_hash, current_month))
+        cursor.execute(f'''
+            INSERT INTO {month_table} (item_key, ip_hash)
+            VALUES (?, ?)
+        ''', (item_key, ip_hash))
+        counted_month = True
     except sqlite3.IntegrityError:
         # Already downloaded this month by this IP
-        pass
+        counted_month = False
     
     try:
         cursor.execute('''
-            INSERT INTO downloads (game_id, ip_hash)
+            INSERT INTO downloads (item_key, ip_hash)
             VALUES (?, ?)
-        ''', (game_id, ip_hash))
-        conn.commit()
-        conn.close()
-        return True
+        ''', (item_key, ip_hash))
+        cursor.execute('''
+            INSERT INTO download_totals (item_key, download_count)
+            VALUES (?, 1)
+            ON CONFLICT(item_key) DO UPDATE SET download_count = download_count + 1
+            RETURNING download_count
+        ''', (item_key,))
+        total = cursor.fetchone()[0]
     except sqlite3.IntegrityError:
         # This IP has already downloaded this game
-        conn.commit()  # Still commit the monthly tracking
-        conn.close()
-        return False
+        total = None
+
+    if counted_month:
+        # Daily bucket and trending score; decay_trending() ages the scores
+        cursor.execute('''
+            INSERT INTO daily_downloads (item_key, day, download_count)
+            VALUES (?, date('now'), 1)
+            ON CONFLICT(item_key, day) DO UPDATE SET download_count = download_count + 1
+        ''', (item_key,))
+        cursor.execute('''
+            INSERT INTO trending (item_key, score) VALUES (?, 1)
+            ON CONFLICT(item_key) DO UPDATE SET score = score + 1
+        ''', (item_key,))
+
+    # Ids outside the catalog are counted but never ranked
+    if item_type and (counted_month or total is not None):
+        _update_leaderboards(conn, item_key, item_type, current_month, month_table, counted_month, total)
+    conn.commit()
+    conn.close()
+    return total is not None
 
 def submit_game(submission_data, ip_address):
     """Submit a new game to the requests table"""
@@ -1071,6 +2688,90 @@ def get_feedback(status=None, feedback_type=None):
     
     return [dict(row) for row in rows]
 
+def get_feedback_counts():
+    """Get count of feedback entries by status"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT COALESCE(status, 'new') as status, COUNT(*) as count FROM feedback GROUP BY COALESCE(status, 'new')")
+        rows = cursor.fetchall()
+        
+        counts = {'new': 0, 'resolved': 0, 'ignored': 0}
+        for row in rows:
+            if row['status'] in counts:
+                counts[row['status']] = row['count']
+        
+        conn.close()
+        return counts
+    except Exception as e:
+        conn.close()
+        return {'new': 0, 'resolved': 0, 'ignored': 0}
+
+def get_feedback_by_id(feedback_id):
+    """Get a specific feedback entry by ID"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM feedback WHERE id = ?', (feedback_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    if row:
+        return dict(row)
+    return None
+
+def _encode_page_cursor(row):
+    """Encode the (submitted_at, id) of a row as an opaque keyset cursor string."""
+    return f"{row['submitted_at'] or ''}|{row['id']}"
+
+def _decode_page_cursor(cursor_value):
+    """Decode a keyset cursor; returns None for missing or malformed values."""
+    if not cursor_value or '|' not in cursor_value:
+        return None
+    submitted_at, _, row_id = cursor_value.rpartition('|')
+    try:
+        return submitted_at, int(row_id)
+    except ValueError:
+        return None
+
+def _get_queue_page(table, columns, status, before=None, limit=50):
+    """Keyset-paginated, newest-first page of an admin queue table.
+
+    Walks idx_<table>_status_submitted so each page costs O(limit) regardless
+    of queue size. Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    query = f'SELECT {columns} FROM {table} WHERE status = ?'
+    params = [status]
+    
+    position = _decode_page_cursor(before)
+    if position:
+        query += ' AND (submitted_at, id) < (?, ?)'
+        params.extend(position)
+    
+    query += ' ORDER BY submitted_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+    
+    cursor.execute(query, params)
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_page_cursor(rows[-1])
+    return rows, next_cursor
+
+def get_feedback_page(status, before=None, limit=50):
+    """Get one page of feedback for the admin dashboard. Returns (rows, next_cursor)."""
+    return _get_queue_page(
+        'feedback',
+        'id, type, title, description, email, submitted_at, status',
+        status, before, limit
+    )
+
 def update_feedback_status(feedback_id, status, admin_notes=None):
     """Update the status of a feedback entry"""
     conn = get_db_connection()
@@ -1100,13 +2801,13 @@ def delete_feedback(feedback_id):
 
 def get_download_count(game_id):
     """Get the number of unique IPs that have downloaded a game."""
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
-        SELECT COUNT(DISTINCT ip_hash) as count
+        SELECT COUNT(*) as count
         FROM downloads
-        WHERE game_id = ?
+        WHERE item_key = (SELECT item_key FROM item_keys WHERE item_id = ?)
     ''', (game_id,))
     
     row = cursor.fetchone()
@@ -1120,20 +2821,32 @@ def get_download_counts_for_ids(game_ids):
     if not game_ids:
         return {}
 
+    conn = get_analytics_connection()
+    # download_totals holds COUNT(*) of downloads per item, kept in step by track_download
+    rows = batch_lookup(conn, '''
+        SELECT k.item_id AS game_id, t.download_count as count
+        FROM item_keys k
+        JOIN download_totals t ON t.item_key = k.item_key
+        WHERE k.item_id IN {ids}
+    ''', game_ids)
+    conn.close()
+
+    return {row['game_id']: row['count'] for row in rows}
+
+
+def set_image_variants(item_id, variants, is_port=False):
+    """Store generated thumbnail variants for a game or port."""
+    table = 'ports' if is_port else 'games'
+
     conn = get_db_connection()
     cursor = conn.cursor()
-    placeholder = ','.join('?' for _ in game_ids)
-    cursor.execute(f'''
-        SELECT game_id, COUNT(DISTINCT ip_hash) as count
-        FROM downloads
-        WHERE game_id IN ({placeholder})
-        GROUP BY game_id
-    ''', tuple(game_ids))
-
-    rows = cursor.fetchall()
+    cursor.execute(f'UPDATE {table} SET image_variants = ? WHERE id = ?',
+                   (json.dumps(variants), item_id))
+    conn.commit()
+    success = cursor.rowcount > 0
     conn.close()
 
-    return {row['game_id']: row['count'] for row in rows}
+    return success
 
 
 def set_platform_instructions(game_id, platform, instructions_text, is_port=False):
@@ -1189,6 +2902,14 @@ def get_submission_counts():
         # Return defaults if query fails
         return {'new': 0, 'approved': 0, 'rejected': 0}
 
+def get_submissions_page(status, before=None, limit=50):
+    """Get one page of submissions for the admin dashboard. Returns (rows, next_cursor)."""
+    return _get_queue_page(
+        'requests',
+        'id, game_type, title, author, submitted_at, status',
+        status, before, limit
+    )
+
 def get_submission_by_id(submission_id):
     """Get a specific submission by ID"""
     conn = get_db_connection()
@@ -1268,11 +2989,15 @@ def update_game(game_id, data):
     
     values.append(game_id)
     query = f"UPDATE games SET {', '.join(update_parts)} WHERE id = ?"
+    item_key = _catalog_item_key(game_id, 'game') if FACET_SOURCE_FIELDS.intersection(data) else None
     
     try:
         cursor.execute(query, values)
-        conn.commit()
         success = cursor.rowcount > 0
+        if success and item_key is not None:
+            _sync_item_consoles(conn, 'game', game_id, item_key)
+            _sync_item_facets(conn, 'game', game_id, item_key)
+        conn.commit()
         conn.close()
         return success
     except Exception as e:
@@ -1324,11 +3049,15 @@ def update_port(port_id, data):
     
     values.append(port_id)
     query = f"UPDATE ports SET {', '.join(update_parts)} WHERE id = ?"
+    item_key = _catalog_item_key(port_id, 'port') if FACET_SOURCE_FIELDS.intersection(data) else None
     
     try:
         cursor.execute(query, values)
-        conn.commit()
         success = cursor.rowcount > 0
+        if success and item_key is not None:
+            _sync_item_consoles(conn, 'port', port_id, item_key)
+            _sync_item_facets(conn, 'port', port_id, item_key)
+        conn.commit()
         conn.close()
         return success
     except Exception as e:
@@ -1338,14 +3067,19 @@ def update_port(port_id, data):
 
 def delete_game(game_id):
     """Delete a game from the games table"""
+    item_key = _catalog_item_key(game_id, 'game', assign=False)
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('DELETE FROM games WHERE id = ?', (game_id,))
-        conn.commit()
         success = cursor.rowcount > 0
+        if success and item_key is not None:
+            _sync_item_consoles(conn, 'game', game_id, item_key)
+            _sync_item_facets(conn, 'game', game_id, item_key)
+        conn.commit()
         conn.close()
+        _index_catalog_id(game_id, 'game', deleted=True)
         return success
     except Exception as e:
         conn.close()
@@ -1354,14 +3088,19 @@ def delete_game(game_id):
 
 def delete_port(port_id):
     """Delete a port from the ports table"""
+    item_key = _catalog_item_key(port_id, 'port', assign=False)
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
         cursor.execute('DELETE FROM ports WHERE id = ?', (port_id,))
-        conn.commit()
         success = cursor.rowcount > 0
+        if success and item_key is not None:
+            _sync_item_consoles(conn, 'port', port_id, item_key)
+            _sync_item_facets(conn, 'port', port_id, item_key)
+        conn.commit()
         conn.close()
+        _index_catalog_id(port_id, 'port', deleted=True)
         return success
     except Exception as e:
         conn.close()
@@ -1372,15 +3111,25 @@ def get_monthly_download_counts(year_month=None):
     if year_month is None:
         year_month = datetime.now().strftime('%Y-%m')
     
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT game_id, COUNT(*) as count
-        FROM monthly_downloads
-        WHERE year_month = ?
-        GROUP BY game_id
-    ''', (year_month,))
+    try:
+        cursor.execute(f'''
+            SELECT k.item_id AS game_id, m.count
+            FROM (
+                SELECT item_key, COUNT(*) AS count
+                FROM {_monthly_table(year_month)}
+                GROUP BY item_key
+            ) m
+            JOIN item_keys k ON k.item_key = m.item_key
+        ''')
+    except sqlite3.OperationalError as e:
+        conn.close()
+        # No partition: no downloads that month, or already moved to cold storage
+        if 'no such table' in str(e):
+            return {}
+        raise
     
     counts = {row['game_id']: row['count'] for row in cursor.fetchall()}
     conn.close()
@@ -1395,20 +3144,23 @@ def get_monthly_download_counts_for_ids(game_ids, year_month=None):
     if year_month is None:
         year_month = datetime.now().strftime('%Y-%m')
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    placeholders = ','.join(['?' for _ in game_ids])
-    params = [year_month] + list(game_ids)
+    conn = get_analytics_connection()
     
-    cursor.execute(f'''
-        SELECT game_id, COUNT(*) as count
-        FROM monthly_downloads
-        WHERE year_month = ? AND game_id IN ({placeholders})
-        GROUP BY game_id
-    ''', params)
+    try:
+        rows = batch_lookup(conn, f'''
+            SELECT k.item_id AS game_id, COUNT(*) as count
+            FROM item_keys k
+            JOIN {_monthly_table(year_month)} m ON m.item_key = k.item_key
+            WHERE k.item_id IN {{ids}}
+            GROUP BY k.item_key
+        ''', game_ids)
+    except sqlite3.OperationalError as e:
+        conn.close()
+        if 'no such table' in str(e):
+            return {}
+        raise
     
-    counts = {row['game_id']: row['count'] for row in cursor.fetchall()}
+    counts = {row['game_id']: row['count'] for row in rows}
     conn.close()
     return counts
 
@@ -1426,19 +3178,23 @@ def archive_monthly_popular(year_month=None, top_n=20):
         else:
             year_month = f"{today.year}-{today.month - 1:02d}"
     
-    conn = get_db_connection()
+    if year_month not in get_monthly_partitions():
+        return {'games_archived': 0, 'ports_archived': 0}
+    month_table = _monthly_table(year_month)
+    
+    conn = attach_analytics(get_db_connection())
     cursor = conn.cursor()
     
     # Get top games for the month
-    cursor.execute('''
-        SELECT md.game_id, COUNT(*) as download_count
-        FROM monthly_downloads md
-        INNER JOIN games g ON md.game_id = g.id
-        WHERE md.year_month = ?
-        GROUP BY md.game_id
+    cursor.execute(f'''
+        SELECT k.item_id AS game_id, COUNT(*) as download_count
+        FROM analytics.{month_table} md
+        INNER JOIN analytics.item_keys k ON k.item_key = md.item_key
+        INNER JOIN games g ON k.item_id = g.id
+        GROUP BY md.item_key
         ORDER BY download_count DESC
         LIMIT ?
-    ''', (year_month, top_n))
+    ''', (top_n,))
     
     games = cursor.fetchall()
     for rank, row in enumerate(games, 1):
@@ -1452,15 +3208,15 @@ def archive_monthly_popular(year_month=None, top_n=20):
             pass  # Already archived
     
     # Get top ports for the month
-    cursor.execute('''
-        SELECT md.game_id, COUNT(*) as download_count
-        FROM monthly_downloads md
-        INNER JOIN ports p ON md.game_id = p.id
-        WHERE md.year_month = ?
-        GROUP BY md.game_id
+    cursor.execute(f'''
+        SELECT k.item_id AS game_id, COUNT(*) as download_count
+        FROM analytics.{month_table} md
+        INNER JOIN analytics.item_keys k ON k.item_key = md.item_key
+        INNER JOIN ports p ON k.item_id = p.id
+        GROUP BY md.item_key
         ORDER BY download_count DESC
         LIMIT ?
-    ''', (year_month, top_n))
+    ''', (top_n,))
     
     ports = cursor.fetchall()
     for rank, row in enumerate(ports, 1):
@@ -1545,7 +3301,10 @@ def check_and_archive_previous_month():
         # Check if there's any data for the previous month to archive
         counts = get_monthly_download_counts(prev_year_month)
         if counts:
-            return archive_monthly_popular(prev_year_month)
+            archived = archive_monthly_popular(prev_year_month)
+            # Drop last month's leaderboards and recount this month's exactly
+            rebuild_leaderboards()
+            return archived
     
     return None
 
@@ -1727,21 +3486,19 @@ def get_review_stats_batch(game_ids, game_type='romhack'):
         return {}
     
     conn = get_db_connection()
-    cursor = conn.cursor()
     
-    placeholders = ','.join(['?' for _ in game_ids])
-    cursor.execute(f'''
+    rows = batch_lookup(conn, '''
         SELECT 
             game_id,
             COUNT(*) as total,
             SUM(CASE WHEN recommended = 1 THEN 1 ELSE 0 END) as positive
         FROM reviews
-        WHERE game_id IN ({placeholders}) AND game_type = ? AND status = 'visible'
+        WHERE game_id IN {ids} AND game_type = ? AND status = 'visible'
         GROUP BY game_id
-    ''', game_ids + [game_type])
+    ''', game_ids, (game_type,))
     
     results = {}
-    for row in cursor.fetchall():
+    for row in rows:
         total = row['total'] or 0
         positive = row['positive'] or 0
         percentage = round((positive / total) * 100) if total > 0 else 0
@@ -1800,7 +3557,7 @@ def vote_helpful(review_id, voter_username, vote_type):
         # Check if user already voted
         cursor.execute('''
             SELECT vote_type FROM review_votes
-            WHERE review_id = ? AND ra_username = ?
+            WHERE review_id = ? AND voter_username = ?
         ''', (review_id, voter_username))
         
         existing = cursor.fetchone()
@@ -1810,7 +3567,7 @@ def vote_helpful(review_id, voter_username, vote_type):
                 # Remove vote (toggle off)
                 cursor.execute('''
                     DELETE FROM review_votes
-                    WHERE review_id = ? AND ra_username = ?
+                    WHERE review_id = ? AND voter_username = ?
                 ''', (review_id, voter_username))
                 
                 # Decrement counter
@@ -1823,7 +3580,7 @@ def vote_helpful(review_id, voter_username, vote_type):
                 old_type = existing['vote_type']
                 cursor.execute('''
                     UPDATE review_votes SET vote_type = ?, created_at = CURRENT_TIMESTAMP
-                    WHERE review_id = ? AND ra_username = ?
+                    WHERE review_id = ? AND voter_username = ?
                 ''', (vote_type, review_id, voter_username))
                 
                 # Adjust counters
@@ -1839,7 +3596,7 @@ def vote_helpful(review_id, voter_username, vote_type):
         else:
             # New vote
             cursor.execute('''
-                INSERT INTO review_votes (review_id, ra_username, vote_type)
+                INSERT INTO review_votes (review_id, voter_username, vote_type)
                 VALUES (?, ?, ?)
             ''', (review_id, voter_username, vote_type))
             
@@ -1885,14 +3642,12 @@ def get_user_votes(review_ids, voter_username):
         return {}
     
     conn = get_db_connection()
-    cursor = conn.cursor()
     
-    placeholders = ','.join(['?' for _ in review_ids])
-    cursor.execute(f'''
+    rows = batch_lookup(conn, '''
         SELECT review_id, vote_type FROM review_votes
-        WHERE review_id IN ({placeholders}) AND voter_username = ?
-    ''', review_ids + [voter_username])
+        WHERE review_id IN {ids} AND voter_username = ?
+    ''', review_ids, (voter_username,))
     
-    votes = {row['review_id']: row['vote_type'] for row in cursor.fetchall()}
+    votes = {row['review_id']: row['vote_type'] for row in rows}
     conn.close()
     return votes
\ No newline at end of file
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Freeze the public pages to static HTML for nginx to serve with try_files.
+
+Renders /, /romhacks, /ports, the static pages, every base game hub and
+every game and port page through the app (WSGI test client, so the output
+is exactly what the routes return) into --out, e.g. /game/<id> ->
+<out>/game/<id>.html and / -> <out>/index.html. nginx.conf serves these
+for anonymous GET requests without a query string and falls back to the
+app otherwise (see the frozen-pages section there).
+
+Frozen pages are marked with data-frozen and refresh their download
+counters from /api/download-counts, so counts never force a re-render.
+Each page gets a signature of what it is built from: the template and
+code files, its catalog row (detail pages), its members in download order
+(hubs) or the leaderboard order and console counts (/, /romhacks, /ports). --incremental
+re-renders only pages whose signature changed since the last run
+(recorded in <out>/.freeze-manifest.json) and removes pages whose item was
+deleted, so it is cheap enough to run every minute. A run holds an
+exclusive lock on <out>/.freeze.lock; a run that finds it taken (say, cron
+while a full freeze is still going) exits without touching anything.
+
+    python freeze.py --out /var/www/romhacks/frozen --base-url https://example.com
+    python freeze.py --out /var/www/romhacks/frozen --base-url https://example.com --incremental
+    python freeze.py --out frozen --base-url http://localhost --db requests-copy.db --workers 8 --report freeze.json
+
+Suggested crontab (run from the app directory):
+    * * * * *  python freeze.py --out /var/www/romhacks/frozen --base-url https://example.com --incremental
+"""
+
+import argparse
+import fcntl
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = '.freeze-manifest.json'
+# Held for the whole run: cron's --incremental runs and a long full freeze never overlap
+LOCK_FILE = '.freeze.lock'
+STATIC_PAGES = ('/patcher', '/contact', '/claim', '/privacy-policy', '/disclaimer', '/submit')
+# Files whose changes re-render every page (templates, routes, emulator guides)
+SOURCE_PATTERNS = ('app.py', 'database.py', 'emulator_guides.json', 'templates/*.html')
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(repr(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def output_path(out_dir, path):
+    if path == '/':
+        return os.path.join(out_dir, 'index.html')
+    return os.path.join(out_dir, path.lstrip('/') + '.html')
+
+
+def _file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# mkstemp creates 0600 files; frozen pages must stay readable by nginx
+FILE_MODE = _file_mode()
+
+
+def _write_atomic(path, data):
+    """Write through a unique temp file in the same directory, then rename over path."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _safe(path):
+    return all(part and not part.startswith('.') for part in path.strip('/').split('/')) or path == '/'
+
+
+# --- Signatures -----------------------------------------------------------------
+
+def _source_digest(base_url):
+    h = hashlib.blake2b(digest_size=16)
+    for pattern in SOURCE_PATTERNS:
+        for name in sorted(glob.glob(os.path.join(HERE, pattern))):
+            h.update(name.encode('utf-8'))
+            with open(name, 'rb') as f:
+                h.update(f.read())
+    # The footer shows the current year
+    return _digest(h.hexdigest(), base_url, datetime.now().year)
+
+
+def page_signatures(app_module, base_url):
+    """{path: signature} for every page that should be frozen"""
+    import database
+    source = _source_digest(base_url)
+
+    conn = database.get_db_connection()
+    try:
+        rows = {table: {row['id']: _digest(tuple(row)) for row in conn.execute(f'SELECT * FROM {table}')}
+                for table in ('games', 'ports')}
+    finally:
+        conn.close()
+
+    pages = {path: source for path in STATIC_PAGES}
+    for item_id, row in rows['games'].items():
+        pages[f'/game/{item_id}'] = _digest(source, row)
+    for item_id, row in rows['ports'].items():
+        pages[f'/port/{item_id}'] = _digest(source, row)
+
+    # Listing pages: the leaderboard order and the rows shown (counts are hydrated)
+    month = datetime.now().strftime('%B %Y')
+    popular = {}
+    for item_type, table in (('game', 'games'), ('port', 'ports')):
+        popular[item_type] = [(item['id'], rows[table].get(item['id']))
+                              for item in database.get_popular_items(item_type, 12)]
+    pages['/'] = _digest(source, month, popular['game'], popular['port'])
+    # The console filters show per-console counts
+    pages['/romhacks'] = _digest(source, month, popular['game'], database.get_console_counts('game'))
+    pages['/ports'] = _digest(source, month, popular['port'], database.get_console_counts('port'))
+
+    # Hubs: members in the order the route sorts them (all-time downloads)
+    games = database.get_games('sitemap')
+    totals = database.get_download_counts_for_ids([game['id'] for game in games])
+    for slug in app_module.get_hub_slugs(games):
+        _, members = app_module.get_hub_games(slug, games)
+        if not members:
+            continue
+        members = sorted(members, key=lambda game: totals.get(game['id'], 0), reverse=True)
+        pages[f'/{slug}-rom-hacks'] = _digest(source, [(game['id'], rows['games'][game['id']]) for game in members])
+
+    return {path: signature for path, signature in pages.items() if _safe(path)}
+
+
+# --- Rendering ------------------------------------------------------------------
+
+_client = None
+
+
+def _init_worker(base_url, out_dir):
+    global _client
+    import app as app_module
+    app_module.reinit_after_fork()
+    _client = (app_module.app.test_client(), base_url, out_dir, app_module.FREEZE_ENVIRON_KEY)
+
+
+def _render(path):
+    client, base_url, out_dir, environ_key = _client
+    response = client.get(path, base_url=base_url, environ_base={environ_key: True})
+    body = response.get_data()
+    status = response.status_code
+    response.close()
+    if status != 200 or response.mimetype != 'text/html':
+        return path, status, 0
+    target = output_path(out_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    _write_atomic(target, body)
+    return path, status, len(body)
+
+
+def _remove(out_dir, path):
+    try:
+        os.remove(output_path(out_dir, path))
+    except FileNotFoundError:
+        pass
+
+
+def unfreeze(out_dir, paths):
+    """Delete the frozen copies of paths; nginx then hands them to the app
+    until the next run re-renders them (their signatures changed).
+    Returns the number of files removed."""
+    removed = 0
+    for path in paths:
+        if not _safe(path):
+            continue
+        try:
+            os.remove(output_path(out_dir, path))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f).get('pages', {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_manifest(out_dir, pages):
+    payload = {'generated_at': datetime.now().isoformat(timespec='seconds'), 'pages': pages}
+    _write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(payload).encode('utf-8'))
+
+
+def _lock(out_dir):
+    """Exclusive lock on <out>/.freeze.lock, or None if another run holds it."""
+    lock = open(os.path.join(out_dir, LOCK_FILE), 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def freeze(out_dir, base_url, incremental=False, workers=None):
+    """Render changed (or all) pages into out_dir. Returns a timing report dict,
+    or None when another freeze is running on out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    lock = _lock(out_dir)
+    if lock is None:
+        return None
+    try:
+        return _freeze(out_dir, base_url, incremental, workers)
+    finally:
+        lock.close()
+
+
+def _freeze(out_dir, base_url, incremental, workers):
+    import app as app_module
+    started = time.perf_counter()
+    app_module.create_app()
+    app_module.limiter.enabled = False
+
+    pages = page_signatures(app_module, base_url)
+    signed = time.perf_counter()
+
+    previous = _load_manifest(out_dir)
+    if incremental:
+        todo = [path for path, signature in pages.items()
+                if previous.get(path) != signature or not os.path.exists(output_path(out_dir, path))]
+    else:
+        todo = list(pages)
+    removed = [path for path in previous if path not in pages]
+    for path in removed:
+        _remove(out_dir, path)
+
+    manifest = {path: signature for path, signature in previous.items() if path in pages}
+    rendered = failed = written = 0
+    workers = max(1, workers or os.cpu_count() or 1)
+    if todo:
+        # Forked workers share the app the parent already initialized (like gunicorn's preload)
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(base_url, out_dir)) as pool:
+            for path, status, size in pool.imap_unordered(_render, todo, chunksize=32):
+                if status == 200:
+                    rendered += 1
+                    written += size
+                    manifest[path] = pages[path]
+                else:
+                    # Gone since the signatures were taken (or an error): let the app answer
+                    failed += 1
+                    manifest.pop(path, None)
+                    _remove(out_dir, path)
+                    print(f"✗ {path}: HTTP {status}")
+    _save_manifest(out_dir, manifest)
+    finished = time.perf_counter()
+
+    render_s = finished - signed
+    return {
+        'mode': 'incremental' if incremental else 'full',
+        'workers': workers,
+        'pages': len(pages),
+        'rendered': rendered,
+        'unchanged': len(pages) - len(todo),
+        'removed': len(removed),
+        'failed': failed,
+        'bytes_written': written,
+        'signatures_s': round(signed - started, 2),
+        'render_s': round(render_s, 2),
+        'elapsed_s': round(finished - started, 2),
+        'pages_per_s': round(rendered / render_s, 1) if render_s and rendered else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render public pages to static HTML for nginx')
+    parser.add_argument('--out', required=True, help='Output directory (nginx root for frozen pages)')
+    parser.add_argument('--base-url', required=True, help='Public site URL used for canonical and structured-data links')
+    parser.add_argument('--incremental', action='store_true', help='Only re-render pages whose sources changed')
+    parser.add_argument('--db', help='Catalog database (default: requests.db)')
+    parser.add_argument('--workers', type=int, help='Render processes (default: CPU count)')
+    parser.add_argument('--report', help='Write the timing report as JSON')
+    args = parser.parse_args()
+
+    if args.db:
+        if not os.path.exists(args.db):
+            print(f"✗ Database not found: {args.db}")
+            return 1
+        import database
+        database.DB_PATH = args.db
+
+    report = freeze(os.path.abspath(args.out), args.base_url.rstrip('/'), args.incremental, args.workers)
+    if report is None:
+        # Expected when a full freeze outlasts the cron interval
+        print(f"✓ Another freeze is running on {args.out}, skipped")
+        return 0
+    print(f"✓ {report['mode'].capitalize()} freeze: {report['rendered']} rendered, {report['unchanged']} unchanged, "
+          f"{report['removed']} removed, {report['failed']} failed of {report['pages']} pages")
+    print(f"  - signatures {report['signatures_s']}s, render {report['render_s']}s "
+          f"({report['pages_per_s']} pages/s on {report['workers']} workers), "
+          f"{report['bytes_written'] / 1024 / 1024:.1f} MB written")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report written to {args.report}")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) through the
+create_app() factory, so init_db(), the monthly archive check and template
+compilation run a single time instead of once per worker. Objects created
+during preload are moved out of the garbage collector's reach with
+gc.freeze() before forking; otherwise the first collection in each worker
+touches every object header and un-shares the pages copy-on-write.
+
+Workers use gthread: most slow requests wait on RetroAchievements or R2,
+so a few threads per worker keep those from blocking the whole process.
+Settings can be overridden with the GUNICORN_* environment variables below.
+"""
+
+import gc
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:5000')
+
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically; jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before workers fork."""
+    import request_metrics
+    request_metrics.clear_worker_files()
+    gc.collect()
+    gc.freeze()
+    server.log.info("Froze %d objects after preload", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """Reopen per-process resources instead of sharing the master's."""
+    from app import reinit_after_fork
+    reinit_after_fork()
+
+
+def worker_exit(server, worker):
+    """Write the last few seconds of request metrics before the worker exits."""
+    import request_metrics
+    request_metrics.flush_pending()
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's request metrics in the merged totals."""
+    import request_metrics
+    request_metrics.retire_worker(worker.pid)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Responsive image pipeline for cover images and screenshots.
+
+Generates downscaled WebP/AVIF derivatives of every image referenced by a
+game or port, uploads them to R2 and records their URLs and intrinsic
+dimensions in the row's image_variants column. Templates turn that into
+srcset/width/height attributes (see the image filters in app.py).
+
+Work runs in a small process pool so admin saves return immediately.
+
+Usage:
+    python image_pipeline.py --backfill            # Process all items missing variants
+    python image_pipeline.py --backfill --force    # Regenerate everything
+    python image_pipeline.py --item <id> [--port]  # Process a single item
+"""
+
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import requests
+
+import database
+from storage import get_r2_client, get_public_url
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional; the pipeline is a no-op without it
+    Image = None
+    features = None
+
+# Target widths for card/grid thumbnails. Sources narrower than a width are not upscaled.
+VARIANT_WIDTHS = (320, 640, 960)
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+FETCH_TIMEOUT = 20
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+
+_executor = None
+
+
+def _get_executor():
+    """Lazily create the shared process pool (one per web worker process)."""
+    global _executor
+    if _executor is None:
+        max_workers = int(os.environ.get('IMAGE_PIPELINE_WORKERS', '2'))
+        # spawn keeps boto3/requests connection pools out of the forked children
+        _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def reset_executor():
+    """Forget a pool inherited across fork; the child creates its own on first use."""
+    global _executor
+    _executor = None
+
+
+def _variant_formats():
+    formats = []
+    if features is not None and features.check('avif'):
+        formats.append('avif')
+    if features is not None and features.check('webp'):
+        formats.append('webp')
+    return formats
+
+
+def _fetch_source(url):
+    response = requests.get(url, timeout=FETCH_TIMEOUT, stream=True)
+    response.raise_for_status()
+    data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f'Source image too large: {url}')
+    return data
+
+
+def build_variants(source_bytes):
+    """Decode an image and encode downscaled variants.
+
+    Returns (width, height, [(format, width, height, bytes), ...]).
+    """
+    with Image.open(io.BytesIO(source_bytes)) as img:
+        img.load()
+        width, height = img.size
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+        encoded = []
+        targets = sorted({w for w in VARIANT_WIDTHS if w < width} | {min(width, VARIANT_WIDTHS[-1])})
+        for target in targets:
+            target_height = max(1, round(height * target / width))
+            resized = img if target == width else img.resize((target, target_height), Image.LANCZOS)
+            for fmt in _variant_formats():
+                buf = io.BytesIO()
+                if fmt == 'avif':
+                    resized.save(buf, format='AVIF', quality=AVIF_QUALITY)
+                else:
+                    resized.save(buf, format='WEBP', quality=WEBP_QUALITY, method=4)
+                encoded.append((fmt, target, target_height, buf.getvalue()))
+
+    return width, height, encoded
+
+
+def process_image(url, s3=None, existing=None):
+    """Generate and upload variants for one source URL. Returns an image_variants entry.
+
+    Objects are keyed by a hash of the fetched source bytes, not the URL, so
+    new bytes behind an unchanged URL get new (immutable) object keys. When
+    the bytes still match `existing`, that entry is returned as is.
+    """
+    s3 = s3 or get_r2_client()
+    if s3 is None:
+        raise RuntimeError('R2 storage not configured')
+    bucket = os.environ.get('R2_BUCKET')
+
+    source = _fetch_source(url)
+    source_hash = hashlib.sha1(source).hexdigest()[:16]
+    if existing and existing.get('source') == source_hash:
+        return existing
+
+    width, height, encoded = build_variants(source)
+
+    variants = {}
+    for fmt, w, h, data in encoded:
+        object_key = f"thumbs/{source_hash}/{w}.{fmt}"
+        s3.put_object(
+            Bucket=bucket,
+            Key=object_key,
+            Body=data,
+            ContentType=f'image/{fmt}',
+            CacheControl='public, max-age=31536000, immutable'
+        )
+        variants.setdefault(fmt, []).append([get_public_url(object_key), w, h])
+
+    return {'width': width, 'height': height, 'source': source_hash, 'variants': variants}
+
+
+def _item_sources(item):
+    sources = []
+    if item.get('image_url'):
+        sources.append(item['image_url'])
+    for shot in item.get('screenshots') or []:
+        if shot and shot not in sources:
+            sources.append(shot)
+    return sources
+
+
+def process_item_images(item_id, is_port=False, force=False):
+    """Process every cover/screenshot of a game or port and store the results.
+
+    Runs inside the process pool; safe to call directly from scripts.
+    """
+    if Image is None:
+        return {'id': item_id, 'processed': 0, 'errors': ['Pillow is not installed']}
+
+    item = database.get_port_by_id(item_id) if is_port else database.get_game_by_id(item_id)
+    if not item:
+        return {'id': item_id, 'processed': 0, 'errors': ['Item not found']}
+
+    sources = _item_sources(item)
+    existing = item.get('image_variants') or {}
+    # Drop entries for images that are no longer referenced by the item
+    variants = {url: entry for url, entry in existing.items() if url in sources}
+
+    s3 = get_r2_client()
+    processed = 0
+    errors = []
+    for url in sources:
+        if url in variants and not force:
+            continue
+        try:
+            variants[url] = process_image(url, s3, variants.get(url))
+            processed += 1
+        except Exception as e:
+            errors.append(f'{url}: {e}')
+
+    if processed or variants != existing:
+        database.set_image_variants(item_id, variants, is_port)
+
+    return {'id': item_id, 'processed': processed, 'errors': errors}
+
+
+def _log_result(future):
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"Image pipeline job failed: {e}")
+        return
+    for error in result['errors']:
+        print(f"Image pipeline error for {result['id']}: {error}")
+
+
+def schedule_item_images(item_id, is_port=False):
+    """Queue variant generation for an item without blocking the request."""
+    if Image is None or not item_id:
+        return None
+    try:
+        future = _get_executor().submit(process_item_images, item_id, is_port)
+    except Exception as e:
+        print(f"Error scheduling image processing for {item_id}: {e}")
+        return None
+    future.add_done_callback(_log_result)
+    return future
+
+
+def backfill(force=False, max_workers=None):
+    """Generate variants for every game and port that is missing them."""
+    jobs = []
+    for game in database.get_games():
+        if force or any(url not in game['image_variants'] for url in _item_sources(game)):
+            jobs.append((game['id'], False))
+    for port in database.get_ports():
+        if force or any(url not in port['image_variants'] for url in _item_sources(port)):
+            jobs.append((port['id'], True))
+
+    print(f"Processing images for {len(jobs)} items...")
+    processed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(process_item_images, item_id, is_port, force) for item_id, is_port in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            processed += result['processed']
+            status = '✓' if not result['errors'] else '✗'
+            print(f"  {status} {result['id']}: {result['processed']} image(s)")
+            for error in result['errors']:
+                print(f"      {error}")
+
+    print(f"\n✓ Generated variants for {processed} images")
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate responsive image variants')
+    parser.add_argument('--backfill', action='store_true', help='Process all items missing variants')
+    parser.add_argument('--item', help='Process a single game/port by ID')
+    parser.add_argument('--port', action='store_true', help='Treat --item as a port ID')
+    parser.add_argument('--force', action='store_true', help='Regenerate existing variants')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size')
+    args = parser.parse_args()
+
+    if Image is None:
+        print("✗ Pillow is not installed (pip install Pillow)")
+        return 1
+
+    database.init_db()
+
+    if args.item:
+        result = process_item_images(args.item, args.port, args.force)
+        print(f"✓ {result['id']}: {result['processed']} image(s)")
+        for error in result['errors']:
+            print(f"  ✗ {error}")
+    elif args.backfill:
+        backfill(force=args.force, max_workers=args.workers)
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -17,7 +17,10 @@ import sys
 import argparse
 import shutil
 from datetime import datetime
-from database import DB_PATH, FILTER_CONFIGS, get_filter_value
+from database import (
+    DB_PATH, FILTER_CONFIGS, get_filter_value, get_analytics_db_path,
+    get_analytics_connection, init_analytics_db, migrate_analytics_tables, backup_sqlite
+)
 
 def backup_database():
     """Create a backup of the current database"""
@@ -31,6 +34,10 @@ def backup_database():
     try:
         shutil.copy2(DB_PATH, backup_path)
         print(f"✓ Database backed up to: {backup_path}")
+        analytics_path = get_analytics_db_path()
+        if os.path.exists(analytics_path):
+            backup_sqlite(analytics_path, f"{analytics_path}.backup_{timestamp}")
+            print(f"✓ Analytics database backed up to: {analytics_path}.backup_{timestamp}")
         return backup_path
     except Exception as e:
         print(f"✗ Failed to backup database: {e}")
@@ -82,53 +89,25 @@ def migrate_add_game_series_column():
     finally:
         conn.close()
 
-def migrate_add_monthly_downloads_table():
-    """Add monthly_downloads table for tracking downloads per month"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def migrate_move_download_analytics():
+    """Move downloads, monthly_downloads and download_totals into analytics.db"""
     migrations_applied = []
     
     try:
-        # Check if table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='monthly_downloads'")
-        if not cursor.fetchone():
-            cursor.execute('''
-                CREATE TABLE monthly_downloads (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    game_id TEXT NOT NULL,
-                    ip_hash TEXT NOT NULL,
-                    year_month TEXT NOT NULL,
-                    downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(game_id, ip_hash, year_month)
-                )
-            ''')
-            migrations_applied.append("Created monthly_downloads table")
-            print("  ✓ Created monthly_downloads table")
+        init_analytics_db()
+        copied = migrate_analytics_tables()
+        if copied:
+            for table, count in copied.items():
+                migrations_applied.append(f"Moved {count} {table} rows to analytics.db")
+                print(f"  ✓ Moved {count:,} rows from {table} to analytics.db")
+            print("  - Run VACUUM on the catalog database to reclaim the space they used")
         else:
-            print("  - monthly_downloads table already exists")
-        
-        # Create index
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='idx_monthly_downloads_year_month'")
-        if not cursor.fetchone():
-            cursor.execute('''
-                CREATE INDEX idx_monthly_downloads_year_month
-                ON monthly_downloads(year_month)
-            ''')
-            migrations_applied.append("Created index on monthly_downloads")
-            print("  ✓ Created index idx_monthly_downloads_year_month")
-        else:
-            print("  - Index idx_monthly_downloads_year_month already exists")
-        
-        conn.commit()
+            print("  - Download analytics already live in analytics.db")
         return migrations_applied
     
     except Exception as e:
-        conn.rollback()
         print(f"  ✗ Error: {e}")
         return []
-    finally:
-        conn.close()
 
 def migrate_add_monthly_popular_history_table():
     """Add monthly_popular_history table for storing past months' top games"""
@@ -287,9 +266,11 @@ def verify_schema():
             issues.append(f"Missing column '{col}' in reviews table")
     
     # Check tables exist
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='monthly_downloads'")
-    if not cursor.fetchone():
-        issues.append("Missing table 'monthly_downloads'")
+    analytics = get_analytics_connection()
+    for table in ('downloads', 'monthly_downloads', 'download_totals'):
+        if not analytics.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name=?", (table,)).fetchone():
+            issues.append(f"Missing table '{table}' in analytics.db")
+    analytics.close()
     
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='monthly_popular_history'")
     if not cursor.fetchone():
@@ -334,8 +315,8 @@ def main():
     print("\n1. Adding game_series column...")
     all_migrations.extend(migrate_add_game_series_column())
     
-    print("\n2. Adding monthly_downloads table...")
-    all_migrations.extend(migrate_add_monthly_downloads_table())
+    print("\n2. Moving download analytics to analytics.db...")
+    all_migrations.extend(migrate_move_download_analytics())
     
     print("\n3. Adding monthly_popular_history table...")
     all_migrations.extend(migrate_add_monthly_popular_history_table())
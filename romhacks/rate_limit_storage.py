@@ -0,0 +1,200 @@
+"""
+SQLite-backed storage for Flask-Limiter shared by all gunicorn workers.
+
+The default ``memory://`` storage keeps one set of counters per worker, so
+with 4 workers every limit is effectively 4x its configured value and all
+counters reset on restart. This backend keeps the counters in a small
+WAL-mode SQLite file instead, so every worker on the host sees the same
+windows and they survive restarts.
+
+Importing this module registers the ``sqlite://`` storage scheme with the
+``limits`` library:
+
+    sqlite:///ratelimit.db            (relative to the working directory)
+    sqlite:////var/lib/romhacks/rl.db (absolute path)
+
+Supports the fixed-window and sliding-window-counter strategies. Each hit
+is a single short write transaction on a WITHOUT ROWID table; with WAL and
+synchronous=NORMAL there is no fsync per check.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from math import floor
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+# Expired rows are purged on roughly one in PURGE_EVERY increments
+PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, timeout=5.0, **options):
+        self.path = self._path_from_uri(uri)
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._init_schema()
+
+    @staticmethod
+    def _path_from_uri(uri):
+        if not uri:
+            return 'ratelimit.db'
+        path = urlparse(uri).path
+        # sqlite:///relative.db -> "relative.db", sqlite:////abs/path.db -> "/abs/path.db"
+        if path.startswith('/'):
+            path = path[1:]
+        return path or 'ratelimit.db'
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        """One connection per thread, reopened after fork so workers never share a handle."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def reset_connections(self):
+        """Forget every cached connection (called after fork)."""
+        self._local = threading.local()
+
+    def _init_schema(self):
+        # Use a throwaway connection so a preloading master holds no handle
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _purge_expired(self, conn, now):
+        conn.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+
+    # --- fixed window -----------------------------------------------------
+
+    def _incr(self, conn, key, expiry, amount, now):
+        row = conn.execute('''
+            INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            RETURNING count
+        ''', (key, amount, now + expiry, now, now)).fetchone()
+        return row[0]
+
+    def incr(self, key, expiry, amount=1):
+        conn = self._connection()
+        now = time.time()
+        if random.randrange(PURGE_EVERY) == 0:
+            self._purge_expired(conn, now)
+        return self._incr(conn, key, expiry, amount, now)
+
+    def decr(self, key, amount=1):
+        conn = self._connection()
+        row = conn.execute('''
+            UPDATE rate_limits SET count = MAX(count - ?, 0)
+            WHERE key = ? AND expires_at > ?
+            RETURNING count
+        ''', (amount, key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?',
+            (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        cursor = self._connection().execute('DELETE FROM rate_limits')
+        return cursor.rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    # --- sliding window counter ---------------------------------------------
+
+    def _window_info(self, conn, previous_key, current_key, expiry, now):
+        counts = dict(conn.execute(
+            'SELECT key, count FROM rate_limits WHERE key IN (?, ?) AND expires_at > ?',
+            (previous_key, current_key, now)
+        ).fetchall())
+        previous_count = counts.get(previous_key, 0)
+        current_count = counts.get(current_key, 0)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        conn = self._connection()
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        # Read-check-increment under one write lock so concurrent workers
+        # can never overshoot the limit.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            previous_count, previous_ttl, current_count, _ = self._window_info(
+                conn, previous_key, current_key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                conn.execute('COMMIT')
+                return False
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            conn.execute('COMMIT')
+            return True
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._window_info(self._connection(), previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        self._connection().execute('DELETE FROM rate_limits WHERE key IN (?, ?)',
+                                   (previous_key, current_key))
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Replay nginx access logs against the app and report per-route latency.
+
+Reads logs in nginx's default "combined" format (what nginx.conf writes)
+and re-issues the requests with their original relative timing, optionally
+sped up. Requests are spread round-robin over worker processes, which
+either call the app in-process through the WSGI test client or send HTTP
+to a running gunicorn.
+
+    python replay_access_log.py access.log --db requests-copy.db --workers 4
+    python replay_access_log.py access.log.1 access.log.2.gz --speed 10
+    python replay_access_log.py access.log --target http://127.0.0.1:5000
+    python replay_access_log.py access.log --start-gunicorn --db requests-copy.db
+
+WSGI mode works on a temporary copy of --db (and its analytics.db) so
+replayed writes (download tracking, feedback) never touch the original. Rate limiting is disabled in
+WSGI mode and in --start-gunicorn mode (RATELIMIT_ENABLED=0); when
+targeting an already running server, start it with RATELIMIT_ENABLED=0.
+
+Request bodies are not in access logs: POSTs are replayed with an empty
+body, so endpoints that need one (reviews, feedback) show up as 4xx.
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# $remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent "$http_referer" "$http_user_agent"
+COMBINED = re.compile(
+    r'(?P<addr>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)(?: [^"]*)?" '
+    r'(?P<status>\d{3}) \S+ "(?P<referer>[^"]*)" "(?P<agent>[^"]*)"'
+)
+REPLAYED_METHODS = ('GET', 'HEAD', 'POST')
+
+
+def _open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def parse_logs(paths, include_static=False, limit=None):
+    """Yield (timestamp, method, path, remote_addr, user_agent), sorted by time."""
+    entries = []
+    skipped = 0
+    for path in paths:
+        with _open_log(path) as f:
+            for line in f:
+                match = COMBINED.match(line)
+                if not match or match['method'] not in REPLAYED_METHODS:
+                    skipped += 1
+                    continue
+                if not include_static and match['path'].startswith('/static/'):
+                    continue
+                try:
+                    ts = datetime.strptime(match['time'], '%d/%b/%Y:%H:%M:%S %z').timestamp()
+                except ValueError:
+                    skipped += 1
+                    continue
+                entries.append((ts, match['method'], match['path'], match['addr'], match['agent']))
+    entries.sort(key=lambda entry: entry[0])
+    if limit:
+        entries = entries[:limit]
+    return entries, skipped
+
+
+def _route_matcher():
+    """Map paths to Flask rules ("/game/<game_id>") so results group by route."""
+    import app as app_module
+    adapter = app_module.app.url_map.bind('localhost')
+
+    def match(method, path):
+        try:
+            rule, _ = adapter.match(path.split('?', 1)[0], method=method, return_rule=True)
+            return rule.rule
+        except Exception:
+            return '<unmatched>'
+    return match
+
+
+# --- Workers --------------------------------------------------------------------
+
+def _wsgi_sender(db_path):
+    import database
+    database.DB_PATH = db_path
+    import app as app_module
+    flask_app = app_module.create_app()
+    client = flask_app.test_client()
+
+    def send(method, path, addr, agent):
+        response = client.open(path, method=method,
+                               headers={'User-Agent': agent},
+                               environ_base={'REMOTE_ADDR': addr})
+        response.close()
+        return response.status_code
+    return send
+
+
+def _http_sender(target):
+    base = target.rstrip('/')
+
+    def send(method, path, addr, agent):
+        data = b'' if method == 'POST' else None
+        req = urllib.request.Request(base + path, data=data, method=method,
+                                     headers={'User-Agent': agent, 'X-Forwarded-For': addr})
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (urllib.error.URLError, OSError):
+            return 0
+    return send
+
+
+def _worker(entries, start_at, speed, mode, mode_arg, workdir, results):
+    os.chdir(workdir)
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    os.environ.setdefault('SLOW_QUERY_MS', '-1')
+    sys.path.insert(0, HERE)
+    send = _wsgi_sender(mode_arg) if mode == 'wsgi' else _http_sender(mode_arg)
+    match = _route_matcher()
+
+    samples = []
+    for offset, method, path, addr, agent in entries:
+        scheduled = start_at + (offset / speed if speed else 0)
+        delay = scheduled - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        lag = max(0.0, time.time() - scheduled)
+        begin = time.perf_counter()
+        try:
+            status = send(method, path, addr, agent)
+        except Exception:
+            status = 0
+        latency = time.perf_counter() - begin
+        samples.append((method, match(method, path), status, latency * 1000, lag * 1000))
+    results.put(samples)
+
+
+# --- Reporting ------------------------------------------------------------------
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    by_route = defaultdict(list)
+    for method, route, status, latency, lag in samples:
+        by_route[f"{method} {route}"].append((status, latency))
+
+    routes = {}
+    for key, items in by_route.items():
+        latencies = sorted(latency for _, latency in items)
+        routes[key] = {
+            'count': len(items),
+            'errors_5xx': sum(1 for status, _ in items if status >= 500 or status == 0),
+            'client_4xx': sum(1 for status, _ in items if 400 <= status < 500),
+            'p50_ms': round(_percentile(latencies, 50), 2),
+            'p90_ms': round(_percentile(latencies, 90), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+    all_latencies = sorted(sample[3] for sample in samples)
+    lags = sorted(sample[4] for sample in samples)
+    return {
+        'requests': len(samples),
+        'elapsed_s': round(elapsed, 2),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(_percentile(all_latencies, 50), 2),
+        'p99_ms': round(_percentile(all_latencies, 99), 2),
+        # How late requests were sent versus the replay schedule: high values
+        # mean the workers (or the server) could not keep up
+        'schedule_lag_p99_ms': round(_percentile(lags, 99), 2),
+        'routes': dict(sorted(routes.items(), key=lambda item: -item[1]['count'])),
+    }
+
+
+def print_report(report):
+    print(f"\n{'Route':<46} {'count':>7} {'5xx':>5} {'4xx':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for key, r in report['routes'].items():
+        print(f"{key[:46]:<46} {r['count']:>7} {r['errors_5xx']:>5} {r['client_4xx']:>5} "
+              f"{r['p50_ms']:>8.1f}ms{r['p90_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms{r['max_ms']:>7.1f}ms")
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} req/s), p50 {report['p50_ms']}ms, p99 {report['p99_ms']}ms, "
+          f"schedule lag p99 {report['schedule_lag_p99_ms']}ms")
+
+
+# --- Main -----------------------------------------------------------------------
+
+def _start_gunicorn(workdir, port):
+    env = dict(os.environ, RATELIMIT_ENABLED='0', SLOW_QUERY_MS=os.environ.get('SLOW_QUERY_MS', '-1'))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(HERE, 'gunicorn.conf.py'),
+         '--pythonpath', HERE, '--bind', f'127.0.0.1:{port}'],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    target = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            urllib.request.urlopen(target + '/robots.txt', timeout=1).read()
+            return proc, target
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('gunicorn did not start within 60s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay nginx access logs and report per-route latency')
+    parser.add_argument('logs', nargs='+', help='Access log files (combined format, .gz supported)')
+    parser.add_argument('--db', default='requests.db', help='Database to replay against (copied first)')
+    parser.add_argument('--target', help='Send HTTP to this running server instead of the WSGI test client')
+    parser.add_argument('--start-gunicorn', action='store_true', help='Start gunicorn (gunicorn.conf.py) on a copy of --db')
+    parser.add_argument('--port', type=int, default=5055, help='Port for --start-gunicorn (default: 5055)')
+    parser.add_argument('--workers', type=int, default=4, help='Replay processes (default: 4)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Speed-up factor; 0 = as fast as possible')
+    parser.add_argument('--limit', type=int, help='Replay only the first N requests')
+    parser.add_argument('--include-static', action='store_true', help='Also replay /static/ requests')
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    entries, skipped = parse_logs(args.logs, args.include_static, args.limit)
+    if not entries:
+        print("✗ No replayable requests found")
+        return 1
+    first = entries[0][0]
+    span = entries[-1][0] - first
+    print(f"Loaded {len(entries)} requests spanning {span:.0f}s ({skipped} lines skipped)")
+    if args.speed:
+        print(f"Replaying at {args.speed}x: ~{span / args.speed:.0f}s")
+
+    workdir = tempfile.mkdtemp(prefix='romhacks-replay-')
+    gunicorn = None
+    try:
+        if args.target:
+            mode, mode_arg = 'http', args.target
+        else:
+            if not os.path.exists(args.db):
+                print(f"✗ Database not found: {args.db}")
+                return 1
+            db_copy = os.path.join(workdir, 'requests.db')
+            shutil.copy(args.db, db_copy)
+            import database
+            analytics = database.get_analytics_db_path(args.db)
+            if os.path.exists(analytics):
+                database.backup_sqlite(analytics, database.get_analytics_db_path(db_copy))
+            if args.start_gunicorn:
+                gunicorn, target = _start_gunicorn(workdir, args.port)
+                mode, mode_arg = 'http', target
+            else:
+                mode, mode_arg = 'wsgi', db_copy
+        print(f"Mode: {mode} ({mode_arg}), {args.workers} worker processes")
+
+        relative = [(ts - first, method, path, addr, agent) for ts, method, path, addr, agent in entries]
+        shards = [relative[i::args.workers] for i in range(args.workers)]
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        # Give spawned workers time to import the app before the clock starts
+        start_at = time.time() + 5.0
+        processes = [
+            ctx.Process(target=_worker, args=(shard, start_at, args.speed, mode, mode_arg, workdir, results))
+            for shard in shards if shard
+        ]
+        for p in processes:
+            p.start()
+        samples = []
+        for _ in processes:
+            samples.extend(results.get())
+        for p in processes:
+            p.join()
+        elapsed = max(0.001, time.time() - start_at)
+    finally:
+        if gunicorn is not None:
+            gunicorn.send_signal(signal.SIGTERM)
+            gunicorn.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,460 @@
+"""
+Per-request timing, SQL instrumentation and Prometheus-style metrics.
+
+Every request records its wall time, time spent rendering templates and
+the number and total duration of SQL statements run through
+database.get_db_connection() (connections use TimedConnection below).
+Admins get the breakdown as a Server-Timing header, visible in the
+browser devtools network panel.
+
+Per-route latency histograms are kept in memory and periodically written
+to one JSON file per worker in METRICS_DIR; /admin/metrics merges every
+file so the numbers cover all gunicorn workers, not just the one that
+served the scrape.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+import sqlite3
+
+import slow_query_log
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+# How often a worker with new data writes its histograms to disk
+FLUSH_INTERVAL = 5.0
+
+_current = contextvars.ContextVar('request_stats', default=None)
+# Active capture_requests() blocks; while any is open, statements are recorded
+_captures = []
+
+
+class RequestStats:
+    """Timing counters for the request being served on this thread."""
+
+    __slots__ = ('start', 'route', 'sql_count', 'sql_time', 'template_time', 'connections',
+                 'rows', 'statements', '_template_starts')
+
+    def __init__(self, route=None):
+        self.start = time.perf_counter()
+        self.route = route
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.connections = 0
+        self.rows = 0
+        # [sql, rows fetched] per statement, only kept while a capture is active
+        self.statements = [] if _captures else None
+        self._template_starts = []
+
+
+def current_stats():
+    """Return the RequestStats of the active request, or None outside a request."""
+    return _current.get()
+
+
+def record_sql(sql, duration):
+    """Count a statement; returns its index in stats.statements when capturing."""
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_time += duration
+        if stats.statements is not None:
+            stats.statements.append([sql, 0])
+            return len(stats.statements) - 1
+    return None
+
+
+def record_sql_time(duration, rows=0, statement_index=None):
+    """Add fetch time and rows to the current statement without counting a new one."""
+    stats = _current.get()
+    if stats is not None:
+        stats.sql_time += duration
+        stats.rows += rows
+        if statement_index is not None and stats.statements is not None:
+            stats.statements[statement_index][1] += rows
+
+
+def record_connection():
+    stats = _current.get()
+    if stats is not None:
+        stats.connections += 1
+
+
+@contextlib.contextmanager
+def capture_requests():
+    """Collect (method, route, status, RequestStats) for every request finished in the block.
+
+    Used by verify_query_budgets.py; statements are only recorded while a
+    capture is open.
+    """
+    captured = []
+    _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        _captures.remove(captured)
+
+
+# --- SQLite instrumentation ---------------------------------------------------
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports statement count and time (execute + fetch).
+
+    Time spent fetching is added to the statement that produced the rows,
+    so a SELECT whose cost lands in fetchall() is still caught by the
+    slow-query log.
+    """
+
+    _statement = None
+    _statement_index = None
+
+    def _track(self, sql, parameters, duration):
+        self._statement_index = record_sql(sql, duration)
+        self._statement = (sql, parameters)
+        self._elapsed = duration
+        self._slow_logged = False
+        self._check_slow()
+
+    def _track_fetch(self, duration, rows):
+        record_sql_time(duration, rows, self._statement_index)
+        if self._statement is not None:
+            self._elapsed += duration
+            self._check_slow()
+
+    def _check_slow(self):
+        if not self._slow_logged and slow_query_log.is_slow(self._elapsed):
+            self._slow_logged = True
+            stats = _current.get()
+            sql, parameters = self._statement
+            slow_query_log.check(self.connection, sql, parameters, self._elapsed,
+                                 stats.route if stats is not None else None)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._track(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record_sql(sql_script, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._track_fetch(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._track_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._track_fetch(time.perf_counter() - start, len(rows))
+        return rows
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are timed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        record_connection()
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# --- Per-route histograms -------------------------------------------------------
+
+_lock = threading.Lock()
+_routes = {}
+_dirty = False
+_flusher_pid = None
+
+
+def _empty_route():
+    return {
+        'buckets': [0] * len(LATENCY_BUCKETS),
+        'count': 0,
+        'sum': 0.0,
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'template_time': 0.0,
+        'status': {},
+    }
+
+
+def observe(route, method, status, stats, duration):
+    """Record one finished request in this worker's histograms."""
+    global _dirty
+    key = f"{method} {route}"
+    _ensure_flusher()
+    with _lock:
+        _dirty = True
+        entry = _routes.get(key)
+        if entry is None:
+            entry = _routes[key] = _empty_route()
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                entry['buckets'][i] += 1
+        entry['count'] += 1
+        entry['sum'] += duration
+        entry['sql_count'] += stats.sql_count
+        entry['sql_time'] += stats.sql_time
+        entry['template_time'] += stats.template_time
+        status_key = str(status)
+        entry['status'][status_key] = entry['status'].get(status_key, 0) + 1
+
+
+def _worker_file(pid=None):
+    return os.path.join(METRICS_DIR, f"worker-{pid or os.getpid()}.json")
+
+
+def flush():
+    """Write this worker's histograms to its file in METRICS_DIR."""
+    global _dirty
+    with _lock:
+        payload = json.dumps(_routes)
+        _dirty = False
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _worker_file()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
+
+def flush_pending():
+    """Flush if anything was observed since the last flush (e.g. on worker exit)."""
+    if _dirty:
+        flush()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush_pending()
+
+
+def _ensure_flusher():
+    """Start the background flush thread once per process (again after fork)."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='request-metrics-flush', daemon=True).start()
+
+
+def reset_after_fork():
+    """Start a forked worker with empty histograms (the master's belong to no one)."""
+    global _dirty
+    with _lock:
+        _routes.clear()
+        _dirty = False
+
+
+def clear_worker_files():
+    """Remove worker files left by a previous run (call once, before workers start)."""
+    if not os.path.isdir(METRICS_DIR):
+        return
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith('worker-'):
+            try:
+                os.remove(os.path.join(METRICS_DIR, name))
+            except OSError:
+                pass
+
+
+def _merge_into(merged, routes):
+    for key, entry in routes.items():
+        total = merged.get(key)
+        if total is None:
+            total = merged[key] = _empty_route()
+        for i, value in enumerate(entry['buckets']):
+            total['buckets'][i] += value
+        for field in ('count', 'sum', 'sql_count', 'sql_time', 'template_time'):
+            total[field] += entry[field]
+        for status, count in entry['status'].items():
+            total['status'][status] = total['status'].get(status, 0) + count
+    return merged
+
+
+def _read_routes(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def retire_worker(pid):
+    """Fold an exited worker's file into worker-retired.json (gunicorn child_exit, master only).
+
+    Keeps its counts in the totals without leaving one file per recycled worker.
+    """
+    path = _worker_file(pid)
+    if not os.path.exists(path):
+        return
+    retired_path = _worker_file('retired')
+    merged = _merge_into(_read_routes(retired_path), _read_routes(path))
+    try:
+        tmp_path = f"{retired_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(merged, f)
+        os.replace(tmp_path, retired_path)
+        os.remove(path)
+    except OSError as e:
+        print(f"Error retiring metrics for worker {pid}: {e}")
+
+
+def merged_routes():
+    """Sum the histograms of every worker (including exited ones, so counters never go backwards)."""
+    if _routes:
+        flush()
+    merged = {}
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        if not (name.startswith('worker-') and name.endswith('.json')):
+            continue
+        _merge_into(merged, _read_routes(os.path.join(METRICS_DIR, name)))
+    return merged
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(routes=None):
+    """Render merged histograms in the Prometheus text exposition format."""
+    routes = merged_routes() if routes is None else routes
+    lines = [
+        '# HELP romhacks_request_duration_seconds Request wall time by route.',
+        '# TYPE romhacks_request_duration_seconds histogram',
+    ]
+    ordered = sorted(routes.items())
+    for key, entry in ordered:
+        method, route = key.split(' ', 1)
+        labels = f'method="{method}",route="{_label(route)}"'
+        for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+            lines.append(f'romhacks_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'romhacks_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+        lines.append(f'romhacks_request_duration_seconds_sum{{{labels}}} {entry["sum"]:.6f}')
+        lines.append(f'romhacks_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+
+    lines += [
+        '# HELP romhacks_requests_total Finished requests by route and status.',
+        '# TYPE romhacks_requests_total counter',
+    ]
+    for key, entry in ordered:
+        method, route = key.split(' ', 1)
+        for status, count in sorted(entry['status'].items()):
+            lines.append(f'romhacks_requests_total{{method="{method}",route="{_label(route)}",'
+                         f'status="{status}"}} {count}')
+
+    counters = (
+        ('romhacks_sql_queries_total', 'SQL statements executed by route.', 'sql_count', '{}'),
+        ('romhacks_sql_duration_seconds_total', 'Time spent in SQL by route.', 'sql_time', '{:.6f}'),
+        ('romhacks_template_render_seconds_total', 'Time spent rendering templates by route.',
+         'template_time', '{:.6f}'),
+    )
+    for name, help_text, field, fmt in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for key, entry in ordered:
+            method, route = key.split(' ', 1)
+            lines.append(f'{name}{{method="{method}",route="{_label(route)}"}} {fmt.format(entry[field])}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# --- Flask integration ----------------------------------------------------------
+
+def init_app(app, show_timing=None):
+    """Install the timing hooks on a Flask app.
+
+    show_timing is a callable deciding whether the current request gets a
+    Server-Timing header (admins only in app.py).
+    """
+    from flask import before_render_template, template_rendered, request
+
+    def _before_render(sender, template, context, **extra):
+        stats = _current.get()
+        if stats is not None:
+            stats._template_starts.append(time.perf_counter())
+
+    def _after_render(sender, template, context, **extra):
+        stats = _current.get()
+        if stats is not None and stats._template_starts:
+            stats.template_time += time.perf_counter() - stats._template_starts.pop()
+
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_after_render, app, weak=False)
+
+    @app.before_request
+    def _start_request_timer():
+        _current.set(RequestStats(request.url_rule.rule if request.url_rule is not None else None))
+
+    @app.after_request
+    def _finish_request_timer(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.start
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        observe(route, request.method, response.status_code, stats, duration)
+        for captured in _captures:
+            captured.append((request.method, route, response.status_code, stats))
+
+        if show_timing is not None and show_timing():
+            response.headers['Server-Timing'] = ', '.join([
+                f'app;dur={duration * 1000:.1f}',
+                f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"',
+                f'tpl;dur={stats.template_time * 1000:.1f}',
+            ])
+
+        return response
+
+    @app.teardown_request
+    def _clear_request_timer(exc):
+        _current.set(None)
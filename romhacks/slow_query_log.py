@@ -0,0 +1,235 @@
+"""
+Slow-query log with automatic EXPLAIN QUERY PLAN capture.
+
+TimedCursor (request_metrics.py) hands every finished statement to
+check(). Statements slower than SLOW_QUERY_MS are printed with their
+parameters redacted, the calling route and database function, and the
+query plan. Plans that SCAN a table with at least SLOW_QUERY_LARGE_TABLE
+rows (estimated from ANALYZE statistics or MAX(rowid), never counted)
+are flagged.
+
+Occurrences are aggregated per normalized statement in a separate
+slow_queries.db (so logging never waits on a write lock held on
+requests.db) and listed by total time on /admin/slow-queries.
+
+Configuration (environment):
+    SLOW_QUERY_MS            threshold in milliseconds (default 100, negative disables)
+    SLOW_QUERY_LARGE_TABLE   row count from which a SCAN is flagged (default 10000)
+    SLOW_QUERY_DB            path of the aggregate database (default slow_queries.db)
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import time
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+LARGE_TABLE_ROWS = int(os.environ.get('SLOW_QUERY_LARGE_TABLE', '10000'))
+SLOW_QUERY_DB = os.environ.get('SLOW_QUERY_DB', 'slow_queries.db')
+
+# Table sizes are cached per process for this many seconds
+TABLE_SIZE_TTL = 600
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+_plans = {}
+_table_sizes = {}
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'IN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_SCAN = re.compile(r'^SCAN (\w+)')
+_NOT_ALIASES = {
+    'where', 'join', 'left', 'inner', 'cross', 'outer', 'on', 'group', 'order', 'limit',
+    'using', 'set', 'values', 'select', 'union', 'having', 'natural', 'default',
+}
+
+
+def is_slow(duration):
+    return SLOW_QUERY_MS >= 0 and duration * 1000 >= SLOW_QUERY_MS
+
+
+def normalize(sql):
+    """Collapse whitespace and IN (?, ?, ...) lists so variants aggregate together."""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def redact(parameters):
+    """Describe parameters by type and size only, never by value."""
+    if isinstance(parameters, dict):
+        return {key: redact([value])[0] for key, value in parameters.items()}
+    described = []
+    for value in parameters or ():
+        if value is None:
+            described.append('NULL')
+        elif isinstance(value, (str, bytes)):
+            described.append(f'<{type(value).__name__}:{len(value)}>')
+        else:
+            described.append(f'<{type(value).__name__}>')
+    return described
+
+
+def _caller():
+    """Name of the database.py function that issued the statement."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_filename.endswith('database.py'):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return None
+
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def _table_size(conn, table):
+    """Estimated row count that never scans the table (this runs inside a slow request).
+
+    sqlite_stat1 (written by ANALYZE) in any attached database, else
+    MAX(rowid); 0 for WITHOUT ROWID tables that were never analyzed.
+    """
+    cached = _table_sizes.get(table)
+    now = time.monotonic()
+    if cached and now - cached[1] < TABLE_SIZE_TTL:
+        return cached[0]
+    cursor = conn.cursor(sqlite3.Cursor)
+    rows = 0
+    try:
+        for schema in [row[1] for row in cursor.execute('PRAGMA database_list')]:
+            try:
+                stat = cursor.execute(f'SELECT stat FROM "{schema}".sqlite_stat1 WHERE tbl = ? LIMIT 1',
+                                      (table,)).fetchone()
+            except sqlite3.Error:
+                # Never analyzed: no sqlite_stat1 in this database
+                continue
+            if stat:
+                rows = int(stat[0].split()[0])
+                break
+        else:
+            rows = cursor.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    except (sqlite3.Error, ValueError):
+        rows = 0
+    _table_sizes[table] = (rows, now)
+    return rows
+
+
+def explain(conn, sql, parameters):
+    """Return (plan lines, [large tables scanned]) for a statement, cached per process."""
+    fingerprint = normalize(sql)
+    cached = _plans.get(fingerprint)
+    if cached is not None:
+        return cached
+    try:
+        rows = conn.cursor(sqlite3.Cursor).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f'(EXPLAIN failed: {e})'], []
+    plan = [row[3] for row in rows]
+    aliases = _table_aliases(sql)
+    large = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table not in large and _table_size(conn, table) >= LARGE_TABLE_ROWS:
+            large.append(table)
+    _plans[fingerprint] = (plan, large)
+    return plan, large
+
+
+def check(conn, sql, parameters, duration, route=None):
+    """Log the statement if it exceeded the threshold."""
+    if not is_slow(duration):
+        return
+    if not sql.lstrip()[:7].upper().startswith(EXPLAINABLE):
+        return
+    try:
+        plan, large = explain(conn, sql, parameters)
+        caller = _caller()
+        params = redact(parameters)
+        flag = f" SCAN on large table(s): {', '.join(large)}" if large else ''
+        print(f"Slow query {duration * 1000:.1f}ms [{route or '-'}] {caller or '-'}: "
+              f"{normalize(sql)} params={params}{flag}")
+        for line in plan:
+            print(f"    plan: {line}")
+        _store(normalize(sql), duration, route, caller, params, plan, large)
+    except Exception as e:
+        # The slow-query log must never break the query that triggered it
+        print(f"Error logging slow query: {e}")
+
+
+# --- Aggregate store ------------------------------------------------------------
+
+def _connect():
+    conn = sqlite3.connect(SLOW_QUERY_DB, timeout=1)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS slow_queries (
+            fingerprint TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0,
+            max_ms REAL NOT NULL DEFAULT 0,
+            last_seen TIMESTAMP,
+            last_route TEXT,
+            last_caller TEXT,
+            last_params TEXT,
+            plan TEXT,
+            large_scans TEXT
+        )
+    ''')
+    return conn
+
+
+def _store(fingerprint, duration, route, caller, params, plan, large):
+    ms = duration * 1000
+    conn = _connect()
+    try:
+        conn.execute('''
+            INSERT INTO slow_queries
+                (fingerprint, count, total_ms, max_ms, last_seen, last_route, last_caller,
+                 last_params, plan, large_scans)
+            VALUES (?, 1, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
+            ON CONFLICT(fingerprint) DO UPDATE SET
+                count = count + 1,
+                total_ms = total_ms + excluded.total_ms,
+                max_ms = MAX(max_ms, excluded.max_ms),
+                last_seen = excluded.last_seen,
+                last_route = excluded.last_route,
+                last_caller = excluded.last_caller,
+                last_params = excluded.last_params,
+                plan = excluded.plan,
+                large_scans = excluded.large_scans
+        ''', (fingerprint, ms, ms, route, caller, repr(params), '\n'.join(plan), ', '.join(large)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_top_queries(limit=50):
+    """Slow statements ordered by total time spent in them."""
+    conn = _connect()
+    try:
+        rows = conn.execute('''
+            SELECT *, total_ms / count AS avg_ms FROM slow_queries
+            ORDER BY total_ms DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def clear():
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM slow_queries')
+        conn.commit()
+    finally:
+        conn.close()
@@ -35,6 +35,17 @@ let modsFilter = false;
 let currentPage = 1;
 const gamesPerPage = 12;
 let allCards = [];
+const consolesByCard = new WeakMap();
+
+// data-console holds the card's console tokens; split once per card, not per filter pass
+function cardConsoles(card) {
+    let consoles = consolesByCard.get(card);
+    if (!consoles) {
+        consoles = (card.dataset.console || '').toLowerCase().split(/\s+/).filter(Boolean);
+        consolesByCard.set(card, consoles);
+    }
+    return consoles;
+}
 
 function updatePagination() {
     const searchInput = document.getElementById('search-input');
@@ -42,7 +53,6 @@ function updatePagination() {
     
     // First, get all cards that match the current filters
     const filteredCards = allCards.filter(card => {
-        const cardConsole = (card.dataset.console || '').toLowerCase();
         const cardOriginalPlatform = (card.dataset.originalPlatform || '').toLowerCase();
         const cardBaseGame = (card.dataset.baseGame || '').toLowerCase();
         const cardGameSeries = (card.dataset.gameSeries || '').toLowerCase();
@@ -54,7 +64,7 @@ function updatePagination() {
         // Check if card has any element containing "Mods" text
         const hasMods = Array.from(card.querySelectorAll('*')).some(el => el.textContent.includes('Mods'));
 
-        const consoles = cardConsole.split(/\s+/).filter(Boolean);
+        const consoles = cardConsoles(card);
         
         // Check console filter
         let matchConsole = (activeConsole === 'all' || consoles.includes(activeConsole));
@@ -97,6 +107,17 @@ function updatePagination() {
 }
 
 function filterHacks(selectedConsole) {
+    // Listings pick their console server-side (?console=, from the item_consoles index),
+    // so the grid holds that console's top items rather than a filtered top 12
+    const grid = document.getElementById('hacks-grid');
+    if (selectedConsole && grid && selectedConsole !== (grid.dataset.console || 'all')) {
+        const params = new URLSearchParams(window.location.search);
+        if (selectedConsole === 'all') params.delete('console');
+        else params.set('console', selectedConsole);
+        window.location.search = params.toString();
+        return;
+    }
+
     // 1. If a button was clicked, update the active console
     if (selectedConsole) {
         activeConsole = selectedConsole;
@@ -191,7 +212,7 @@ function updateGameDropdown() {
         const cardConsole = (card.dataset.console || '').toLowerCase();
         const cardBaseGame = (card.dataset.baseGame || '').trim();
         
-        const consoles = cardConsole.split(/\s+/).filter(Boolean);
+        const consoles = cardConsoles(card);
         const normalizedConsole = normalizeConsoleForComparison(cardConsole);
         
         if ((activeConsole === 'all' || consoles.includes(activeConsole)) && cardBaseGame) {
@@ -232,6 +253,10 @@ function normalizeConsoleForComparison(console) {
 }
 
 function filterByGame(baseGame) {
+    if (facetGrid()) {
+        filterByFacet('base_game', baseGame);
+        return;
+    }
     activeGameFilter = baseGame.toLowerCase();
     currentPage = 1;
     updateGameDropdown();
@@ -245,11 +270,10 @@ function updateSeriesDropdown() {
     // Get unique game series for the current filter state
     const gameSeries = new Set();
     allCards.forEach(card => {
-        const cardConsole = (card.dataset.console || '').toLowerCase();
         const cardOriginalPlatform = (card.dataset.originalPlatform || '').toLowerCase();
         const cardGameSeries = (card.dataset.gameSeries || '').trim();
         
-        const consoles = cardConsole.split(/\s+/).filter(Boolean);
+        const consoles = cardConsoles(card);
         
         // Check if card matches current console and original platform filters
         let matchConsole = (activeConsole === 'all' || consoles.includes(activeConsole));
@@ -280,6 +304,10 @@ function updateSeriesDropdown() {
 }
 
 function filterBySeries(series) {
+    if (facetGrid()) {
+        filterByFacet('game_series', series);
+        return;
+    }
     activeSeriesFilter = series.toLowerCase();
     currentPage = 1;
     updateSeriesDropdown();
@@ -312,7 +340,6 @@ function nextPage() {
     const query = searchInput ? searchInput.value.toLowerCase() : '';
     
     const filteredCards = allCards.filter(card => {
-        const cardConsole = (card.dataset.console || '').toLowerCase();
         const cardOriginalPlatform = (card.dataset.originalPlatform || '').toLowerCase();
         const cardBaseGame = (card.dataset.baseGame || '').toLowerCase();
         const cardGameSeries = (card.dataset.gameSeries || '').toLowerCase();
@@ -321,7 +348,7 @@ function nextPage() {
         // Check if card has any element containing "Online" text
         const hasOnlinePlay = Array.from(card.querySelectorAll('*')).some(el => el.textContent.includes('Online'));
 
-        const consoles = cardConsole.split(/\s+/).filter(Boolean);
+        const consoles = cardConsoles(card);
         
         const matchConsole = (activeConsole === 'all' || consoles.includes(activeConsole));
         const matchNetplay = !netplayFilter || hasOnlinePlay;
@@ -344,6 +371,14 @@ function sortHacks(criteria) {
     const grid = document.getElementById('hacks-grid');
     if(!grid) return;
     
+    // The trending selection is chosen server-side; the cards on other pages are this month's most popular
+    if(criteria === 'trending' && grid.dataset.sort && grid.dataset.sort !== 'trending') {
+        const params = new URLSearchParams(window.location.search);
+        params.set('sort', 'trending');
+        window.location.search = params.toString();
+        return;
+    }
+    
     const cards = Array.from(grid.children);
     
     cards.sort((a, b) => {
@@ -375,6 +410,8 @@ function sortHacks(criteria) {
             const monthlyA = parseInt(a.dataset.monthlyDownloads || '0');
             const monthlyB = parseInt(b.dataset.monthlyDownloads || '0');
             return monthlyB - monthlyA;
+        } else if(criteria === 'trending') {
+            return parseFloat(b.dataset.trending || '0') - parseFloat(a.dataset.trending || '0');
         }
         return 0;
     });
@@ -384,6 +421,132 @@ function sortHacks(criteria) {
     updatePagination();
 }
 
+// Frozen pages (freeze.py) carry the counts from when they were rendered; refresh
+// every [data-download-count="<id>"] from one cacheable request per 100 ids.
+async function hydrateDownloadCounts() {
+    const els = Array.from(document.querySelectorAll('[data-download-count]'));
+    const ids = [...new Set(els.map(el => el.dataset.downloadCount))];
+    for (let i = 0; i < ids.length; i += 100) {
+        try {
+            const res = await fetch(`/api/download-counts?ids=${encodeURIComponent(ids.slice(i, i + 100).join(','))}`);
+            if (!res.ok) return;
+            const { counts } = await res.json();
+            els.forEach(el => {
+                if (counts[el.dataset.downloadCount] !== undefined) el.textContent = counts[el.dataset.downloadCount];
+            });
+        } catch (e) {
+            return; // Keep the rendered counts
+        }
+    }
+}
+
+// Console filter options: label each with its item count (data-console-counts, from
+// console_counts), add consoles the static list lacks, and select the active one.
+function initConsoleSelect() {
+    const select = document.querySelector('select[data-console-counts]');
+    if (!select) return;
+    labelConsoleOptions(select, JSON.parse(select.dataset.consoleCounts || '{}'));
+    const grid = document.getElementById('hacks-grid');
+    select.value = (grid && grid.dataset.console) || 'all';
+}
+
+function labelConsoleOptions(select, counts) {
+    const options = new Map(Array.from(select.options).map(option => [option.value, option]));
+    Object.keys(counts).forEach(token => {
+        if (options.has(token)) return;
+        const option = document.createElement('option');
+        option.value = token;
+        option.textContent = token.toUpperCase();
+        select.appendChild(option);
+        options.set(token, option);
+    });
+    options.forEach((option, value) => {
+        if (value === 'all') return;
+        if (option.dataset.label === undefined) option.dataset.label = option.textContent;
+        option.textContent = `${option.dataset.label} (${(counts[value] || 0).toLocaleString()})`;
+        option.disabled = !counts[value] && value !== select.value;
+    });
+}
+
+// Listing filters (/romhacks, /ports, grid[data-facets]): the series and game dropdowns
+// and the console counts cover the whole catalog. /api/facets counts each facet under
+// the other active filters (cached server-side per catalog generation), and picking a
+// value reloads the listing with it as a query parameter, like ?console=.
+function facetGrid() {
+    const grid = document.getElementById('hacks-grid');
+    return grid && grid.dataset.facets ? grid : null;
+}
+
+function filterByFacet(facet, value) {
+    const params = new URLSearchParams(window.location.search);
+    if (value) params.set(facet, value);
+    else params.delete(facet);
+    window.location.search = params.toString();
+}
+
+async function loadFacets() {
+    const grid = facetGrid();
+    if (!grid) return;
+    const params = new URLSearchParams(window.location.search);
+    const selects = Array.from(document.querySelectorAll('select[data-facet]'));
+    const query = new URLSearchParams({ type: grid.dataset.facets });
+    selects.forEach(select => {
+        if (params.get(select.dataset.facet)) query.set(select.dataset.facet, params.get(select.dataset.facet));
+    });
+    if (grid.dataset.console && grid.dataset.console !== 'all') query.set('console', grid.dataset.console);
+    let data;
+    try {
+        const res = await fetch(`/api/facets?${query}`);
+        if (!res.ok) return;
+        data = await res.json();
+    } catch (e) {
+        return; // Keep the options taken from the cards
+    }
+    selects.forEach(select => {
+        const values = data.facets[select.dataset.facet];
+        if (!values) return;
+        const active = params.get(select.dataset.facet) || '';
+        select.replaceChildren(select.options[0]); // "All ..."
+        if (active && !values.some(([value]) => value.toLowerCase() === active.toLowerCase())) {
+            values.unshift([active, 0]);
+        }
+        values.forEach(([value, count]) => {
+            const option = document.createElement('option');
+            option.value = value;
+            option.textContent = `${value} (${count.toLocaleString()})`;
+            option.selected = value.toLowerCase() === active.toLowerCase();
+            select.appendChild(option);
+        });
+    });
+    const consoleSelect = document.querySelector('select[data-console-counts]');
+    if (consoleSelect && data.facets.console) labelConsoleOptions(consoleSelect, Object.fromEntries(data.facets.console));
+}
+
+// Download sparklines: [data-sparkline] holds the /api/stats URL and an <svg> to draw into.
+// The API response is public and cacheable, so page views add no aggregation.
+function renderSparklines() {
+    document.querySelectorAll('[data-sparkline]').forEach(async el => {
+        try {
+            const res = await fetch(el.dataset.sparkline);
+            if (!res.ok) return;
+            const data = await res.json();
+            if (!data.total) return; // Nothing to draw yet
+            const max = Math.max(...data.counts);
+            const step = 100 / Math.max(data.counts.length - 1, 1);
+            const points = data.counts
+                .map((count, i) => `${(i * step).toFixed(2)},${(23 - (count / max) * 22).toFixed(2)}`)
+                .join(' ');
+            el.querySelector('svg').innerHTML =
+                `<polyline points="${points}" fill="none" stroke="currentColor" stroke-width="1.5" vector-effect="non-scaling-stroke"/>`;
+            const total = el.querySelector('[data-sparkline-total]');
+            if (total) total.textContent = `${data.total.toLocaleString()} downloads`;
+            el.classList.remove('hidden');
+        } catch (e) {
+            // The sparkline is decorative; leave it hidden
+        }
+    });
+}
+
 
 /* =========================================
    3. INIT & PATCHER UI LOGIC
@@ -391,11 +554,15 @@ function sortHacks(criteria) {
 document.addEventListener('DOMContentLoaded', () => {
     // Initialize pagination on page load
     allCards = Array.from(document.querySelectorAll('.hack-card'));
+    initConsoleSelect();
     if (allCards.length > 0) {
         updateGameDropdown(); // Initialize game dropdown with all games
         updateSeriesDropdown(); // Initialize series dropdown with all series
         updatePagination();
     }
+    loadFacets(); // Catalog-wide options and counts replace the card-derived ones
+    renderSparklines();
+    if (document.body.dataset.frozen !== undefined) hydrateDownloadCounts();
     
     // Setup search input to reset pagination
     const searchInput = document.getElementById('search-input');
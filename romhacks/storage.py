@@ -0,0 +1,32 @@
+"""Cloudflare R2 (S3-compatible) storage helpers shared by uploads and image processing."""
+import os
+
+import boto3
+from botocore.config import Config
+
+
+def get_r2_client():
+    account_id = os.environ.get('R2_ACCOUNT_ID')
+    access_key = os.environ.get('R2_ACCESS_KEY_ID')
+    secret_key = os.environ.get('R2_SECRET_ACCESS_KEY')
+
+    if not all([account_id, access_key, secret_key]):
+        return None
+
+    return boto3.client(
+        's3',
+        endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        config=Config(signature_version='s3v4'),
+        region_name='auto'
+    )
+
+
+def get_public_url(object_key):
+    """Build the public URL for an object stored in the R2 bucket."""
+    bucket = os.environ.get('R2_BUCKET')
+    public_base = os.environ.get('R2_PUBLIC_BASE', 'https://assets.magiskmg.com')
+    if public_base:
+        return f"{public_base.rstrip('/')}/{object_key}"
+    return f"https://{bucket}.r2.cloudflarestorage.com/{object_key}"
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Write-contention stress test for the SQLite database.
+
+Runs N processes that each issue a weighted mix of the write paths
+(track_download, submit_review, vote_helpful, submit_feedback, admin
+edits) alongside catalog reads, calling database.py directly so the
+numbers reflect SQLite locking rather than Flask. Reports throughput,
+tail latency, busy errors ("database is locked") and estimated lock-wait
+time per operation, so journal modes, busy timeouts and write-batching
+changes can be compared run against run.
+
+    python stress_writes.py                                   # Small synthetic catalog, defaults
+    python stress_writes.py --processes 8 --journal-mode wal --busy-timeout 2
+    python stress_writes.py --db bench.db --mix track=60,detail=30,listing=10 --output wal.json
+
+Always works on a temporary copy of --db (or a generated catalog), never
+on the original.
+
+Lock wait is estimated: each operation is first timed on its own with no
+other processes running, and under load anything above that uncontended
+median is counted as waiting. Python's sqlite3 module does not expose the
+busy handler, so the time spent inside it cannot be measured directly.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = 'track=40,review=4,vote=8,feedback=3,edit=2,detail=33,listing=10'
+WRITE_OPS = ('track', 'review', 'vote', 'feedback', 'edit')
+READ_OPS = ('detail', 'listing')
+
+# Catalog generated when --db is not given
+DATASET = dict(games=500, ports=100, downloads=50000, monthly_downloads=25000,
+               reviews=2000, votes=5000, seed=42)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in WRITE_OPS + READ_OPS:
+            raise ValueError(f"unknown operation '{name}' (choose from {', '.join(WRITE_OPS + READ_OPS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError('mix has no weight')
+    return mix
+
+
+# --- Operations -----------------------------------------------------------------
+
+def _make_ops(database, ids, worker):
+    """Return {name: fn(rng, n)}; each fn returns None on success or an error string."""
+    games, ports, reviews = ids['games'], ids['ports'], ids['reviews']
+
+    def _result_error(result):
+        if isinstance(result, dict) and not result.get('success'):
+            return result.get('error') or 'failed'
+        return None
+
+    def track(rng, n):
+        catalog = games if rng.random() < 0.8 or not ports else ports
+        database.track_download(rng.choice(catalog), f"10.{worker & 255}.{n >> 8 & 255}.{n & 255}")
+
+    def review(rng, n):
+        return _result_error(database.submit_review(
+            rng.choice(games), 'romhack', f"stress{worker}_{rng.randint(0, 200)}", n, None,
+            rng.randint(0, 50000), rng.random() < 0.8, 'Stress test review text. ' * rng.randint(1, 20)
+        ))
+
+    def vote(rng, n):
+        if not reviews:
+            return None
+        return _result_error(database.vote_helpful(
+            rng.choice(reviews), f"stressvoter{worker}_{rng.randint(0, 500)}", rng.choice(('yes', 'no'))
+        ))
+
+    def feedback(rng, n):
+        database.submit_feedback('broken_link', 'Stress test report', f"/game/{rng.choice(games)}",
+                                 'Download link returns 404.', None, f"10.{worker & 255}.0.{n & 255}")
+
+    def edit(rng, n):
+        database.update_game(rng.choice(games), {'version': f"{rng.randint(0, 9)}.{n % 100}"})
+
+    def detail(rng, n):
+        game_id = rng.choice(games)
+        database.get_game_by_id(game_id)
+        database.get_download_count(game_id)
+        database.get_review_stats(game_id)
+
+    def listing(rng, n):
+        database.get_catalog_page('game', sort='downloads', order='desc', offset=rng.choice((0, 0, 0, 50, 100)))
+
+    return {'track': track, 'review': review, 'vote': vote, 'feedback': feedback,
+            'edit': edit, 'detail': detail, 'listing': listing}
+
+
+def _is_busy(message):
+    message = message.lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _run_op(fn, rng, n):
+    """Run one operation: (latency_ms, outcome) where outcome is 'ok', 'busy' or 'error'."""
+    start = time.perf_counter()
+    try:
+        error = fn(rng, n)
+    except sqlite3.OperationalError as e:
+        error = str(e)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    latency = (time.perf_counter() - start) * 1000
+    if error is None:
+        return latency, 'ok', None
+    return latency, 'busy' if _is_busy(error) else 'error', error
+
+
+def _load_database(db_path, busy_timeout, workdir):
+    os.chdir(workdir)
+    os.environ['DB_BUSY_TIMEOUT'] = str(busy_timeout)
+    os.environ.setdefault('SLOW_QUERY_MS', '-1')
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    import database
+    database.DB_PATH = db_path
+    database.DB_BUSY_TIMEOUT = busy_timeout
+    return database
+
+
+def _worker(worker, db_path, busy_timeout, workdir, ids, mix, start_at, duration, seed, results):
+    database = _load_database(db_path, busy_timeout, workdir)
+    ops = _make_ops(database, ids, worker)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(seed * 1000 + worker)
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    deadline = start_at + duration
+    samples = []
+    errors = {}
+    n = 0
+    while time.time() < deadline:
+        name = rng.choices(names, weights=weights)[0]
+        latency, outcome, error = _run_op(ops[name], rng, n)
+        samples.append((name, latency, outcome))
+        if error and outcome == 'error':
+            errors.setdefault(f"{name}: {error}", 0)
+            errors[f"{name}: {error}"] += 1
+        n += 1
+    results.put((samples, errors))
+
+
+def calibrate(database, ids, mix, runs, seed):
+    """Median uncontended latency per operation (single process, nothing else running)."""
+    ops = _make_ops(database, ids, 255)
+    rng = random.Random(seed)
+    baseline = {}
+    for name in mix:
+        latencies = [_run_op(ops[name], rng, 60000 + i)[0] for i in range(runs)]
+        baseline[name] = statistics.median(latencies)
+    return baseline
+
+
+# --- Reporting ------------------------------------------------------------------
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, baseline, elapsed):
+    by_op = defaultdict(list)
+    for name, latency, outcome in samples:
+        by_op[name].append((latency, outcome))
+
+    ops = {}
+    total_wait = 0.0
+    for name in WRITE_OPS + READ_OPS:
+        items = by_op.get(name)
+        if not items:
+            continue
+        latencies = sorted(latency for latency, _ in items)
+        waits = sorted(max(0.0, latency - baseline.get(name, 0.0)) for latency, _ in items)
+        total_wait += sum(waits)
+        ops[name] = {
+            'count': len(items),
+            'ops_per_s': round(len(items) / elapsed, 1),
+            'busy_errors': sum(1 for _, outcome in items if outcome == 'busy'),
+            'other_errors': sum(1 for _, outcome in items if outcome == 'error'),
+            'baseline_ms': round(baseline.get(name, 0.0), 2),
+            'p50_ms': round(_percentile(latencies, 50), 2),
+            'p95_ms': round(_percentile(latencies, 95), 2),
+            'p99_ms': round(_percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'lock_wait_total_ms': round(sum(waits), 1),
+            'lock_wait_p99_ms': round(_percentile(waits, 99), 2),
+        }
+
+    writes = [s for s in samples if s[0] in WRITE_OPS]
+    all_latencies = sorted(s[1] for s in samples)
+    return {
+        'operations': len(samples),
+        'elapsed_s': round(elapsed, 2),
+        'throughput_ops': round(len(samples) / elapsed, 1),
+        'write_throughput_ops': round(sum(1 for s in writes if s[2] == 'ok') / elapsed, 1),
+        'busy_errors': sum(1 for s in samples if s[2] == 'busy'),
+        'other_errors': sum(1 for s in samples if s[2] == 'error'),
+        'p50_ms': round(_percentile(all_latencies, 50), 2),
+        'p99_ms': round(_percentile(all_latencies, 99), 2),
+        'lock_wait_total_s': round(total_wait / 1000, 2),
+        'ops': ops,
+    }
+
+
+def print_report(report):
+    print(f"\n{'Operation':<10} {'count':>7} {'ops/s':>8} {'busy':>6} {'err':>5} {'base':>8} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>9} {'wait p99':>9} {'wait total':>11}")
+    for name, r in report['ops'].items():
+        print(f"{name:<10} {r['count']:>7} {r['ops_per_s']:>8.1f} {r['busy_errors']:>6} {r['other_errors']:>5} "
+              f"{r['baseline_ms']:>6.1f}ms{r['p50_ms']:>6.1f}ms{r['p95_ms']:>6.1f}ms{r['p99_ms']:>6.1f}ms"
+              f"{r['max_ms']:>7.1f}ms{r['lock_wait_p99_ms']:>7.1f}ms{r['lock_wait_total_ms'] / 1000:>10.2f}s")
+    print(f"\n{report['operations']} operations in {report['elapsed_s']}s "
+          f"({report['throughput_ops']} ops/s, {report['write_throughput_ops']} successful writes/s), "
+          f"p50 {report['p50_ms']}ms, p99 {report['p99_ms']}ms")
+    print(f"Busy errors: {report['busy_errors']}, other errors: {report['other_errors']}, "
+          f"estimated lock wait: {report['lock_wait_total_s']}s")
+
+
+# --- Main -----------------------------------------------------------------------
+
+def _prepare_database(args, db_copy):
+    if args.db:
+        import database
+        shutil.copy(args.db, db_copy)
+        analytics = database.get_analytics_db_path(args.db)
+        if os.path.exists(analytics):
+            database.backup_sqlite(analytics, database.get_analytics_db_path(db_copy))
+    else:
+        import synthetic_data
+        synthetic_data.generate(db_copy, **DATASET)
+
+    conn = sqlite3.connect(db_copy)
+    try:
+        if args.journal_mode:
+            # Catalog database only (analytics.db is always WAL). WAL is persistent;
+            # DELETE switches a WAL copy back to a rollback journal
+            mode = conn.execute(f'PRAGMA journal_mode={args.journal_mode}').fetchone()[0]
+        else:
+            mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        ids = {
+            'games': [row[0] for row in conn.execute('SELECT id FROM games ORDER BY id LIMIT 5000')],
+            'ports': [row[0] for row in conn.execute('SELECT id FROM ports ORDER BY id LIMIT 1000')],
+            'reviews': [row[0] for row in conn.execute('SELECT id FROM reviews ORDER BY id DESC LIMIT 5000')],
+        }
+    finally:
+        conn.close()
+    return mode, ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress SQLite with concurrent writes and catalog reads')
+    parser.add_argument('--db', help='Database to copy (default: generate a small synthetic catalog)')
+    parser.add_argument('--processes', type=int, default=4, help='Concurrent processes (default: 4)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Weighted operations (default: {DEFAULT_MIX})')
+    parser.add_argument('--journal-mode', choices=('delete', 'truncate', 'wal'),
+                        help='Journal mode to set on the copy (default: keep the file\'s mode)')
+    parser.add_argument('--busy-timeout', type=float, default=5.0,
+                        help='Seconds to wait on a lock before "database is locked" (default: 5)')
+    parser.add_argument('--calibration-runs', type=int, default=30, help='Uncontended runs per operation (default: 30)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"✗ Invalid --mix: {e}")
+        return 1
+    if args.db and not os.path.exists(args.db):
+        print(f"✗ Database not found: {args.db}")
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix='romhacks-stress-')
+    try:
+        db_copy = os.path.join(workdir, 'requests.db')
+        mode, ids = _prepare_database(args, db_copy)
+        if not ids['games']:
+            print("✗ Database has no games")
+            return 1
+        print(f"Database: {args.db or 'synthetic'} (journal_mode={mode}, busy timeout {args.busy_timeout}s)")
+        print(f"Mix: {', '.join(f'{name}={weight:g}' for name, weight in mix.items())}")
+
+        cwd = os.getcwd()
+        database = _load_database(db_copy, args.busy_timeout, workdir)
+        baseline = calibrate(database, ids, mix, args.calibration_runs, args.seed)
+        os.chdir(cwd)
+        print("Uncontended medians: " + ', '.join(f"{name} {ms:.2f}ms" for name, ms in baseline.items()))
+        print(f"Running {args.processes} processes for {args.duration:g}s...")
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        # Give spawned processes time to import before the clock starts
+        start_at = time.time() + 2.0
+        processes = [
+            ctx.Process(target=_worker, args=(worker, db_copy, args.busy_timeout, workdir, ids, mix,
+                                              start_at, args.duration, args.seed, results))
+            for worker in range(args.processes)
+        ]
+        for p in processes:
+            p.start()
+        samples = []
+        errors = defaultdict(int)
+        for _ in processes:
+            worker_samples, worker_errors = results.get()
+            samples.extend(worker_samples)
+            for message, count in worker_errors.items():
+                errors[message] += count
+        for p in processes:
+            p.join()
+        elapsed = max(0.001, time.time() - start_at)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(samples, baseline, elapsed)
+    report['config'] = {
+        'db': args.db, 'processes': args.processes, 'duration_s': args.duration, 'mix': mix,
+        'journal_mode': mode, 'busy_timeout_s': args.busy_timeout, 'sqlite': sqlite3.sqlite_version,
+    }
+    print_report(report)
+    if errors:
+        print("\nNon-busy errors:")
+        for message, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+            print(f"  {count:>6}× {message[:120]}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
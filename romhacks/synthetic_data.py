@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic catalog generator for benchmarks.
+
+Builds a database with the real schema (database.init_db) and fills it
+with games/ports of realistic field sizes, downloads and monthly_downloads
+rows (in the analytics.db next to it) whose popularity follows a Zipf distribution (a few hits, a long
+tail), reviews and helpful votes. The same seed always produces the same
+catalog and popularity distribution (dates are anchored to today so
+"this month" queries see data), so runs on different commits are
+comparable.
+
+Usage:
+    python synthetic_data.py bench.db                          # Defaults (~1M downloads)
+    python synthetic_data.py bench.db --games 20000 --downloads 5000000 --seed 7
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import database
+
+CONSOLES = [
+    ('GBA', 30), ('SNES', 18), ('NDS', 12), ('GB', 6), ('GBC', 8), ('N64', 8),
+    ('NES', 7), ('3DS', 4), ('GCN', 3), ('Wii', 2), ('Genesis', 2),
+]
+PORT_CONSOLES = ['PC', 'PC, Android', 'PC, Linux', 'PC, Android, Linux', 'Web', 'PC, Switch']
+BASE_GAMES = [
+    ('Pokemon Emerald', 'GBA'), ('Pokemon FireRed', 'GBA'), ('Pokemon Platinum', 'NDS'),
+    ('Pokemon Crystal', 'GBC'), ('Super Mario World', 'SNES'), ('Super Mario 64', 'N64'),
+    ('The Legend of Zelda: A Link to the Past', 'SNES'), ('Super Metroid', 'SNES'),
+    ('Metroid Fusion', 'GBA'), ('Fire Emblem: The Sacred Stones', 'GBA'),
+    ('Super Mario Bros.', 'NES'), ('The Legend of Zelda: Ocarina of Time', 'N64'),
+    ('Kirby Super Star', 'SNES'), ('Sonic the Hedgehog 2', 'Genesis'),
+]
+WORDS = (
+    'adventure quest region story remake expansion legend crystal shadow light dark ancient '
+    'island kingdom battle journey dream storm flame ocean frozen hidden lost secret rising '
+    'chronicles eternal spirit night dawn crimson azure emerald sapphire ruby gold silver '
+    'difficulty balance features sprites music overhaul mechanics bosses items levels world '
+    'players challenge gameplay updated improved new original classic engine physical special'
+).split()
+FEATURE_STARTS = ['New', 'Updated', 'Rebalanced', 'Custom', 'Expanded', 'Reworked', 'Optional']
+
+
+def _sentence(rng, lo, hi):
+    words = rng.choices(WORDS, k=rng.randint(lo, hi))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _text(rng, min_chars, max_chars):
+    target = rng.randint(min_chars, max_chars)
+    parts = []
+    length = 0
+    while length < target:
+        sentence = _sentence(rng, 6, 18)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(parts)[:target]
+
+
+def _title(rng, base_game):
+    prefix = base_game.split(':')[0].split(' ')[0]
+    return f"{prefix} {' '.join(w.capitalize() for w in rng.sample(WORDS, rng.randint(1, 3)))}"
+
+
+def _weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _item(rng, index, is_port, now):
+    base_game, base_console = rng.choice(BASE_GAMES)
+    title = _title(rng, base_game)
+    item_id = f"{title.lower().replace(' ', '-')}-{index}"
+    created = now - timedelta(days=rng.randint(0, 5 * 365), seconds=rng.randint(0, 86400))
+    shots = [f"https://assets.example.com/screens/{item_id}/{n}.png" for n in range(rng.randint(2, 6))]
+    return {
+        'id': item_id,
+        'title': title,
+        'console': rng.choice(PORT_CONSOLES) if is_port else (base_console if rng.random() < 0.8 else _weighted(rng, CONSOLES)),
+        'version': f"{rng.randint(0, 3)}.{rng.randint(0, 9)}.{rng.randint(0, 20)}",
+        'release_date': created.strftime('%Y-%m-%d'),
+        'author': f"{rng.choice(WORDS).capitalize()}{rng.randint(1, 999)}",
+        'description': _text(rng, 400, 3000),
+        'features': json.dumps([f"{rng.choice(FEATURE_STARTS)} {_sentence(rng, 3, 9)}" for _ in range(rng.randint(3, 10))]),
+        'image_url': f"https://assets.example.com/covers/{item_id}.png",
+        'screenshots': json.dumps(shots),
+        'download_link': f"https://example.com/download/{item_id}",
+        'base_game': base_game,
+        'popular': 1 if rng.random() < 0.03 else 0,
+        'instructions_pc': _text(rng, 150, 600) if rng.random() < 0.5 else None,
+        'created_at': created.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _insert_items(conn, table, items):
+    columns = list(items[0].keys())
+    placeholders = ', '.join('?' for _ in columns)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+        ([item[c] for c in columns] for item in items)
+    )
+
+
+def _zipf_cum_weights(count, s):
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, count + 1)))
+
+
+def _months_back(now, months):
+    result = []
+    year, month = now.year, now.month
+    for _ in range(months):
+        result.append(f"{year:04d}-{month:02d}")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return result
+
+
+def _month_spans(month_keys, now):
+    """{YYYY-MM: (month start, seconds until the month ends or now)}"""
+    spans = {}
+    for year_month in month_keys:
+        start = datetime.strptime(year_month, '%Y-%m')
+        end = min(now, (start + timedelta(days=32)).replace(day=1))
+        spans[year_month] = (start, max(0, int((end - start).total_seconds()) - 1))
+    return spans
+
+
+def generate(db_path, games=2000, ports=500, downloads=1_000_000, monthly_downloads=None,
+             months=12, reviews=20000, votes=60000, seed=42, zipf_s=1.1, batch_size=100_000):
+    """Create db_path and its analytics.db (replacing them) with synthetic data. Returns row counts."""
+    rng = random.Random(seed)
+    # Anchored to today so "this month" queries see data; everything else depends only on the seed
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    monthly_downloads = downloads // 2 if monthly_downloads is None else monthly_downloads
+
+    analytics_path = database.get_analytics_db_path(db_path)
+    for path in (db_path, analytics_path):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    previous_path = database.DB_PATH
+    database.DB_PATH = db_path
+    try:
+        database.init_db()
+    finally:
+        database.DB_PATH = previous_path
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    # Download analytics go to analytics.db (WAL, so no journal_mode=OFF here)
+    analytics = sqlite3.connect(analytics_path)
+    analytics.execute('PRAGMA synchronous=OFF')
+
+    game_items = [_item(rng, i, False, now) for i in range(games)]
+    # Ports continue the game numbering: ids must be unique across both tables
+    port_items = [_item(rng, games + i, True, now) for i in range(ports)]
+    _insert_items(conn, 'games', game_items)
+    _insert_items(conn, 'ports', port_items)
+
+    # Popularity rank is independent of insertion order
+    catalog = [(g['id'], 'romhack') for g in game_items] + [(p['id'], 'port') for p in port_items]
+    rng.shuffle(catalog)
+    cum_weights = _zipf_cum_weights(len(catalog), zipf_s)
+    ids = [item_id for item_id, _ in catalog]
+
+    def _batches(total):
+        done = 0
+        while done < total:
+            size = min(batch_size, total - done)
+            yield size
+            done += size
+
+    # Item keys in catalog order, so the same seed gives the same keys
+    analytics.executemany('INSERT INTO item_keys (item_id) VALUES (?)',
+                          ((item['id'],) for item in game_items + port_items))
+
+    # Rows are staged with TEXT ids and hex IP hashes (what track_download sees)
+    # and converted to item keys / integer hashes by database.import_downloads.
+    # One unique IP hash per row keeps almost every insert a new (game, ip) pair
+    span = 5 * 365 * 86400
+    analytics.execute('CREATE TEMP TABLE download_staging (game_id TEXT, ip_hash TEXT, downloaded_at TIMESTAMP)')
+    for size in _batches(downloads):
+        picks = rng.choices(ids, cum_weights=cum_weights, k=size)
+        analytics.executemany(
+            'INSERT INTO download_staging (game_id, ip_hash, downloaded_at) VALUES (?, ?, ?)',
+            ((game_id, f"{rng.getrandbits(64):016x}",
+              (now - timedelta(seconds=rng.randint(0, span))).strftime('%Y-%m-%d %H:%M:%S'))
+             for game_id in picks)
+        )
+    database.import_downloads(analytics, 'temp.download_staging')
+    analytics.execute('DROP TABLE temp.download_staging')
+
+    month_keys = _months_back(now, months)
+    month_weights = list(itertools.accumulate(1.0 / (i + 1) ** 0.5 for i in range(len(month_keys))))
+    spans = _month_spans(month_keys, now)
+    # monthly_downloads is a view over per-month partitions: stage the rows, then split them
+    analytics.execute('''
+        CREATE TEMP TABLE monthly_staging (
+            game_id TEXT, ip_hash TEXT, year_month TEXT, downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for size in _batches(monthly_downloads):
+        picks = rng.choices(ids, cum_weights=cum_weights, k=size)
+        picked_months = rng.choices(month_keys, cum_weights=month_weights, k=size)
+        analytics.executemany(
+            'INSERT INTO monthly_staging (game_id, ip_hash, year_month, downloaded_at) VALUES (?, ?, ?, ?)',
+            ((game_id, f"{rng.getrandbits(64):016x}", year_month,
+              (spans[year_month][0] + timedelta(seconds=rng.randint(0, spans[year_month][1]))).strftime('%Y-%m-%d %H:%M:%S'))
+             for game_id, year_month in zip(picks, picked_months))
+        )
+    database.partition_monthly_downloads(analytics, 'temp.monthly_staging')
+    analytics.execute('DROP TABLE temp.monthly_staging')
+
+    database.rebuild_download_totals(analytics)
+    database.rebuild_daily_downloads(analytics)
+    analytics.commit()
+    analytics.execute('ANALYZE')
+    analytics_counts = {table: analytics.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                        for table in ('downloads', 'monthly_downloads')}
+    analytics.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    analytics.close()
+
+    review_rows = []
+    review_picks = rng.choices(catalog, cum_weights=cum_weights, k=reviews)
+    for n, (item_id, game_type) in enumerate(review_picks):
+        has_text = rng.random() < 0.7
+        review_rows.append((
+            item_id, game_type, f"player{n}", n, rng.randint(0, 50000),
+            1 if rng.random() < 0.8 else 0,
+            _text(rng, 40, 1200) if has_text else None,
+            round(rng.expovariate(1 / 12), 1),
+            (now - timedelta(seconds=rng.randint(0, span))).strftime('%Y-%m-%d %H:%M:%S'),
+        ))
+    conn.executemany('''
+        INSERT OR IGNORE INTO reviews
+            (game_id, game_type, ra_username, ra_user_id, ra_total_points, recommended,
+             review_text, playtime_hours, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', review_rows)
+
+    review_ids = [row[0] for row in conn.execute('SELECT id FROM reviews')]
+    if review_ids:
+        review_weights = _zipf_cum_weights(len(review_ids), 0.9)
+        vote_rows = [
+            (review_id, f"voter{rng.randint(0, votes)}", 'yes' if rng.random() < 0.75 else 'no')
+            for review_id in rng.choices(review_ids, cum_weights=review_weights, k=votes)
+        ]
+        conn.executemany(
+            'INSERT OR IGNORE INTO review_votes (review_id, voter_username, vote_type) VALUES (?, ?, ?)',
+            vote_rows
+        )
+        conn.execute('''
+            UPDATE reviews SET
+                helpful_yes = (SELECT COUNT(*) FROM review_votes v WHERE v.review_id = reviews.id AND v.vote_type = 'yes'),
+                helpful_no = (SELECT COUNT(*) FROM review_votes v WHERE v.review_id = reviews.id AND v.vote_type = 'no')
+        ''')
+
+    conn.commit()
+    conn.execute('ANALYZE')
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('games', 'ports')}
+    counts.update(analytics_counts)
+    counts.update({table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                   for table in ('reviews', 'review_votes')})
+    conn.close()
+
+    database.DB_PATH = db_path
+    try:
+        database.rebuild_leaderboards()
+        database.rebuild_trending()
+        database.rebuild_item_consoles()
+        database.rebuild_item_facets()
+    finally:
+        database.DB_PATH = previous_path
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic catalog database for benchmarks')
+    parser.add_argument('db_path', help='Database file to create (replaced if it exists)')
+    parser.add_argument('--games', type=int, default=2000)
+    parser.add_argument('--ports', type=int, default=500)
+    parser.add_argument('--downloads', type=int, default=1_000_000)
+    parser.add_argument('--monthly-downloads', type=int, default=None, help='Default: half of --downloads')
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--reviews', type=int, default=20000)
+    parser.add_argument('--votes', type=int, default=60000)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for popularity (default: 1.1)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.time()
+    counts = generate(args.db_path, games=args.games, ports=args.ports, downloads=args.downloads,
+                      monthly_downloads=args.monthly_downloads, months=args.months,
+                      reviews=args.reviews, votes=args.votes, seed=args.seed, zipf_s=args.zipf)
+    print(f"✓ Generated {args.db_path} in {time.time() - start:.1f}s")
+    for table, count in counts.items():
+        print(f"  - {table}: {count:,}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
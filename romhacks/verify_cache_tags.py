@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Verify cache tags and selective purging against a local stand-in cache.
+
+StandInCache plays nginx's proxy_cache in front of the WSGI test client:
+it keeps responses that carry X-Accel-Expires, keyed by request URI, and a
+localhost HTTP server plays the ngx_cache_purge endpoint. After warming
+the cache, admin edits and deletes must purge exactly the pages showing
+the touched entities (item page, its hubs, the listings, the sitemap)
+while unrelated pages stay cached. The file-based hook is checked the
+same way against a fake nginx cache directory and `cache_tags.drain`,
+and the frozen copies (freeze.py) of the purged pages must be deleted.
+
+Usage:
+    python verify_cache_tags.py
+"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+
+os.environ.setdefault('SLOW_QUERY_MS', '-1')
+
+import cache_tags
+import database
+import freeze
+import synthetic_data
+
+DATASET = dict(games=60, ports=20, downloads=2000, monthly_downloads=1000,
+               reviews=50, votes=50, seed=7)
+
+
+class StandInCache:
+    """proxy_cache stand-in: stores tagged responses by URI until purged."""
+
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}
+
+    def get(self, uri):
+        """(HIT or MISS, response text)"""
+        if uri in self.entries:
+            return 'HIT', self.entries[uri]
+        response = self.client.get(uri)
+        text = response.get_data(as_text=True)
+        if response.status_code == 200 and response.headers.get('X-Accel-Expires'):
+            self.entries[uri] = text
+        return 'MISS', text
+
+    def purge(self, uri):
+        return self.entries.pop(uri, None) is not None
+
+
+def _purge_server(cache):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200 if cache.purge(self.path) else 404)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _setup():
+    workdir = tempfile.mkdtemp(prefix='romhacks-cache-tags-')
+    db_path = os.path.join(workdir, 'requests.db')
+    synthetic_data.generate(db_path, **DATASET)
+    database.DB_PATH = db_path
+    os.chdir(workdir)
+    cache_tags.CACHE_TAGS_DB = os.path.join(workdir, 'cache_tags.db')
+    cache_tags.PROXY_CACHE_SECONDS = 60
+
+    import app as app_module
+    flask_app = app_module.create_app()
+    flask_app.config['TESTING'] = True
+    app_module.limiter.enabled = False
+    return app_module, flask_app, workdir
+
+
+def main():
+    app_module, flask_app, workdir = _setup()
+    failures = []
+
+    def check(ok, message):
+        print(f"{'✓' if ok else '✗'} {message}")
+        if not ok:
+            failures.append(message)
+
+    games = database.get_games()
+    # Two games in different hubs, and a port
+    game = games[0]
+    other = next(g for g in games if g['base_game'] != game['base_game'])
+    port = database.get_ports()[0]
+    hub = f"/{game['base_game'].lower().replace(' ', '-')}-rom-hacks"
+    other_hub = f"/{other['base_game'].lower().replace(' ', '-')}-rom-hacks"
+    pages = ['/', '/romhacks', '/ports', '/sitemap.xml', hub, other_hub,
+             f"/game/{game['id']}", f"/game/{other['id']}", f"/port/{port['id']}"]
+
+    public = flask_app.test_client()
+    admin = flask_app.test_client()
+    with admin.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    # Headers
+    response = public.get(f"/game/{game['id']}")
+    check(f"item:{game['id']}" in response.headers.get(cache_tags.HEADER, '').split(),
+          f"game page tagged item:{game['id']}")
+    check(response.headers.get('X-Accel-Expires') == '60', "game page is proxy-cacheable (X-Accel-Expires: 60)")
+    check('no-cache' in response.headers.get('Cache-Control', ''), "browsers still revalidate (Cache-Control: no-cache)")
+    check(cache_tags.HEADER not in public.get('/patcher').headers, "untagged pages carry no Surrogate-Key")
+    check('X-Accel-Expires' not in admin.get(f"/game/{game['id']}").headers,
+          "requests with a session cookie are not proxy-cacheable")
+
+    # HTTP purge hook
+    cache = StandInCache(public)
+    server = _purge_server(cache)
+    cache_tags.CACHE_PURGE_URL = f'http://127.0.0.1:{server.server_address[1]}'
+    for uri in pages:
+        cache.get(uri)
+    check(all(cache.get(uri)[0] == 'HIT' for uri in pages), f"{len(pages)} pages cached")
+
+    admin.post(f"/admin/game/{game['id']}/edit", data={'title': 'Retitled By Verify',
+                                                         'base_game': game['base_game']})
+    purged = {f"/game/{game['id']}", hub, '/', '/romhacks', '/sitemap.xml'}
+    for uri in pages:
+        status, text = cache.get(uri)
+        expected = 'MISS' if uri in purged else 'HIT'
+        check(status == expected, f"after editing the game: {uri} {status}")
+    check('Retitled By Verify' in cache.get(f"/game/{game['id']}")[1], "edited title served after the purge")
+
+    admin.post(f"/api/admin/port/{port['id']}/delete")
+    check(f"/port/{port['id']}" not in cache.entries, "deleted port page purged")
+    check(cache.get('/ports')[0] == 'MISS', "ports listing purged after the delete")
+    check(cache.get(other_hub)[0] == 'HIT', "unrelated hub still cached after the delete")
+    server.shutdown()
+
+    # File purge hook + drain against a fake nginx cache directory
+    cache_tags.CACHE_PURGE_URL = ''
+    cache_tags.CACHE_PURGE_FILE = os.path.join(workdir, 'purge.txt')
+    cache_dir = os.path.join(workdir, 'nginx-cache')
+    for uri in pages:
+        public.get(uri)
+        path = cache_tags.cache_file_path(cache_dir, uri)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+    admin.post(f"/admin/game/{other['id']}/edit", data={'title': 'Second Edit', 'base_game': other['base_game']})
+    urls, deleted = cache_tags.drain(cache_dir)
+    gone = {uri for uri in pages if not os.path.exists(cache_tags.cache_file_path(cache_dir, uri))}
+    check(f"/game/{other['id']}" in gone and other_hub in gone and '/' in gone,
+          f"drain deleted the edited game's entries ({deleted} of {urls} purged URLs cached)")
+    check(f"/game/{game['id']}" not in gone and hub not in gone, "drain left unrelated entries alone")
+    check(not os.path.exists(cache_tags.CACHE_PURGE_FILE), "purge file consumed")
+
+    # Frozen pages (freeze.py): nginx serves them ahead of the proxy cache, so
+    # writes must delete them too
+    frozen_dir = os.path.join(workdir, 'frozen')
+    app_module.FROZEN_DIR = frozen_dir
+    frozen_port = database.get_ports()[0]
+    frozen = ['/', '/romhacks', '/ports', hub, other_hub,
+              f"/game/{game['id']}", f"/game/{other['id']}", f"/port/{frozen_port['id']}"]
+    for uri in frozen:
+        path = freeze.output_path(frozen_dir, uri)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+
+    def still_frozen():
+        return {uri for uri in frozen if os.path.exists(freeze.output_path(frozen_dir, uri))}
+
+    admin.post(f"/admin/game/{game['id']}/edit", data={'title': 'Frozen Edit', 'base_game': game['base_game']})
+    check(still_frozen() == set(frozen) - {f"/game/{game['id']}", hub, '/', '/romhacks'},
+          "editing a game deletes its frozen page, hub and listings only")
+    admin.post(f"/api/admin/port/{frozen_port['id']}/delete")
+    check(f"/port/{frozen_port['id']}" not in still_frozen() and '/ports' not in still_frozen(),
+          "deleting a port deletes its frozen page and the ports listing")
+    check({f"/game/{other['id']}", other_hub} <= still_frozen(), "unrelated frozen pages kept")
+
+    if failures:
+        print(f"\n✗ {len(failures)} check(s) failed")
+        return 1
+    print("\n✓ Cache tags and purging work!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
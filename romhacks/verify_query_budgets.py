@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Enforce per-route SQL budgets: statements, connections and rows fetched.
+
+Each route in BUDGETS is requested once against a small seeded catalog
+(synthetic_data.py) with request_metrics.capture_requests() recording
+every statement. A route over budget fails with a diff of what it used
+versus what it may use, followed by the statements it ran; repeated
+statements are grouped so N+1 patterns stand out.
+
+When a change legitimately needs more queries, update BUDGETS in the same
+commit so the increase is reviewed.
+
+Usage:
+    python verify_query_budgets.py            # Check budgets (exit 1 on failure)
+    python verify_query_budgets.py --report   # Print measured usage for every route
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+
+os.environ.setdefault('SLOW_QUERY_MS', '-1')
+
+import database
+import request_metrics
+import slow_query_log
+import synthetic_data
+
+# Seeded dataset the budgets are measured against
+DATASET = dict(games=60, ports=20, downloads=5000, monthly_downloads=2500,
+               reviews=300, votes=600, seed=42)
+
+# (method, path template, admin session) -> (max statements, max connections, max rows fetched)
+# {game}, {port} and {reviewed} are replaced by ids from the dataset.
+BUDGETS = {
+    ('GET', '/', False): (6, 6, 240),
+    ('GET', '/romhacks', False): (3, 3, 180),
+    ('GET', '/ports', False): (3, 3, 60),
+    ('GET', '/romhacks?sort=trending', False): (5, 5, 120),
+    # Console filters rank from the item_consoles index, not the leaderboards
+    ('GET', '/romhacks?console=gba', False): (5, 4, 120),
+    ('GET', '/ports?console=pc&sort=trending', False): (5, 4, 60),
+    ('GET', '/romhacks?game_series=Pokemon&console=gba', False): (5, 4, 60),
+    # One UNION ALL over item_facets/item_consoles; later calls are served from the per-generation cache
+    ('GET', '/api/facets?type=game&console=gba&game_series=Pokemon', False): (2, 1, 40),
+    ('GET', '/game/{game}', False): (2, 2, 2),
+    ('GET', '/port/{port}', False): (2, 2, 2),
+    # Old /game/<port id> links: one indexed lookup, then a 301 to /port/<id>
+    ('GET', '/game/{port}', False): (1, 1, 1),
+    # Hubs: the id/base_game membership scan, then hub columns for the shown members
+    ('GET', '/pokemon-rom-hacks', False): (5, 4, 140),
+    ('GET', '/pokemon-rom-hacks?console=gba', False): (5, 4, 140),
+    ('GET', '/sitemap.xml', False): (2, 2, 100),
+    ('GET', '/api/reviews/{reviewed}', False): (2, 2, 60),
+    ('GET', '/api/stats/{game}?range=1y', False): (1, 1, 365),
+    # Includes the item_keys lookup a worker does once per item (cached after),
+    # the daily bucket and trending updates, and an item entering a full
+    # leaderboard (the most expensive leaderboard path)
+    ('POST', '/api/track-download/{game}', False): (14, 2, 6),
+    ('GET', '/admin', True): (3, 3, 60),
+    ('GET', '/admin/games', True): (4, 2, 60),
+    ('GET', '/admin/ports', True): (4, 2, 60),
+    ('GET', '/api/admin/items?type=game&sort=downloads&order=desc', True): (3, 1, 60),
+    ('GET', '/api/admin/items?type=game&sort=trending&order=desc', True): (3, 1, 60),
+    # Keyset page: a seek on idx_games_title_id, not an offset walk
+    ('GET', '/api/admin/items?type=game&sort=title&after=%5B%22m%22%2C%22x%22%5D', True): (3, 1, 60),
+    ('GET', '/api/admin/items?type=game&console=snes&sort=downloads&order=desc', True): (3, 1, 60),
+    ('GET', '/admin/game/{game}/edit', True): (1, 1, 1),
+}
+
+LIMIT_NAMES = ('statements', 'connections', 'rows')
+
+
+def _usage(stats):
+    return (stats.sql_count, stats.connections, stats.rows)
+
+
+def _format_statements(stats, limit=25):
+    grouped = Counter()
+    rows = Counter()
+    order = []
+    for sql, fetched in stats.statements:
+        text = slow_query_log.normalize(sql)
+        if text not in grouped:
+            order.append(text)
+        grouped[text] += 1
+        rows[text] += fetched
+    order.sort(key=lambda text: (-grouped[text], -rows[text]))
+    lines = []
+    for text in order[:limit]:
+        repeat = f"{grouped[text]}× " if grouped[text] > 1 else ''
+        snippet = text if len(text) <= 140 else text[:137] + '...'
+        lines.append(f"      {repeat}[{rows[text]} rows] {snippet}")
+    if len(order) > limit:
+        lines.append(f"      ... {len(order) - limit} more")
+    return lines
+
+
+def _setup():
+    workdir = tempfile.mkdtemp(prefix='romhacks-budgets-')
+    db_path = os.path.join(workdir, 'requests.db')
+    synthetic_data.generate(db_path, **DATASET)
+    database.DB_PATH = db_path
+    os.chdir(workdir)
+
+    import app as app_module
+    flask_app = app_module.create_app()
+    flask_app.config['TESTING'] = True
+    app_module.limiter.enabled = False
+
+    conn = database.get_db_connection()
+    try:
+        ids = {
+            'game': conn.execute('SELECT id FROM games ORDER BY id LIMIT 1').fetchone()[0],
+            'port': conn.execute('SELECT id FROM ports ORDER BY id LIMIT 1').fetchone()[0],
+            'reviewed': conn.execute('''
+                SELECT game_id FROM reviews WHERE game_type = 'romhack'
+                GROUP BY game_id ORDER BY COUNT(*) DESC, game_id LIMIT 1
+            ''').fetchone()[0],
+        }
+    finally:
+        conn.close()
+    return flask_app, ids
+
+
+def measure(client, method, path):
+    with request_metrics.capture_requests() as captured:
+        response = client.open(path, method=method)
+    if not captured:
+        raise RuntimeError(f"{method} {path}: request was not captured")
+    return response.status_code, captured[-1][3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check per-route SQL query budgets')
+    parser.add_argument('--report', action='store_true', help='Print measured usage for every route')
+    args = parser.parse_args()
+
+    flask_app, ids = _setup()
+    public = flask_app.test_client()
+    admin = flask_app.test_client()
+    with admin.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    failures = 0
+    for (method, template, as_admin), budget in BUDGETS.items():
+        path = template.format(**ids)
+        status, stats = measure(admin if as_admin else public, method, path)
+        usage = _usage(stats)
+        over = [(name, used, limit) for name, used, limit in zip(LIMIT_NAMES, usage, budget) if used > limit]
+        label = f"{method} {template}"
+
+        if status >= 400:
+            failures += 1
+            print(f"✗ {label}: HTTP {status}")
+            continue
+        if over:
+            failures += 1
+            print(f"✗ {label}")
+            for name, used, limit in zip(LIMIT_NAMES, usage, budget):
+                marker = f"  (+{used - limit} over budget)" if used > limit else ''
+                print(f"    {name:<12} {used:>5} / {limit:<5}{marker}")
+            print("    statements:")
+            for line in _format_statements(stats):
+                print(line)
+        elif args.report:
+            print(f"✓ {label:<62} statements {usage[0]:>3}/{budget[0]:<3} "
+                  f"connections {usage[1]:>3}/{budget[1]:<3} rows {usage[2]:>5}/{budget[2]}")
+        else:
+            print(f"✓ {label}")
+
+    if failures:
+        print(f"\n✗ {failures} route(s) over budget")
+        return 1
+    print("\n✓ All routes within their query budgets!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Verify the shared SQLite rate-limit storage.
+
+Correctness: N processes race to hit the same limit; the total number of
+allowed hits across all processes must equal the limit exactly (with the
+per-worker memory:// storage it would be N times the limit).
+
+Benchmark: per-check latency of memory:// versus sqlite:// storage.
+
+Usage:
+    python verify_rate_limiter.py                    # Multi-process correctness check
+    python verify_rate_limiter.py --bench            # Also run the latency benchmark
+    python verify_rate_limiter.py --processes 8 --limit 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+import rate_limit_storage  # noqa: F401 - registers sqlite://
+
+STRATEGIES = {
+    'sliding-window-counter': SlidingWindowCounterRateLimiter,
+    'fixed-window': FixedWindowRateLimiter,
+}
+
+
+def _worker(uri, strategy, limit_string, attempts, start_event, results):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(limit_string)
+    start_event.wait()
+    allowed = sum(1 for _ in range(attempts) if limiter.hit(item, '203.0.113.7'))
+    results.put(allowed)
+
+
+def check_multiprocess(uri, strategy, processes, limit, attempts):
+    limit_string = f"{limit} per hour"
+    # Create the schema once before the workers race on it
+    storage_from_string(uri)
+
+    ctx = multiprocessing.get_context('spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(uri, strategy, limit_string, attempts, start_event, results))
+        for _ in range(processes)
+    ]
+    for w in workers:
+        w.start()
+    start_event.set()
+    allowed = [results.get(timeout=60) for _ in workers]
+    for w in workers:
+        w.join()
+
+    total = sum(allowed)
+    ok = total == limit
+    status = '✓' if ok else '✗'
+    print(f"{status} {strategy}: {processes} processes x {attempts} hits, "
+          f"limit {limit} -> {total} allowed {allowed}")
+    return ok
+
+
+def bench(uri, strategy, iterations, keys):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse("1000000 per hour")
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        limiter.hit(item, f"198.51.100.{i % keys}")
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99)]
+    scheme = uri.split(':', 1)[0]
+    print(f"  {scheme:<8} {strategy:<24} mean {statistics.mean(samples):7.1f}µs  "
+          f"p50 {p50:7.1f}µs  p99 {p99:7.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify shared rate-limit storage')
+    parser.add_argument('--processes', type=int, default=4, help='Concurrent processes (default: 4)')
+    parser.add_argument('--limit', type=int, default=30, help='Limit per hour to test (default: 30)')
+    parser.add_argument('--attempts', type=int, default=25, help='Hits per process (default: 25)')
+    parser.add_argument('--bench', action='store_true', help='Run the per-check latency benchmark')
+    parser.add_argument('--iterations', type=int, default=5000, help='Benchmark iterations (default: 5000)')
+    args = parser.parse_args()
+
+    if args.processes * args.attempts <= args.limit:
+        print("✗ processes x attempts must exceed --limit for the check to mean anything")
+        return 1
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Multi-process correctness:")
+        for strategy in STRATEGIES:
+            uri = f"sqlite:///{os.path.join(tmp, strategy + '.db')}"
+            if not check_multiprocess(uri, strategy, args.processes, args.limit, args.attempts):
+                failures += 1
+
+        if args.bench:
+            print(f"\nPer-check latency ({args.iterations} hits over 100 keys):")
+            for strategy in STRATEGIES:
+                bench("memory://", strategy, args.iterations, 100)
+                bench(f"sqlite:///{os.path.join(tmp, 'bench-' + strategy + '.db')}",
+                      strategy, args.iterations, 100)
+
+    if failures:
+        print(f"\n✗ {failures} check(s) failed")
+        return 1
+    print("\n✓ Rate-limit storage verification complete!")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Quick database schema verification"""
 import sqlite3
-from database import init_db
+from database import init_db, get_analytics_db_path
 
 # Initialize database
 init_db()
@@ -26,9 +26,10 @@ cursor.execute('PRAGMA table_info(ports)')
 port_cols = {row[1] for row in cursor.fetchall()}
 print(f'✓ Ports table has game_series: {"game_series" in port_cols}')
 
-cursor.execute('PRAGMA table_info(monthly_downloads)')
-md_cols = {row[1] for row in cursor.fetchall()}
-print(f'✓ Monthly downloads table exists: {len(md_cols) > 0}')
+analytics = sqlite3.connect(get_analytics_db_path())
+md_cols = {row[1] for row in analytics.execute('PRAGMA table_info(monthly_downloads)')}
+print(f'✓ Monthly downloads table exists in analytics.db: {len(md_cols) > 0}')
+analytics.close()
 
 cursor.execute('PRAGMA table_info(monthly_popular_history)')
 mh_cols = {row[1] for row in cursor.fetchall()}